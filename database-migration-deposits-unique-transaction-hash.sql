@@ -0,0 +1,17 @@
+-- Database Migration: Unique Transaction Hash on Deposits
+-- Run this SQL in your Supabase SQL Editor
+-- Required by the TRC20 automation service, which inserts deposits with
+-- ON CONFLICT (transaction_hash) DO NOTHING so the database enforces idempotency
+
+-- 1. Check for existing duplicates (must return no rows before step 2)
+SELECT transaction_hash, COUNT(*) AS copies
+FROM public.deposits
+WHERE transaction_hash IS NOT NULL
+GROUP BY transaction_hash
+HAVING COUNT(*) > 1;
+
+-- 2. Replace the plain index with a unique one (NULL hashes are still allowed)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_deposits_transaction_hash_unique
+ON public.deposits(transaction_hash);
+
+DROP INDEX IF EXISTS idx_deposits_transaction_hash;
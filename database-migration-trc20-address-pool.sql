@@ -0,0 +1,22 @@
+-- Database Migration: TRC20 Deposit Address Pool
+-- Run this SQL in your Supabase SQL Editor
+-- Required by the TRC20 automation service, which pre-generates deposit
+-- addresses in bulk and assigns one to each user on their first request
+
+-- 1. Pool of pre-generated addresses (private keys stored encrypted)
+CREATE TABLE IF NOT EXISTS public.trc20_address_pool (
+    id BIGSERIAL PRIMARY KEY,
+    address TEXT NOT NULL UNIQUE,
+    private_key_encrypted TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    assigned_to TEXT,
+    assigned_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 2. Assignment takes the oldest unassigned row
+CREATE INDEX IF NOT EXISTS idx_trc20_address_pool_unassigned
+ON public.trc20_address_pool(id)
+WHERE assigned_to IS NULL;
+
+-- 3. Keep the service role as the only reader of private keys
+ALTER TABLE public.trc20_address_pool ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,21 @@
+-- Database Migration: TRC20 Data Keys
+-- Run this SQL in your Supabase SQL Editor
+-- Required by the TRC20 automation service, which encrypts stored private keys
+-- with AES-GCM data keys; each data key is stored here wrapped by the master key
+
+-- 1. Wrapped data keys (useless without the key-encryption key, which never enters the database)
+CREATE TABLE IF NOT EXISTS public.trc20_data_keys (
+    id TEXT PRIMARY KEY,
+    wrapped_key TEXT NOT NULL,
+    kek_id TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 2. Keep the service role as the only reader
+ALTER TABLE public.trc20_data_keys ENABLE ROW LEVEL SECURITY;
+
+-- 3. Rows written before envelope encryption hold plaintext keys; list them, then
+--    encrypt them in place with: python key_vault.py --reencrypt-legacy
+SELECT user_email, address
+FROM public.trc20_deposit_addresses
+WHERE private_key_encrypted NOT LIKE 'v1:%';
@@ -0,0 +1,17 @@
+-- Database Migration: TRC20 Withdrawal Tracking
+-- Run this SQL in your Supabase SQL Editor
+-- Required by the TRC20 automation service, which follows withdrawals from
+-- signed -> broadcasted -> confirmed/failed and re-queues expired ones
+
+-- 1. Lifecycle timestamps
+ALTER TABLE public.trc20_withdrawals ADD COLUMN IF NOT EXISTS broadcasted_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.trc20_withdrawals ADD COLUMN IF NOT EXISTS confirmed_at TIMESTAMP WITH TIME ZONE;
+
+-- 2. Bulk outcome updates look withdrawals up by txid
+CREATE INDEX IF NOT EXISTS idx_trc20_withdrawals_transaction_hash
+ON public.trc20_withdrawals(transaction_hash);
+
+-- 3. Startup loads every in-flight withdrawal
+CREATE INDEX IF NOT EXISTS idx_trc20_withdrawals_in_flight
+ON public.trc20_withdrawals(status)
+WHERE status IN ('signed', 'broadcasted');
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Deposit Address Scheduler for TRC20 Automation Service
+Polls hot per-user deposit addresses often and cold ones rarely
+"""
+
+import heapq
+import time
+import random
+import threading
+from typing import Optional, Dict, Any, List, Iterable
+
+
+class AddressScheduler:
+    """Decides which per-user deposit addresses to poll each cycle.
+
+    An address is hot for hot_window seconds after it is created, requested or
+    receives a transfer, and is polled every hot_interval seconds. After that
+    every empty check doubles its interval, up to cold_interval. A heap keyed by
+    next check time means each cycle only touches the addresses that are due.
+    First checks are spread across the address's interval so a restart does not
+    make every address due at once, and mark_hot requests go to a separate heap
+    that is served before the backlog.
+    """
+
+    def __init__(self, hot_interval: float = 30, cold_interval: float = 6 * 3600,
+                 hot_window: float = 24 * 3600, max_per_cycle: int = 500):
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.hot_window = hot_window
+        self.max_per_cycle = max_per_cycle
+
+        self._addresses: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, str] = {}
+        self._heap: List = []
+        self._hot_heap: List = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def user_email_for(self, address: str) -> Optional[str]:
+        """Return the owner of a tracked address, or None if it is not ours"""
+        entry = self._addresses.get(address)
+        return entry['user_email'] if entry else None
+
+    def address_for(self, user_email: str) -> Optional[str]:
+        """Return the tracked deposit address of a user, if any"""
+        return self._by_user.get(user_email)
+
+    def add(self, address: str, user_email: str, active_at: Optional[float] = None,
+            min_timestamp: Optional[int] = None):
+        """Track an address; active_at is when it was created or last used (epoch seconds)"""
+        now = time.time()
+        with self._lock:
+            self._by_user[user_email] = address
+            entry = self._addresses.get(address)
+            if entry:
+                # Reassigned: the previous owner no longer has this address
+                if entry['user_email'] != user_email and self._by_user.get(entry['user_email']) == address:
+                    del self._by_user[entry['user_email']]
+                entry['user_email'] = user_email
+                if active_at:
+                    entry['active_at'] = max(entry['active_at'], active_at)
+                return
+            active_at = active_at or now
+            interval = self.hot_interval if now - active_at <= self.hot_window else self.cold_interval
+            next_check = now + random.uniform(0, interval)
+            self._addresses[address] = {
+                'address': address,
+                'user_email': user_email,
+                'active_at': active_at,
+                'interval': interval,
+                'next_check': next_check,
+                'min_timestamp': min_timestamp or int(active_at * 1000),
+            }
+            heapq.heappush(self._heap, (next_check, address))
+
+    def add_many(self, rows: Iterable[Dict[str, Any]]):
+        """Track rows with address, user_email and optional active_at and min_timestamp"""
+        for row in rows:
+            self.add(row['address'], row['user_email'], row.get('active_at'), row.get('min_timestamp'))
+
+    def mark_hot(self, address: str):
+        """Poll an address at the hot interval again, e.g. when its user asks for it"""
+        now = time.time()
+        with self._lock:
+            entry = self._addresses.get(address)
+            if not entry:
+                return
+            entry['active_at'] = now
+            entry['interval'] = self.hot_interval
+            entry['next_check'] = now
+            heapq.heappush(self._hot_heap, (now, address))
+
+    def due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Pop up to max_per_cycle addresses whose next check has come"""
+        now = now or time.time()
+        batch = []
+        with self._lock:
+            # Hot marks first, so they never wait behind a backlog of due addresses
+            for heap in (self._hot_heap, self._heap):
+                while heap and heap[0][0] <= now and len(batch) < self.max_per_cycle:
+                    next_check, address = heapq.heappop(heap)
+                    entry = self._addresses.get(address)
+                    # Skip stale heap entries left behind by mark_hot/record
+                    if not entry or entry['next_check'] != next_check:
+                        continue
+                    entry['next_check'] = None
+                    batch.append(dict(entry))
+        return batch
+
+    def record(self, address: str, latest_timestamp: Optional[int] = None, failed: bool = False):
+        """Reschedule an address after a check; latest_timestamp is its newest transfer (ms)"""
+        now = time.time()
+        with self._lock:
+            entry = self._addresses.get(address)
+            if not entry:
+                return
+
+            # The listing starts at min_timestamp inclusive, so the last transfer
+            # comes back on every check; only a newer one makes the address hot
+            if latest_timestamp and latest_timestamp > entry['min_timestamp']:
+                entry['active_at'] = now
+                entry['interval'] = self.hot_interval
+                entry['min_timestamp'] = max(entry['min_timestamp'], latest_timestamp)
+            elif not failed and now - entry['active_at'] > self.hot_window:
+                entry['interval'] = min(self.cold_interval, entry['interval'] * 2)
+
+            entry['next_check'] = now + entry['interval']
+            heapq.heappush(self._heap, (entry['next_check'], address))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return address counts by polling tier"""
+        with self._lock:
+            hot = sum(1 for e in self._addresses.values() if e['interval'] <= self.hot_interval)
+            cold = sum(1 for e in self._addresses.values() if e['interval'] >= self.cold_interval)
+            total = len(self._addresses)
+        return {'addresses': total, 'hot': hot, 'warm': total - hot - cold, 'cold': cold}
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Deposit Address Pool for TRC20 Automation Service
+Generates deposit keypairs in bulk across worker processes
+"""
+
+from concurrent.futures import Executor
+from typing import List, Tuple
+
+
+def generate_keypairs(count: int) -> List[Tuple[str, str]]:
+    """Generate count (address, private key hex) pairs; runs in a worker process"""
+    from tronpy.keys import PrivateKey
+
+    keypairs = []
+    for _ in range(count):
+        private_key = PrivateKey.random()
+        keypairs.append((private_key.public_key.to_base58check_address(), str(private_key)))
+    return keypairs
+
+
+def generate_keypairs_parallel(executor: Executor, total: int, chunk_size: int = 200) -> List[Tuple[str, str]]:
+    """Split keypair generation into chunks spread across the executor's workers"""
+    chunks = [min(chunk_size, total - start) for start in range(0, total, chunk_size)]
+    keypairs = []
+    for chunk in executor.map(generate_keypairs, chunks):
+        keypairs.extend(chunk)
+    return keypairs
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Async Engine for TRC20 Automation Service
+Runs monitoring jobs concurrently on an asyncio loop with bounded concurrency
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Iterable, List
+
+from tracing import TRACER, run_in_span
+
+logger = logging.getLogger(__name__)
+
+# Concurrent calls allowed per kind of external dependency
+DEFAULT_LIMITS = {
+    'tron': 4,
+    'db': 8,
+    'supabase': 8,
+    'notify': 4,
+}
+
+
+class AsyncEngine:
+    """Schedules periodic jobs so one slow job never stalls the others.
+
+    Each job runs in its own loop and waits its interval after every run, like
+    the original while/sleep monitor. Blocking work (requests, psycopg2, tronpy)
+    runs on worker threads; each kind of external call has its own thread pool
+    and semaphore, and a timeout. Every run of a job is traced as one cycle, and
+    every call is a span of it.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, call_timeout: float = 60.0,
+                 error_backoff: float = 60.0):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.call_timeout = call_timeout
+        self.error_backoff = error_backoff
+
+        self._jobs: List[Dict[str, Any]] = []
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def add_job(self, name: str, func: Callable, interval: float):
+        """Register a periodic job; func may be a plain function or a coroutine function"""
+        self._jobs.append({'name': name, 'func': func, 'interval': interval})
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self._semaphores:
+            self._semaphores[kind] = asyncio.Semaphore(self.limits.get(kind, 1))
+        return self._semaphores[kind]
+
+    def _executor(self, kind: str) -> ThreadPoolExecutor:
+        if kind not in self._executors:
+            self._executors[kind] = ThreadPoolExecutor(max_workers=self.limits.get(kind, 1),
+                                                       thread_name_prefix=f"engine-{kind}")
+        return self._executors[kind]
+
+    async def call(self, kind: str, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Run a blocking call on the kind's worker threads, bounded by its semaphore.
+
+        The slot is held until the thread actually returns: a call that times
+        out keeps running, so releasing early would let the kind exceed its limit.
+        """
+        semaphore = self._semaphore(kind)
+        await semaphore.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            # The worker thread runs in a copy of this context, so its spans join the cycle's trace
+            name = f"{kind}:{getattr(func, '__name__', 'call')}"
+            future = loop.run_in_executor(self._executor(kind), functools.partial(
+                contextvars.copy_context().run, run_in_span, name, func, *args, **kwargs
+            ))
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: semaphore.release())
+        # Shielded so a timeout abandons the call without marking it done
+        return await asyncio.wait_for(asyncio.shield(future), timeout or self.call_timeout)
+
+    async def gather(self, kind: str, func: Callable, items: Iterable[Any]) -> List[Any]:
+        """Run func over items concurrently; failures are returned, not raised"""
+        return await asyncio.gather(*(self.call(kind, func, item) for item in items),
+                                    return_exceptions=True)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        while not self._stopping.is_set():
+            delay = job['interval']
+            try:
+                with TRACER.cycle(job['name']):
+                    if inspect.iscoroutinefunction(job['func']):
+                        await job['func']()
+                    else:
+                        await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                            contextvars.copy_context().run, run_in_span, job['name'], job['func']
+                        ))
+            except Exception as e:
+                logger.error(f"Error in {job['name']} job: {e}")
+                delay = self.error_backoff
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_async(self):
+        """Run every registered job until stop() is called"""
+        self._stopping = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(self._run_job(job) for job in self._jobs))
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+            self._executors.clear()
+
+    def stop(self):
+        """Ask every job to finish after its current run; safe to call from any thread"""
+        if self._stopping is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def run(self):
+        """Run the engine on a new event loop until interrupted"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Async engine stopped")
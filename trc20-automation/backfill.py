@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Historical Backfill for TRC20 Automation Service
+Re-ingests a time or block range in parallel partitions with resumable checkpoints
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
+
+from block_scanner import fetch_block_transfers
+from main import SYSTEM_USER_EMAIL, TRC20AutomationService
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillState:
+    """Backfill jobs and per-partition checkpoints in a local SQLite file.
+
+    A partition covers [start, end) in milliseconds (time jobs) or block numbers
+    (block jobs). position is where the next fetch starts; it only moves after
+    the data before it has been ingested, so a crashed run resumes without
+    losing transfers. Anything re-read is dropped by duplicate detection.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS backfill_jobs (
+                    job TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    address TEXT,
+                    range_start INTEGER NOT NULL,
+                    range_end INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS backfill_partitions (
+                    job TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    range_start INTEGER NOT NULL,
+                    range_end INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    transfers INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL,
+                    PRIMARY KEY (job, idx)
+                );
+            """)
+
+    def create_job(self, job: str, mode: str, address: Optional[str], start: int, end: int,
+                   count: int) -> List[Dict[str, Any]]:
+        """Register a job split into count partitions; an existing job keeps its partitions"""
+        step = max(1, -(-(end - start) // count))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO backfill_jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (job, mode, address, start, end, time.time())
+            )
+            if cur.rowcount:
+                self._conn.executemany(
+                    "INSERT INTO backfill_partitions (job, idx, range_start, range_end, position) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(job, i, s, min(s + step, end), s) for i, s in enumerate(range(start, end, step))]
+                )
+            self._conn.execute("COMMIT")
+        return self.partitions(job)
+
+    def latest_unfinished_job(self) -> Optional[Dict[str, Any]]:
+        """Return the most recently created job that still has open partitions"""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT j.job, j.mode, j.address, j.range_start, j.range_end FROM backfill_jobs j
+                WHERE EXISTS (SELECT 1 FROM backfill_partitions p WHERE p.job = j.job AND NOT p.done)
+                ORDER BY j.created_at DESC LIMIT 1
+            """).fetchone()
+        if not row:
+            return None
+        return dict(zip(('job', 'mode', 'address', 'start', 'end'), row))
+
+    def partitions(self, job: str) -> List[Dict[str, Any]]:
+        """Return every partition of a job"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, range_start, range_end, position, transfers, done FROM backfill_partitions "
+                "WHERE job = ? ORDER BY idx", (job,)
+            ).fetchall()
+        return [dict(zip(('index', 'start', 'end', 'position', 'transfers', 'done'), row)) for row in rows]
+
+    def checkpoint(self, job: str, index: int, position: int, transfers: int, done: bool = False):
+        """Record a partition's progress"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE backfill_partitions SET position = ?, transfers = transfers + ?, done = ?, updated_at = ? "
+                "WHERE job = ? AND idx = ?",
+                (position, transfers, int(done), time.time(), job, index)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Backfiller:
+    """Runs a backfill job's open partitions on a thread pool, feeding the service's bulk-insert path.
+
+    Time jobs page through one address's transfers with TronGrid's
+    min/max_timestamp filter. Block jobs walk solid blocks and ingest
+    transfers to the main wallet and every known deposit address. TronGrid
+    rate limiting and concurrency control stay in the shared client, so
+    workers only bound how many partitions are in flight.
+    """
+
+    def __init__(self, service, state: BackfillState, workers: int = 8, progress_interval: float = 10.0):
+        self.service = service
+        self.state = state
+        self.workers = workers
+        self.progress_interval = progress_interval
+
+        self._stats = {'transfers': 0, 'inserted': 0, 'partitions_done': 0, 'partitions_failed': 0}
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_progress = self._started
+
+    def _record(self, job: str, partition: Dict[str, Any], position: int, transfers: int, inserted: int,
+                done: bool = False):
+        """Checkpoint a partition and log overall throughput now and then"""
+        self.state.checkpoint(job, partition['index'], position, transfers, done)
+        with self._stats_lock:
+            self._stats['transfers'] += transfers
+            self._stats['inserted'] += inserted
+            self._stats['partitions_done'] += int(done)
+            now = time.monotonic()
+            if now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+            stats = dict(self._stats)
+        logger.info(f"Backfill {job}: {stats['partitions_done']} partitions done, {stats['transfers']} transfers "
+                    f"({self.rate():.1f} transfers/s), {stats['inserted']} new deposits")
+
+    def rate(self) -> float:
+        """Transfers fetched per second since the run started"""
+        with self._stats_lock:
+            transfers = self._stats['transfers']
+        return transfers / max(time.monotonic() - self._started, 0.001)
+
+    def _time_partition(self, job: str, partition: Dict[str, Any], address: str):
+        """Page through one address's transfers in [position, end)"""
+        service = self.service
+        if address == service.main_wallet_address:
+            user_email, deposit_address = SYSTEM_USER_EMAIL, None
+        else:
+            user_email, deposit_address = service.address_scheduler.user_email_for(address), address
+
+        # The query must stay fixed while paging by fingerprint; position only tracks progress
+        min_timestamp = position = partition['position']
+        fingerprint = None
+        while True:
+            data = service._fetch_transfer_page(address, min_timestamp, fingerprint, partition['end'] - 1)
+            if data is None:
+                raise RuntimeError(f"TronGrid fetch failed at {position}")
+
+            transactions = data.get('data', [])
+            deposits = [tx for tx in transactions if service._is_usdt_deposit(tx, address)]
+            unprocessed = service._filter_unprocessed_transactions([tx.get('transaction_id') for tx in deposits])
+            inserted = service._ingest_deposits(
+                [tx for tx in deposits if tx.get('transaction_id') in unprocessed], user_email, deposit_address
+            )
+            if inserted is None:
+                raise RuntimeError(f"Deposit ingestion failed at {position}")
+
+            # min_timestamp is inclusive, so a resume re-reads the last timestamp once
+            position = max([position] + [tx.get('block_timestamp', 0) for tx in transactions])
+            fingerprint = data.get('meta', {}).get('fingerprint')
+            if not fingerprint:
+                self._record(job, partition, partition['end'], len(transactions), len(inserted), done=True)
+                return
+            self._record(job, partition, position, len(transactions), len(inserted))
+
+    def _block_partition(self, job: str, partition: Dict[str, Any]):
+        """Walk blocks [position, end) in batches, ingesting transfers to any watched address"""
+        service = self.service
+        for batch_start in range(partition['position'], partition['end'], service.block_scan_batch):
+            batch_end = min(batch_start + service.block_scan_batch, partition['end'])
+            transfers = []
+            for number in range(batch_start, batch_end):
+                transfers.extend(fetch_block_transfers(service.trongrid.post, number,
+                                                       service.usdt_contract_address))
+            inserted = service._ingest_block_transfers(transfers)
+            if inserted is None:
+                raise RuntimeError(f"Block ingestion failed at block {batch_start}")
+            self._record(job, partition, batch_end, len(transfers), inserted, done=batch_end == partition['end'])
+
+    def _run_partition(self, job: str, mode: str, address: Optional[str], partition: Dict[str, Any]) -> bool:
+        try:
+            if mode == 'time':
+                self._time_partition(job, partition, address)
+            else:
+                self._block_partition(job, partition)
+            return True
+        except Exception as e:
+            logger.error(f"Backfill {job} partition {partition['index']} stopped: {e}")
+            with self._stats_lock:
+                self._stats['partitions_failed'] += 1
+            return False
+
+    def run(self, job: str, mode: str, address: Optional[str] = None) -> Dict[str, Any]:
+        """Run every open partition of a job and return throughput stats"""
+        # Historical transfers are counted against the current solid head, and
+        # deposit addresses must be known before transfers to them can be matched
+        self.service.confirmation_service.refresh(force=True)
+        self.service._sync_deposit_addresses()
+
+        pending = [p for p in self.state.partitions(job) if not p['done']]
+        logger.info(f"Backfill {job}: {len(pending)} open partitions on {self.workers} workers")
+
+        self._started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill') as executor:
+            list(executor.map(lambda p: self._run_partition(job, mode, address, p), pending))
+
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['elapsed'] = round(time.monotonic() - self._started, 1)
+        stats['transfers_per_second'] = round(self.rate(), 1)
+        stats['remaining'] = sum(1 for p in self.state.partitions(job) if not p['done'])
+        return stats
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Backfill historical USDT deposits")
+    parser.add_argument('--address', help="address to backfill by time (default: main wallet)")
+    parser.add_argument('--days', type=int, default=7, help="window ending now (ignored with --since)")
+    parser.add_argument('--since', help="window start, ISO date or datetime (UTC)")
+    parser.add_argument('--until', help="window end, ISO date or datetime (UTC); defaults to now")
+    parser.add_argument('--blocks', help="block range START:END (end exclusive) for every watched address")
+    parser.add_argument('--resume', action='store_true', help="resume the latest unfinished job")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BACKFILL_WORKERS', '8')))
+    parser.add_argument('--partitions', type=int, help="partitions for a new job (default 4 per worker)")
+    parser.add_argument('--state-file', default=os.getenv('BACKFILL_STATE_FILE', 'trc20_backfill.db'))
+    args = parser.parse_args()
+
+    service = TRC20AutomationService()
+    state = BackfillState(args.state_file)
+
+    try:
+        if args.resume:
+            job = state.latest_unfinished_job()
+            if not job:
+                logger.info("No unfinished backfill job to resume")
+                return 0
+        else:
+            partitions = args.partitions or args.workers * 4
+            if args.blocks:
+                start, end = (int(n) for n in args.blocks.split(':'))
+                job = {'job': f"blocks:{start}-{end}", 'mode': 'blocks', 'address': None, 'start': start, 'end': end}
+            else:
+                def parse(value: str) -> datetime:
+                    parsed = datetime.fromisoformat(value)
+                    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+                until = parse(args.until) if args.until else datetime.now(timezone.utc)
+                since = parse(args.since) if args.since else until - timedelta(days=args.days)
+                address = args.address or service.main_wallet_address
+                start, end = int(since.timestamp() * 1000), int(until.timestamp() * 1000)
+                job = {'job': f"time:{address}:{start}-{end}", 'mode': 'time', 'address': address,
+                       'start': start, 'end': end}
+            state.create_job(job['job'], job['mode'], job['address'], job['start'], job['end'], partitions)
+
+        if job['mode'] == 'time' and job['address'] != service.main_wallet_address:
+            service._sync_deposit_addresses()
+            if not service.address_scheduler.user_email_for(job['address']):
+                logger.error(f"{job['address']} is neither the main wallet nor a known deposit address")
+                return 1
+
+        stats = Backfiller(service, state, args.workers).run(job['job'], job['mode'], job['address'])
+        logger.info(f"Backfill {job['job']} finished: {stats}")
+        if stats['remaining']:
+            logger.warning(f"{stats['remaining']} partitions incomplete; rerun with --resume to continue")
+            return 1
+        return 0
+    finally:
+        state.close()
+        service.db_pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,936 @@
+#!/usr/bin/env python3
+"""
+Throughput Benchmark for TRC20 Automation Service
+Drives synthetic deposit and withdrawal loads through both services against local stand-ins
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import bisect
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from block_scanner import TRANSFER_TOPIC
+
+logger = logging.getLogger(__name__)
+
+USDT_CONTRACT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+SUN_PER_USDT = 1_000_000
+BLOCK_INTERVAL = 3.0  # ConfirmationService estimates block numbers at 3s per block
+
+# The service only builds transfer() calls from the cached ABI
+USDT_ABI = [
+    {
+        'type': 'Function', 'name': 'transfer', 'stateMutability': 'Nonpayable',
+        'inputs': [{'name': '_to', 'type': 'address'}, {'name': '_value', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'bool'}],
+    },
+    {
+        'type': 'Function', 'name': 'balanceOf', 'stateMutability': 'View',
+        'inputs': [{'name': 'who', 'type': 'address'}],
+        'outputs': [{'name': '', 'type': 'uint256'}],
+    },
+]
+
+# Just the tables and columns main.py touches
+BENCH_SCHEMA_SQL = """
+    DROP SCHEMA IF EXISTS {schema} CASCADE;
+    CREATE SCHEMA {schema};
+    SET search_path TO {schema};
+
+    CREATE TABLE deposits (
+        id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+        user_email TEXT NOT NULL,
+        amount DECIMAL(12,2) NOT NULL,
+        currency TEXT DEFAULT 'USD' NOT NULL,
+        method_id TEXT NOT NULL,
+        method_name TEXT NOT NULL,
+        network TEXT NOT NULL,
+        deposit_address TEXT NOT NULL,
+        transaction_hash TEXT,
+        confirmation_count INTEGER DEFAULT 0,
+        required_confirmations INTEGER DEFAULT 1,
+        status TEXT DEFAULT 'pending',
+        final_amount DECIMAL(12,2),
+        admin_notes TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+    CREATE UNIQUE INDEX idx_deposits_transaction_hash_unique ON deposits(transaction_hash);
+
+    CREATE TABLE trc20_withdrawals (
+        id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+        user_email TEXT NOT NULL,
+        to_address TEXT NOT NULL,
+        amount DECIMAL(12,2) NOT NULL,
+        status TEXT DEFAULT 'pending',
+        transaction_hash TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        broadcasted_at TIMESTAMP WITH TIME ZONE,
+        confirmed_at TIMESTAMP WITH TIME ZONE
+    );
+    CREATE INDEX idx_trc20_withdrawals_transaction_hash ON trc20_withdrawals(transaction_hash);
+
+    CREATE TABLE trc20_deposit_addresses (
+        user_email TEXT NOT NULL UNIQUE,
+        address TEXT NOT NULL UNIQUE,
+        private_key_encrypted TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    );
+
+    CREATE TABLE trc20_address_pool (
+        id BIGSERIAL PRIMARY KEY,
+        address TEXT NOT NULL UNIQUE,
+        private_key_encrypted TEXT NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        assigned_to TEXT,
+        assigned_at TIMESTAMP WITH TIME ZONE
+    );
+"""
+
+# Reported metrics where larger is better; for every other metric smaller is better
+HIGHER_IS_BETTER = {'deposits_per_second', 'withdrawals_per_second'}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def random_address(rng: random.Random) -> str:
+    """A valid, random base58 TRON address"""
+    from tronpy.keys import to_base58check_address
+    return to_base58check_address(b'\x41' + bytes(rng.getrandbits(8) for _ in range(20)))
+
+
+def _wait_for(predicate: Callable[[], bool], deadline: float, poll: float = 0.1) -> bool:
+    """Poll predicate until it holds or the monotonic deadline passes"""
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
+    return True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class StandIn:
+    """Local JSON-over-HTTP server on a background thread, counting requests per endpoint"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.requests: Counter = Counter()
+        self._requests_lock = threading.Lock()
+        self._server: Optional[_Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def endpoint(self, method: str, path: str) -> str:
+        """Label a request is counted under"""
+        return f"{method} {path}"
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        """Return (status, JSON body or None) for a request"""
+        raise NotImplementedError
+
+    def total_requests(self) -> int:
+        with self._requests_lock:
+            return sum(self.requests.values())
+
+    def request_counts(self) -> Dict[str, int]:
+        with self._requests_lock:
+            return dict(self.requests)
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real services, so clients reuse their connections
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(f"Stand-in: {format % args}")
+
+            def _dispatch(self, method: str):
+                url = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = None
+
+                path = url.path.strip('/')
+                with stand_in._requests_lock:
+                    stand_in.requests[stand_in.endpoint(method, path)] += 1
+                try:
+                    status, result = stand_in.handle(method, path, dict(parse_qsl(url.query)), body)
+                except Exception as e:
+                    logger.exception(f"Stand-in failed on {method} {path}")
+                    status, result = 500, {'Error': str(e)}
+
+                payload = b'' if result is None else json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+        return Handler
+
+    def start(self):
+        """Serve on a background thread (port 0 picks a free port)"""
+        self._server = _Server((self.host, self.port), self._handler())
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeTronGrid(StandIn):
+    """In-memory chain behind the TronGrid REST and node API paths the service calls.
+
+    A block is produced every block_interval seconds and is solid at once. It
+    holds every deposit submitted and every transaction broadcast since the
+    previous block, all successful. Transfer listings page oldest first with
+    the position in the address's history as the fingerprint. Accounts have
+    ample TRX and energy, so fees never defer a withdrawal.
+    """
+
+    def __init__(self, block_interval: float = BLOCK_INTERVAL, start_block: int = 60_000_000, **kwargs):
+        super().__init__(**kwargs)
+        from tronpy.keys import to_hex_address
+        self._to_hex = to_hex_address
+        self.block_interval = block_interval
+        self.start_block = start_block
+
+        self._blocks: List[Dict[str, Any]] = []
+        self._pending_transfers: List[Dict[str, Any]] = []
+        self._pending_txids: List[str] = []
+        # address -> (block timestamps, transfer rows), both in chain order
+        self._history: Dict[str, Tuple[List[int], List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._contract_hex = to_hex_address(USDT_CONTRACT)[2:]
+        self._produce_block()
+
+    def endpoint(self, method: str, path: str) -> str:
+        if path.startswith('v1/accounts/'):
+            return f"{method} v1/accounts/{{address}}/{path.split('/', 3)[-1]}"
+        return f"{method} {path}"
+
+    def start(self):
+        super().start()
+        threading.Thread(target=self._produce_blocks, name='fake-chain', daemon=True).start()
+
+    def stop(self):
+        self._stopping.set()
+        super().stop()
+
+    def _produce_blocks(self):
+        while not self._stopping.wait(self.block_interval):
+            self._produce_block()
+
+    def _topic(self, address: str) -> str:
+        return self._to_hex(address)[2:].rjust(64, '0')
+
+    def _produce_block(self):
+        with self._lock:
+            number = self.start_block + len(self._blocks)
+            timestamp = int(time.time() * 1000)
+            block_id = f"{number:016x}" + hashlib.sha256(f"{number}:{timestamp}".encode()).hexdigest()[16:]
+
+            infos = []
+            for transfer in self._pending_transfers:
+                row = {
+                    'transaction_id': transfer['txid'],
+                    'token_info': {'symbol': 'USDT', 'address': USDT_CONTRACT, 'decimals': 6, 'name': 'Tether USD'},
+                    'block_timestamp': timestamp,
+                    'from': transfer['from'],
+                    'to': transfer['to'],
+                    'type': 'Transfer',
+                    'value': str(transfer['value']),
+                }
+                for address in {transfer['from'], transfer['to']}:
+                    timestamps, rows = self._history.setdefault(address, ([], []))
+                    timestamps.append(timestamp)
+                    rows.append(row)
+                infos.append({
+                    'id': transfer['txid'], 'blockNumber': number, 'blockTimeStamp': timestamp,
+                    'contract_address': f"41{self._contract_hex}",
+                    'receipt': {'result': 'SUCCESS', 'energy_usage_total': 14650},
+                    'log': [{
+                        'address': self._contract_hex,
+                        'topics': [TRANSFER_TOPIC, self._topic(transfer['from']), self._topic(transfer['to'])],
+                        'data': f"{transfer['value']:064x}",
+                    }],
+                })
+            for txid in self._pending_txids:
+                infos.append({'id': txid, 'blockNumber': number, 'blockTimeStamp': timestamp,
+                              'receipt': {'result': 'SUCCESS', 'energy_usage_total': 14650}})
+
+            self._blocks.append({'number': number, 'timestamp': timestamp, 'id': block_id, 'infos': infos})
+            self._pending_transfers, self._pending_txids = [], []
+
+    def submit_deposit(self, sender: str, to: str, value_sun: int) -> str:
+        """Queue a USDT transfer for the next block, returning its txid"""
+        txid = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+        with self._lock:
+            self._pending_transfers.append({'txid': txid, 'from': sender, 'to': to, 'value': value_sun})
+        return txid
+
+    def head(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._blocks[-1]
+
+    def _block(self, number: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            index = number - self.start_block
+            return self._blocks[index] if 0 <= index < len(self._blocks) else None
+
+    def _transfer_page(self, address: str, query: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            timestamps, rows = self._history.get(address, ([], []))
+            end = len(rows)
+        only_to = query.get('only_to') == 'true'
+        only_from = query.get('only_from') == 'true'
+        contract = query.get('contract_address')
+
+        position = max(bisect.bisect_left(timestamps, int(query.get('min_timestamp') or 0), 0, end),
+                       int(query.get('fingerprint') or 0))
+        if query.get('max_timestamp'):
+            end = bisect.bisect_right(timestamps, int(query['max_timestamp']), 0, end)
+        limit = min(int(query.get('limit') or 20), 200)
+
+        page = []
+        while position < end and len(page) < limit:
+            row = rows[position]
+            position += 1
+            if (only_to and row['to'] != address) or (only_from and row['from'] != address):
+                continue
+            if contract and row['token_info']['address'] != contract:
+                continue
+            page.append(row)
+
+        meta = {'at': int(time.time() * 1000), 'page_size': len(page)}
+        if position < end:
+            meta['fingerprint'] = str(position)
+        return {'data': page, 'success': True, 'meta': meta}
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        body = body or {}
+        if method == 'GET' and path.startswith('v1/accounts/') and path.endswith('/transactions/trc20'):
+            return 200, self._transfer_page(path.split('/')[2], query)
+
+        if path in ('walletsolidity/getnowblock', 'wallet/getnowblock'):
+            head = self.head()
+            return 200, {'blockID': head['id'],
+                         'block_header': {'raw_data': {'number': head['number'], 'timestamp': head['timestamp']}}}
+        if path == 'wallet/getnodeinfo':
+            head = self.head()
+            return 200, {'block': f"Num:{head['number']},ID:{head['id']}",
+                         'solidityBlock': f"Num:{head['number']},ID:{head['id']}"}
+        if path == 'walletsolidity/gettransactioninfobyblocknum':
+            block = self._block(int(body.get('num', -1)))
+            return 200, block['infos'] if block else []
+
+        if path == 'wallet/getsignweight':
+            # Stands in for the txid tronpy computes itself when protobuf is installed
+            raw_data = body['raw_data']
+            txid = hashlib.sha256(json.dumps(raw_data, sort_keys=True).encode()).hexdigest()
+            owner = raw_data['contract'][0]['parameter']['value']['owner_address']
+            return 200, {
+                'permission': {'type': 'Owner', 'permission_name': 'owner', 'threshold': 1,
+                               'keys': [{'address': owner, 'weight': 1}]},
+                'current_weight': 0,
+                'transaction': {'result': {'result': True}, 'txid': txid,
+                                'transaction': {'txID': txid, 'raw_data': raw_data}},
+            }
+        if path == 'wallet/broadcasttransaction':
+            if not body.get('txID') or not body.get('signature'):
+                return 200, {'result': False, 'code': 'SIGERROR', 'message': b'Validate signature error'.hex()}
+            with self._lock:
+                self._pending_txids.append(body['txID'])
+            return 200, {'result': True, 'txid': body['txID']}
+
+        if path == 'wallet/triggerconstantcontract':
+            return 200, {'result': {'result': True}, 'energy_used': 14650, 'constant_result': [f"{1:064x}"]}
+        if path == 'wallet/getchainparameters':
+            return 200, {'chainParameter': [{'key': 'getEnergyFee', 'value': 420}]}
+        if path == 'wallet/getaccountresource':
+            return 200, {'EnergyLimit': 10 ** 12, 'EnergyUsed': 0}
+        if path == 'wallet/getaccount':
+            return 200, {'address': body.get('address'), 'balance': 10 ** 15}
+
+        return 404, {'Error': f"{path} is not served by the benchmark TronGrid"}
+
+
+class FakePostgREST(StandIn):
+    """In-memory Supabase REST tables for trc20_service.py.
+
+    Supports what the service sends: GET and PATCH on /rest/v1/<table> with
+    column=eq.value filters, PATCH answering 204 like PostgREST without a
+    Prefer header. Every user_wallets update is timed as that user's credit.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.credited_at: Dict[str, float] = {}
+        self._indexes: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = {}
+        self._data_lock = threading.Lock()
+
+    def endpoint(self, method: str, path: str) -> str:
+        return f"{method} {path.rsplit('/', 1)[-1]}"
+
+    def load(self, table: str, rows: List[Dict[str, Any]], indexed: Tuple[str, ...] = ('id', 'user_email')):
+        """Replace a table, indexing the columns lookups filter on"""
+        with self._data_lock:
+            self.tables[table] = rows
+            for column in indexed:
+                index: Dict[str, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    if column in row:
+                        index.setdefault(str(row[column]), []).append(row)
+                self._indexes[(table, column)] = index
+
+    def rows(self, table: str, **filters) -> List[Dict[str, Any]]:
+        """Matching rows, read directly rather than over HTTP"""
+        with self._data_lock:
+            return [dict(row) for row in self._select(table, {k: str(v) for k, v in filters.items()})]
+
+    def _select(self, table: str, filters: Dict[str, str]) -> List[Dict[str, Any]]:
+        candidates = self.tables[table]
+        for column, value in filters.items():
+            index = self._indexes.get((table, column))
+            if index is not None:
+                candidates = index.get(value, [])
+                break
+        return [row for row in candidates if all(str(row.get(c)) == v for c, v in filters.items())]
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        table = path[len('rest/v1/'):] if path.startswith('rest/v1/') else None
+        if table not in self.tables:
+            return 404, {'message': f"relation \"{table}\" does not exist"}
+        filters = {column: value[3:] for column, value in query.items() if value.startswith('eq.')}
+
+        with self._data_lock:
+            rows = self._select(table, filters)
+            if method == 'GET':
+                return 200, [dict(row) for row in rows]
+            if method == 'PATCH':
+                for row in rows:
+                    row.update(body or {})
+                    if table == 'user_wallets':
+                        self.credited_at[row['user_email']] = time.time()
+                return 204, None
+        return 405, {'message': f"{method} is not supported"}
+
+
+class RoundTripCounter:
+    """Thread-safe count of database round trips"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, count: int = 1):
+        with self._lock:
+            self.value += count
+
+
+def counting_connection(counter: RoundTripCounter, schema: str):
+    """psycopg2 connection class that counts round trips and works in the bench schema.
+
+    Every statement is one round trip, plus one for the BEGIN psycopg2 sends
+    before the first statement of a transaction; COMMIT and ROLLBACK count only
+    when a transaction is open (otherwise psycopg2 sends nothing). FETCHes of
+    server-side cursors, used only by the startup warm-ups, are not counted.
+    """
+    from psycopg2 import extensions
+
+    cursor_classes = {}
+
+    def counting_cursor(base):
+        if base not in cursor_classes:
+            class CountingCursor(base):
+                def execute(self, query, vars=None):
+                    counter.add(self.connection.statement_round_trips())
+                    return super().execute(query, vars)
+
+                def executemany(self, query, vars_list):
+                    vars_list = list(vars_list)
+                    counter.add(self.connection.statement_round_trips() + max(0, len(vars_list) - 1))
+                    return super().executemany(query, vars_list)
+
+            cursor_classes[base] = CountingCursor
+        return cursor_classes[base]
+
+    class CountingConnection(extensions.connection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            cur = extensions.connection.cursor(self)
+            cur.execute(f"SET search_path TO {schema}")
+            cur.close()
+            extensions.connection.commit(self)
+
+        def statement_round_trips(self) -> int:
+            idle = self.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+            return 2 if idle and not self.autocommit else 1
+
+        def cursor(self, *args, **kwargs):
+            kwargs['cursor_factory'] = counting_cursor(
+                kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+            )
+            return super().cursor(*args, **kwargs)
+
+        def commit(self):
+            if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                counter.add()
+            super().commit()
+
+        def rollback(self):
+            if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                counter.add()
+            super().rollback()
+
+    return CountingConnection
+
+
+def run_until(service, watcher: Callable[[threading.Event], None]):
+    """Run service.start_monitoring() on this thread until watcher returns, then stop it.
+
+    start_monitoring installs a signal handler, which only the main thread may
+    do, so the watcher (load generation and progress checks) gets the thread.
+    """
+    finished = threading.Event()
+
+    def watch():
+        try:
+            watcher(finished)
+        except Exception:
+            logger.exception("Benchmark watcher failed")
+        # stop() is a no-op until the engine's loop is up, so repeat it until the service returns
+        while not finished.is_set():
+            engine = getattr(service, 'engine', None)
+            if engine is not None:
+                engine.stop()
+            finished.wait(0.5)
+
+    thread = threading.Thread(target=watch, name='bench-watcher', daemon=True)
+    thread.start()
+    try:
+        service.start_monitoring()
+    finally:
+        finished.set()
+        thread.join()
+
+
+def feed_deposits(chain: FakeTronGrid, to_address: str, count: int, rate: float, rng: random.Random):
+    """Submit count deposits to the chain at rate per second (0: all at once)"""
+    senders = [random_address(rng) for _ in range(min(count, 100))]
+    started = time.monotonic()
+    for i in range(count):
+        if rate > 0:
+            delay = started + i / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        value = rng.randint(10, 1000) * SUN_PER_USDT + rng.randint(0, 99) * 10_000
+        chain.submit_deposit(senders[i % len(senders)], to_address, value)
+
+
+def bench_main(args, chain: FakeTronGrid, rest: FakePostgREST, work_dir: str,
+               rng: random.Random) -> Dict[str, Any]:
+    """Deposits, then withdrawals, through main.py's full monitoring loop"""
+    import psycopg2
+    from psycopg2.extensions import parse_dsn
+    from psycopg2.extras import execute_values
+    from tronpy.keys import PrivateKey
+
+    dsn = parse_dsn(args.dsn)
+    key = PrivateKey(bytes(rng.getrandbits(8) for _ in range(32)))
+    wallet = key.public_key.to_base58check_address()
+
+    with open(os.path.join(work_dir, 'usdt_contract_abi.json'), 'w') as f:
+        json.dump({'address': USDT_CONTRACT, 'name': 'TetherToken', 'abi': USDT_ABI,
+                   'user_resource_percent': 100, 'origin_energy_limit': 1}, f)
+
+    # Explicit values for everything that would otherwise come from .env and
+    # point the service at real infrastructure
+    os.environ.update({
+        'TRONGRID_URL': chain.url,
+        'TRON_PROVIDERS': chain.url,
+        'TRONGRID_RATE_PER_KEY': str(args.tron_rate or 1_000_000),
+        'CHAIN_CACHE_FILE': '',
+        'METRICS_PORT': '',
+        'INGESTION_MODE': 'poll',
+        'TRON_MAIN_WALLET_ADDRESS': wallet,
+        'TRON_MAIN_WALLET_PRIVATE_KEY': '',
+        'MIN_CONFIRMATIONS': str(args.min_confirmations),
+        'MIN_DEPOSIT_AMOUNT': '1',
+        'MAX_DEPOSIT_AMOUNT': '1000000',
+        'MONITORING_INTERVAL': str(args.interval),
+        'ADDRESS_MONITOR_INTERVAL': str(args.interval),
+        'WITHDRAWAL_INTERVAL': str(args.interval),
+        'ADDRESS_POOL_LOW': '0',
+        'SCAN_LOOKBACK_HOURS': '1',
+        'SCAN_CURSOR_FILE': os.path.join(work_dir, 'trc20_scan_cursor.json'),
+        'BLOCK_CURSOR_FILE': os.path.join(work_dir, 'trc20_block_cursor.json'),
+        'ABI_CACHE_FILE': os.path.join(work_dir, 'usdt_contract_abi.json'),
+        'PROFILE_DIR': os.path.join(work_dir, 'profiles'),
+        'DB_HOST': dsn.get('host', 'localhost'),
+        'DB_PORT': dsn.get('port', '5432'),
+        'DB_NAME': dsn.get('dbname', ''),
+        'DB_USER': dsn.get('user', ''),
+        'DB_PASSWORD': dsn.get('password', ''),
+        'NEXT_PUBLIC_SUPABASE_URL': rest.url,
+        'SUPABASE_SERVICE_ROLE_KEY': 'benchmark',
+    })
+    import main
+
+    admin = psycopg2.connect(args.dsn)
+    with admin.cursor() as cur:
+        cur.execute(BENCH_SCHEMA_SQL.format(schema=args.schema))
+    admin.commit()
+
+    def new_service(counter: RoundTripCounter):
+        service = main.TRC20AutomationService()
+        service.db_pool.db_config = {**service.db_pool.db_config,
+                                     'connection_factory': counting_connection(counter, args.schema)}
+        return service
+
+    # Deposits: a burst (or a steady rate) of transfers to the main wallet,
+    # done when every one has been credited
+    counter = RoundTripCounter()
+    service = new_service(counter)
+    credits: List[Tuple[float, float]] = []
+    observe = service._observe_credit_latency
+
+    def record_credit(block_timestamp: Optional[int]):
+        observe(block_timestamp)
+        if block_timestamp:
+            credits.append((time.time(), max(0.0, time.time() - block_timestamp / 1000)))
+    service._observe_credit_latency = record_credit
+
+    tron_before = chain.total_requests()
+    deposit_started = time.time()
+
+    def deposits_watcher(finished: threading.Event):
+        feed_deposits(chain, wallet, args.deposits, args.deposit_rate, rng)
+        _wait_for(lambda: len(credits) >= args.deposits or finished.is_set(),
+                  time.monotonic() + args.timeout)
+
+    run_until(service, deposits_watcher)
+    latencies = [latency for _, latency in credits]
+    deposit_elapsed = (credits[-1][0] if credits else time.time()) - deposit_started
+    results = {
+        'deposits_credited': len(credits),
+        'deposits_per_second': len(credits) / max(deposit_elapsed, 0.001),
+        'credit_latency_p50_seconds': percentile(latencies, 50),
+        'credit_latency_p99_seconds': percentile(latencies, 99),
+        'db_round_trips_per_deposit': counter.value / max(len(credits), 1),
+        'tron_requests_per_deposit': (chain.total_requests() - tron_before) / max(len(credits), 1),
+    }
+
+    # Withdrawals: pending rows for the withdrawal job, done when all are confirmed
+    if args.withdrawals:
+        with admin.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO {args.schema}.trc20_withdrawals (user_email, to_address, amount)
+                VALUES %s
+            """, [(f"bench{i}@example.com", random_address(rng), rng.randint(10, 500))
+                  for i in range(args.withdrawals)])
+        admin.commit()
+
+        os.environ['TRON_MAIN_WALLET_PRIVATE_KEY'] = key.hex()
+        counter = RoundTripCounter()
+        service = new_service(counter)
+        progress = {'confirmed': 0, 'failed': 0, 'confirmed_at': time.time()}
+        tron_before = chain.total_requests()
+        withdrawal_started = time.time()
+
+        def withdrawals_watcher(finished: threading.Event):
+            deadline = time.monotonic() + args.timeout
+            while not finished.is_set() and time.monotonic() < deadline:
+                with admin.cursor() as cur:
+                    cur.execute(f"""
+                        SELECT COUNT(*) FILTER (WHERE status = 'confirmed'),
+                               COUNT(*) FILTER (WHERE status = 'failed')
+                        FROM {args.schema}.trc20_withdrawals
+                    """)
+                    confirmed, failed = cur.fetchone()
+                admin.rollback()
+                if confirmed > progress['confirmed']:
+                    progress['confirmed_at'] = time.time()
+                progress.update(confirmed=confirmed, failed=failed)
+                if confirmed + failed >= args.withdrawals:
+                    return
+                time.sleep(0.25)
+
+        run_until(service, withdrawals_watcher)
+        confirmed = progress['confirmed']
+        results.update({
+            'withdrawals_confirmed': confirmed,
+            'withdrawals_failed': progress['failed'],
+            'withdrawals_per_second': confirmed / max(progress['confirmed_at'] - withdrawal_started, 0.001),
+            'db_round_trips_per_withdrawal': counter.value / max(confirmed, 1),
+            'tron_requests_per_withdrawal': (chain.total_requests() - tron_before) / max(confirmed, 1),
+        })
+
+    admin.close()
+    results['complete'] = (results['deposits_credited'] >= args.deposits and
+                           results.get('withdrawals_confirmed', 0) >= args.withdrawals)
+    return results
+
+
+def bench_trc20_service(args, rest: FakePostgREST, rng: random.Random) -> Dict[str, Any]:
+    """Deposit approvals, then withdrawal cycles, through trc20_service.py's async cycles"""
+    os.environ.update({
+        'NEXT_PUBLIC_SUPABASE_URL': rest.url,
+        'SUPABASE_SERVICE_ROLE_KEY': 'benchmark',
+        'METRICS_PORT': '',
+    })
+    import trc20_service
+    from async_engine import AsyncEngine
+
+    now = datetime.now(timezone.utc)
+    users = [f"bench{i}@example.com" for i in range(args.deposits)]
+    rest.load('user_wallets', [{'user_email': user, 'balance': 0.0} for user in users])
+    rest.load('withdrawal_requests', [{
+        'id': str(uuid.uuid4()), 'user_email': users[i % len(users)] if users else 'bench@example.com',
+        'amount': rng.randint(10, 500), 'destination_address': random_address(rng), 'status': 'pending',
+        'method_id': 'usdt-trc20', 'created_at': (now - timedelta(minutes=5)).isoformat(),
+    } for i in range(args.withdrawals)])
+    rest.load('deposits', [{
+        'id': str(uuid.uuid4()), 'user_email': user, 'amount': rng.randint(10, 1000), 'status': 'pending',
+        'method_id': 'usdt-trc20', 'transaction_hash': hashlib.sha256(uuid.uuid4().bytes).hexdigest(),
+        'created_at': now.isoformat(),
+    } for user in users])
+    deposits_loaded = time.time()
+
+    service = trc20_service.TRC20AutomationService()
+    service.engine = AsyncEngine(limits={'supabase': args.supabase_concurrency},
+                                 call_timeout=float(args.timeout))
+
+    async def run_deposits():
+        await service.run_deposit_cycle_async()
+        # Deposits are only credited on manual approval; approve each as the admin panel would
+        pending = rest.rows('deposits', status='pending')
+        await service.engine.gather(
+            'supabase', lambda d: service.approve_deposit(d['id'], d['amount'], d['user_email']), pending
+        )
+
+    async def run_withdrawals():
+        deadline = time.monotonic() + args.timeout
+        while rest.rows('withdrawal_requests', status='pending') and time.monotonic() < deadline:
+            await service.run_withdrawal_cycle_async()
+
+    requests_before = rest.total_requests()
+    asyncio.run(run_deposits())
+    deposit_requests = rest.total_requests() - requests_before
+    credited = [rest.credited_at[user] for user in users if user in rest.credited_at]
+    latencies = [credited_at - deposits_loaded for credited_at in credited]
+    results = {
+        'deposits_credited': len(credited),
+        'deposits_per_second': len(credited) / max((max(credited) if credited else time.time()) - deposits_loaded,
+                                                   0.001),
+        'credit_latency_p50_seconds': percentile(latencies, 50),
+        'credit_latency_p99_seconds': percentile(latencies, 99),
+        'db_round_trips_per_deposit': deposit_requests / max(len(credited), 1),
+    }
+
+    if args.withdrawals:
+        requests_before = rest.total_requests()
+        started = time.time()
+        asyncio.run(run_withdrawals())
+        elapsed = time.time() - started
+        completed = len(rest.rows('withdrawal_requests', status='completed'))
+        results.update({
+            'withdrawals_confirmed': completed,
+            'withdrawals_per_second': completed / max(elapsed, 0.001),
+            'db_round_trips_per_withdrawal': (rest.total_requests() - requests_before) / max(completed, 1),
+        })
+
+    results['complete'] = (results['deposits_credited'] >= args.deposits and
+                           results.get('withdrawals_confirmed', 0) >= args.withdrawals)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], params: Dict[str, Any],
+            tolerance: float) -> Tuple[List[str], List[str]]:
+    """Return (regressions, notes) of results against a stored baseline"""
+    regressions, notes = [], []
+    for name, metrics in results.items():
+        stored = baseline.get('results', {}).get(name)
+        if not stored:
+            notes.append(f"{name}: no baseline")
+            continue
+        if stored.get('params') != params:
+            notes.append(f"{name}: baseline recorded with {stored.get('params')}, not compared")
+            continue
+        for metric, value in metrics.items():
+            base = stored['metrics'].get(metric)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not base:
+                continue
+            if metric.endswith(('_credited', '_confirmed', '_failed')):
+                continue
+            change = (value - base) / base
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {value:.3f} vs baseline {base:.3f} ({change:+.0%})")
+    return regressions, notes
+
+
+def render(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any]) -> str:
+    """Text table of the results beside their baselines"""
+    lines = [f"{'service':<15} {'metric':<32} {'value':>12} {'baseline':>12} {'change':>8}"]
+    for name, metrics in results.items():
+        stored = baseline.get('results', {}).get(name, {}).get('metrics', {})
+        for metric, value in metrics.items():
+            if isinstance(value, bool) or value is None:
+                lines.append(f"{name:<15} {metric:<32} {str(value):>12}")
+                continue
+            base = stored.get(metric)
+            change = f"{(value - base) / base:+.0%}" if isinstance(base, (int, float)) and base else ''
+            value_text, base_text = (f"{v:.3f}" if isinstance(v, float) else str(v if v is not None else '')
+                                     for v in (value, base))
+            lines.append(f"{name:<15} {metric:<32} {value_text:>12} {base_text:>12} {change:>8}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description="End-to-end throughput benchmark against a local fake TronGrid and Supabase REST"
+    )
+    parser.add_argument('--service', choices=['main', 'trc20_service', 'all'], default='all')
+    parser.add_argument('--deposits', type=int, default=2000)
+    parser.add_argument('--withdrawals', type=int, default=200)
+    parser.add_argument('--deposit-rate', type=float, default=0, help="deposits per second (0: one burst)")
+    parser.add_argument('--min-confirmations', type=int, default=1)
+    parser.add_argument('--interval', type=int, default=1, help="main.py polling intervals in seconds")
+    parser.add_argument('--tron-rate', type=float, default=0, help="TronGrid requests/s allowed (0: unlimited)")
+    parser.add_argument('--supabase-concurrency', type=int, default=8)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="disposable PostgreSQL 13+ database for main.py (never the production one)")
+    parser.add_argument('--schema', default='trc20_bench', help="schema dropped and recreated for the run")
+    parser.add_argument('--timeout', type=int, default=600, help="seconds allowed per phase")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=os.getenv('BENCH_BASELINE_FILE', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')))
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed change against the baseline")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--log-level', default='WARNING', help="service log level during the run")
+    args = parser.parse_args()
+
+    services = ['main', 'trc20_service'] if args.service == 'all' else [args.service]
+    if 'main' in services and not args.dsn:
+        if args.service == 'main':
+            parser.error("main.py needs a PostgreSQL database: pass --dsn or set BENCH_DATABASE_URL")
+        print("Skipping main.py: no --dsn or BENCH_DATABASE_URL for a disposable PostgreSQL database")
+        services.remove('main')
+
+    args.baseline = os.path.abspath(args.baseline)
+    args.output = os.path.abspath(args.output) if args.output else None
+
+    # Logs, cursors and the ABI cache of the run stay out of the working tree
+    work_dir = tempfile.mkdtemp(prefix='trc20-bench-')
+    os.chdir(work_dir)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler('trc20_automation.log'), logging.StreamHandler()])
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    params = {'deposits': args.deposits, 'withdrawals': args.withdrawals, 'deposit_rate': args.deposit_rate,
+              'min_confirmations': args.min_confirmations, 'interval': args.interval,
+              'supabase_concurrency': args.supabase_concurrency}
+    rng = random.Random(args.seed)
+    rest = FakePostgREST()
+    rest.start()
+    results = {}
+    try:
+        if 'main' in services:
+            chain = FakeTronGrid()
+            chain.start()
+            try:
+                results['main'] = bench_main(args, chain, rest, work_dir, rng)
+            finally:
+                chain.stop()
+                logger.info(f"TronGrid stand-in requests: {chain.request_counts()}")
+        if 'trc20_service' in services:
+            results['trc20_service'] = bench_trc20_service(args, rest, rng)
+    finally:
+        rest.stop()
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    print(f"\nTRC20 automation benchmark: {args.deposits} deposits, {args.withdrawals} withdrawals, "
+          f"{args.min_confirmations} confirmation(s); logs in {work_dir}")
+    print(render(results, baseline))
+
+    regressions, notes = compare(results, baseline, params, args.tolerance)
+    for note in notes:
+        print(f"Baseline: {note}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    incomplete = [name for name, metrics in results.items() if not metrics['complete']]
+    for name in incomplete:
+        print(f"INCOMPLETE {name}: the load did not finish within {args.timeout}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2)
+    if args.save_baseline and not incomplete:
+        baseline.setdefault('results', {}).update({
+            name: {'params': params, 'metrics': metrics, 'recorded_at': datetime.now(timezone.utc).isoformat()}
+            for name, metrics in results.items()
+        })
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+
+    return 1 if regressions or incomplete else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
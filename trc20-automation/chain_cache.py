@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Chain Data Cache for TRC20 Automation Service
+Keeps solid (immutable) TRON responses in a local SQLite file so replays run at disk speed
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Node API reads whose answers never change once returned by a solidity node
+SOLID_PATHS = {
+    'walletsolidity/gettransactioninfobyblocknum',
+    'walletsolidity/gettransactioninfobyid',
+    'walletsolidity/gettransactionbyid',
+    'walletsolidity/getblockbynum',
+}
+TRANSFER_PAGE_SUFFIX = '/transactions/trc20'
+
+
+class ChainCache:
+    """Size-bounded key/value store of zlib-compressed JSON in SQLite.
+
+    Entries are kept until the file grows past max_bytes, then the least
+    recently read ones are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS chain_cache (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chain_cache_accessed ON chain_cache (accessed);
+            """)
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chain_cache").fetchone()[0]
+        self._stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM chain_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE chain_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._stats['hits'] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting the least recently read entries when over the size limit"""
+        payload = zlib.compress(json.dumps(value, separators=(',', ':')).encode(), 6)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM chain_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO chain_cache VALUES (?, ?, ?, ?)",
+                               (key, payload, len(payload), time.time()))
+            self._bytes += len(payload) - (old[0] if old else 0)
+            self._stats['stored'] += 1
+            if self._bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int):
+        """Delete least recently read entries until the cache fits target_bytes (lock held)"""
+        freed = evicted = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM chain_cache ORDER BY accessed"):
+            if self._bytes - freed <= target_bytes:
+                break
+            victims.append((key,))
+            freed += size
+            evicted += 1
+        self._conn.executemany("DELETE FROM chain_cache WHERE key = ?", victims)
+        self._bytes -= freed
+        self._stats['evicted'] += evicted
+        logger.debug(f"Chain cache evicted {evicted} entries ({freed} bytes)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the stored size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['bytes'] = self._bytes
+        return stats
+
+
+class CachedProvider:
+    """Serves solid reads from a ChainCache in front of a TronGridClient or ProviderPool.
+
+    Cached: the walletsolidity reads in SOLID_PATHS, and TRC20 transfer pages
+    whose max_timestamp is at least solid_age seconds old (so every transfer in
+    them is solid). Empty answers are not cached, because a solidity node also
+    answers empty for data it has not reached yet. Everything else, including
+    broadcasts and head lookups, goes straight to the wrapped provider.
+    """
+
+    def __init__(self, provider: Any, cache: ChainCache, solid_age: float = 300):
+        self.provider = provider
+        self.cache = cache
+        self.solid_age = solid_age
+        self.base_url = provider.base_url
+        self.timeout = provider.timeout
+
+    def _cache_key(self, method: str, path: str, params: Optional[Dict], json_body: Optional[Any]) -> Optional[str]:
+        path = path.strip('/')
+        if method == 'POST' and path in SOLID_PATHS:
+            return f"{path}?{json.dumps(json_body or {}, sort_keys=True)}"
+        if method == 'GET' and path.endswith(TRANSFER_PAGE_SUFFIX) and params:
+            max_timestamp = params.get('max_timestamp')
+            if max_timestamp is not None and int(max_timestamp) < (time.time() - self.solid_age) * 1000:
+                return f"{path}?{json.dumps(params, sort_keys=True, default=str)}"
+        return None
+
+    @staticmethod
+    def _is_complete(result: Any) -> bool:
+        """False for empty answers and error bodies, which must not be kept"""
+        if isinstance(result, dict):
+            return bool(result) and 'Error' not in result and result.get('data', True) != []
+        return bool(result)
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None,
+                json: Optional[Any] = None) -> Any:
+        """Answer from the cache when the read is solid, otherwise from the provider"""
+        key = self._cache_key(method, path, params, json)
+        if key is None:
+            return self.provider.request(method, path, params=params, json=json)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.provider.request(method, path, params=params, json=json)
+        if self._is_complete(result):
+            try:
+                self.cache.put(key, result)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not cache {path}: {e}")
+        return result
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Any:
+        """GET a TronGrid REST path, from the cache when solid"""
+        return self.request('GET', path, params=params)
+
+    def post(self, path: str, payload: Optional[Dict] = None) -> Any:
+        """POST to a node API path, from the cache when solid"""
+        return self.request('POST', path, json=payload or {})
+
+    def pinned(self) -> 'CachedProvider':
+        """Return a cached provider whose uncached reads all go to one node"""
+        return CachedProvider(self.provider.pinned(), self.cache, self.solid_age)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the provider's stats with the cache's"""
+        stats = self.provider.stats()
+        stats['cache'] = self.cache.stats()
+        return stats
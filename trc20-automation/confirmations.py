@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Confirmation Service for TRC20 Automation Service
+Counts confirmations against a solid head fetched once per block
+"""
+
+import heapq
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# TRON produces a block every 3 seconds
+BLOCK_INTERVAL_MS = 3000
+
+
+class ConfirmationService:
+    """Confirmation counts for transfers without a TronGrid call per transfer.
+
+    The solid head is cached and refreshed at most once per block interval.
+    A transfer's block number comes from the payload when present (event and
+    block-scan payloads carry it); otherwise it is derived from the transfer's
+    block_timestamp against the head's timestamp. Transfers newer than the solid
+    head always count as unconfirmed. An estimate is only good enough to decide
+    when to look a transfer up; it is never enough to credit it.
+    """
+
+    def __init__(self, fetch_solid_head: Callable[[], Dict[str, int]], refresh_seconds: float = 3.0):
+        self.fetch_solid_head = fetch_solid_head
+        self.refresh_seconds = refresh_seconds
+
+        self._head: Optional[Dict[str, int]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.head_fetches = 0
+
+    def refresh(self, force: bool = False) -> Optional[Dict[str, int]]:
+        """Fetch the solid head if the cached one is older than one block"""
+        with self._lock:
+            if not force and self._head and time.monotonic() - self._fetched_at < self.refresh_seconds:
+                return self._head
+            try:
+                self._head = self.fetch_solid_head()
+                self._fetched_at = time.monotonic()
+                self.head_fetches += 1
+            except Exception as e:
+                logger.error(f"Error fetching solid head block: {e}")
+            return self._head
+
+    @property
+    def cached_head(self) -> Optional[Dict[str, int]]:
+        """Return the cached solid head without fetching"""
+        return self._head
+
+    @property
+    def head(self) -> Optional[Dict[str, int]]:
+        """Return the cached solid head, fetching it if it is stale"""
+        return self.refresh()
+
+    def block_number(self, tx: Dict[str, Any]) -> Optional[int]:
+        """Block number of a transfer, from its payload or estimated from its timestamp"""
+        for key in ('block_number', 'blockNumber', 'block'):
+            if tx.get(key) is not None:
+                return int(tx[key])
+
+        head = self.head
+        block_timestamp = tx.get('block_timestamp')
+        if not head or not block_timestamp:
+            return None
+
+        # Negative for transfers newer than the head, which places them above it
+        elapsed_ms = head['timestamp'] - int(block_timestamp)
+        return head['number'] - elapsed_ms // BLOCK_INTERVAL_MS
+
+    def confirmations(self, tx: Dict[str, Any]) -> int:
+        """Number of solid blocks on top of the transfer's block"""
+        head = self.head
+        block_number = self.block_number(tx)
+        if not head or block_number is None:
+            return 0
+        return max(0, head['number'] - block_number)
+
+
+class PendingConfirmationQueue:
+    """Pending deposits ordered by block number, released once they are deep enough.
+
+    Entries are dicts with at least id, transaction_hash, amount, block_number and
+    block_timestamp (ms); solid is true once block_number comes from a solid
+    receipt rather than an estimate. Time-to-credit is measured from
+    block_timestamp to the moment an entry is released.
+    """
+
+    def __init__(self, min_confirmations: int):
+        self.min_confirmations = min_confirmations
+
+        self._heap: List = []
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._credit_stats = {'credited': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, entry: Dict[str, Any]):
+        """Queue a pending deposit unless it is already queued"""
+        with self._lock:
+            if entry['transaction_hash'] in self._queued:
+                return
+            self._queued.add(entry['transaction_hash'])
+            heapq.heappush(self._heap, (entry['block_number'], entry['transaction_hash'], entry))
+
+    def pop_confirmed(self, head_number: int) -> List[Dict[str, Any]]:
+        """Remove and return every entry with at least min_confirmations below head_number"""
+        released = []
+        with self._lock:
+            while self._heap and head_number - self._heap[0][0] >= self.min_confirmations:
+                _, tx_hash, entry = heapq.heappop(self._heap)
+                self._queued.discard(tx_hash)
+                released.append(entry)
+        return released
+
+    def record_credited(self, entries: List[Dict[str, Any]]):
+        """Record time-to-credit for entries that were promoted"""
+        now_ms = time.time() * 1000
+        with self._lock:
+            for entry in entries:
+                seconds = max(0.0, (now_ms - (entry.get('block_timestamp') or now_ms)) / 1000)
+                self._credit_stats['credited'] += 1
+                self._credit_stats['total_seconds'] += seconds
+                self._credit_stats['max_seconds'] = max(self._credit_stats['max_seconds'], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and time-to-credit metrics"""
+        with self._lock:
+            stats = dict(self._credit_stats)
+            stats['depth'] = len(self._heap)
+            stats['oldest_block'] = self._heap[0][0] if self._heap else None
+        stats['avg_seconds'] = stats['total_seconds'] / stats['credited'] if stats['credited'] else 0.0
+        return stats
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL Connection Pool for TRC20 Automation Service
+Shared, health-checked psycopg2 connections with pool-wait metrics
+"""
+
+import re
+import threading
+import time
+import logging
+import weakref
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, Sequence
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Hot queries, prepared on first use per connection and run with EXECUTE.
+# Server-side prepared statements need a session-level connection (Supabase's
+# direct port 5432 or a session-mode pooler); behind a transaction-mode pooler
+# such as pgbouncer on port 6543 they are sent as plain parameterised SQL.
+PREPARED_STATEMENTS = {
+    'filter_processed': """
+        SELECT transaction_hash FROM deposits
+        WHERE transaction_hash = ANY($1::text[])
+    """,
+    'complete_deposits': """
+        UPDATE deposits
+        SET status = 'completed',
+            confirmation_count = GREATEST(confirmation_count, required_confirmations),
+            updated_at = NOW(),
+            admin_notes = 'Auto-credited by TRC20 automation service'
+        WHERE id = ANY($1::uuid[]) AND status = 'pending'
+        RETURNING id, transaction_hash, amount
+    """,
+}
+
+
+PLACEHOLDER = re.compile(r'\$(\d+)')
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool shared by every service method"""
+
+    def __init__(self, db_config: Dict[str, Any], minconn: int = 1, maxconn: int = 10,
+                 statement_timeout_ms: int = 15000, acquire_timeout: float = 30.0,
+                 health_check_interval: float = 60.0,
+                 prepared_statements: Optional[Dict[str, str]] = None, prepare: bool = True):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statement_timeout_ms = statement_timeout_ms
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.prepared_statements = PREPARED_STATEMENTS if prepared_statements is None else prepared_statements
+        self.prepare = prepare
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Keyed by the connection itself, so the bookkeeping goes away with the
+        # connection and is never inherited by a new one that reuses its id()
+        self._last_used = weakref.WeakKeyDictionary()
+        self._prepared = weakref.WeakKeyDictionary()
+
+        # Pool-wait metrics
+        self._stats = {
+            'acquired': 0,
+            'timeouts': 0,
+            'discarded': 0,
+            'in_use': 0,
+            'wait_total_seconds': 0.0,
+            'wait_max_seconds': 0.0,
+        }
+
+    def _get_pool(self):
+        """Open the underlying pool on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn,
+                        options=f"-c statement_timeout={self.statement_timeout_ms}",
+                        **self.db_config
+                    )
+                    # psycopg2 closes any connection returned while minconn are idle;
+                    # keep every idle connection so busy periods do not reconnect
+                    # (minconn still sets how many are opened up front)
+                    self._pool.minconn = self.maxconn
+                    logger.info(f"Database pool opened ({self.minconn}-{self.maxconn} connections)")
+        return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        """Check a connection that has been idle longer than the health check interval"""
+        if conn.closed:
+            return False
+
+        # Connections the pool just opened have never been returned yet
+        last_used = self._last_used.get(conn)
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _count(self, key: str, delta=1):
+        """Update a pool metric"""
+        with self._stats_lock:
+            self._stats[key] += delta
+
+    def _discard(self, conn):
+        """Close a broken connection and drop its bookkeeping"""
+        self._prepared.pop(conn, None)
+        self._last_used.pop(conn, None)
+        self._count('discarded')
+        self._get_pool().putconn(conn, close=True)
+
+    def _checkout(self):
+        """Get a healthy connection from the pool"""
+        pool = self._get_pool()
+        for _ in range(self.maxconn + 1):
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                logger.warning("Discarding unhealthy database connection")
+                self._discard(conn)
+                continue
+            return conn
+        raise pg_pool.PoolError("No healthy database connection available")
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection; commits on success and rolls back on error"""
+        started = time.monotonic()
+        with span('db.wait'):
+            acquired = self._slots.acquire(timeout=self.acquire_timeout)
+        if not acquired:
+            self._count('timeouts')
+            raise pg_pool.PoolError(f"Timed out after {self.acquire_timeout}s waiting for a database connection")
+
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self._stats['acquired'] += 1
+            self._stats['wait_total_seconds'] += waited
+            self._stats['wait_max_seconds'] = max(self._stats['wait_max_seconds'], waited)
+
+        conn = None
+        try:
+            conn = self._checkout()
+            self._count('in_use')
+            with span('db.connection'):
+                yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if conn is not None:
+                self._count('in_use', -1)
+                self._discard(conn)
+                conn = None
+            raise
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._count('in_use', -1)
+                if conn.closed:
+                    self._discard(conn)
+                else:
+                    self._last_used[conn] = time.monotonic()
+                    self._get_pool().putconn(conn)
+            self._slots.release()
+
+    def execute_prepared(self, cur, name: str, params: Sequence[Any] = ()):
+        """Run a hot query, preparing it on the cursor's connection the first time"""
+        if not self.prepare:
+            # $n placeholders become psycopg2 named parameters
+            query = PLACEHOLDER.sub(r'%(\1)s', self.prepared_statements[name])
+            cur.execute(query, {str(i): value for i, value in enumerate(params, 1)})
+            return
+
+        prepared = self._prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {self.prepared_statements[name]}")
+            prepared.add(name)
+
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name}({placeholders})" if params else f"EXECUTE {name}", params)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool-wait metrics"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['maxconn'] = self.maxconn
+        stats['wait_avg_seconds'] = (
+            stats['wait_total_seconds'] / stats['acquired'] if stats['acquired'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._prepared.clear()
+                self._last_used.clear()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Event Ingestion for TRC20 Automation Service
+Receives pushed TRC20 Transfer events over a local HTTP webhook
+"""
+
+import hmac
+import json
+import time
+import heapq
+import queue
+import logging
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List
+
+from block_scanner import decode_transfer_logs
+
+logger = logging.getLogger(__name__)
+
+
+def _base58(address: str) -> str:
+    """Normalize a hex ('41…' or '0x…') or base58 address to base58"""
+    from tronpy.keys import to_base58check_address
+    if address.startswith('0x'):
+        return to_base58check_address('41' + address[2:].rjust(40, '0')[-40:])
+    if len(address) == 42 and address.startswith('41'):
+        return to_base58check_address(address)
+    return address
+
+
+def decode_transfer_event(event: Dict[str, Any], contract_address: str) -> List[Dict[str, Any]]:
+    """Decode one pushed event into TronGrid-style transfer dicts (empty if it is not a USDT transfer).
+
+    Accepts java-tron event plugin contractLogTrigger (topicList/data) and
+    contractEventTrigger (topicMap) payloads, and TronGrid event API rows
+    (event_name/result).
+    """
+    if event.get('removed'):
+        return []
+
+    # contractLogTrigger: raw log, decoded the same way as solid block receipts
+    if 'topicList' in event:
+        from tronpy.keys import to_hex_address
+        return decode_transfer_logs([{
+            'id': event.get('transactionId'),
+            'blockNumber': event.get('blockNumber'),
+            'blockTimeStamp': event.get('timeStamp'),
+            'log': [{
+                'address': to_hex_address(contract_address),
+                'topics': event.get('topicList', []),
+                'data': event.get('data'),
+            }],
+        }], contract_address) if _base58(event.get('contractAddress', '')) == contract_address else []
+
+    if 'topicMap' in event:
+        name = (event.get('eventSignature') or event.get('eventName') or '').split('(')[0]
+        fields = {**event.get('dataMap', {}), **event.get('topicMap', {})}
+        tx_id, contract = event.get('transactionId'), event.get('contractAddress')
+        block_number, block_timestamp = event.get('blockNumber'), event.get('timeStamp')
+    else:
+        name = event.get('event_name', '')
+        fields = event.get('result', {})
+        tx_id, contract = event.get('transaction_id'), event.get('contract_address')
+        block_number, block_timestamp = event.get('block_number'), event.get('block_timestamp')
+
+    # Without a block the deposit cannot be placed for confirmation; the reconciler picks it up
+    if name != 'Transfer' or _base58(contract or '') != contract_address or not tx_id:
+        return []
+    if block_number is None and not block_timestamp:
+        return []
+    try:
+        return [{
+            'transaction_id': tx_id,
+            'from': _base58(fields.get('from') or fields.get('0', '')),
+            'to': _base58(fields.get('to') or fields.get('1', '')),
+            'value': str(int(fields.get('value') or fields.get('2') or 0)),
+            'block_number': block_number,
+            'block_timestamp': block_timestamp,
+            'type': 'Transfer',
+            'token_info': {'address': contract_address, 'symbol': 'USDT', 'decimals': 6},
+        }]
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Skipping malformed Transfer event {tx_id}: {e}")
+        return []
+
+
+class EventReceiver:
+    """Local webhook that queues pushed Transfer events for the ingestion job.
+
+    POST a JSON event or a list of events (from a java-tron event plugin relay,
+    a queue consumer or a TronGrid-style webhook). Requests must carry the
+    shared secret in X-Webhook-Secret; the receiver does not start without one.
+    A POST is queued whole or not at all: if its transfers do not all fit, it
+    answers 503 and queues none, so the sender can retry the batch as is.
+
+    Pushed transfers are only hints: the ingestion job checks each one against
+    the solid node and defers those it cannot see yet. A transfer still
+    unverified verify_timeout seconds after it arrived is dropped and left to
+    the reconciler.
+    """
+
+    def __init__(self, contract_address: str, host: str = '127.0.0.1', port: int = 8787,
+                 secret: Optional[str] = None, max_queue: int = 100_000,
+                 retry_delay: float = 10.0, verify_timeout: float = 600.0):
+        self.contract_address = contract_address
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.retry_delay = retry_delay
+        self.verify_timeout = verify_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._deferred: List = []
+        self._sequence = itertools.count()
+        # Held while checking free space and putting, so a batch never half-fits
+        self._put_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stats = {'received': 0, 'queued': 0, 'ignored': 0, 'rejected': 0, 'refused': 0,
+                       'unverified': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def accept(self, events: List[Dict[str, Any]]) -> int:
+        """Decode and queue events; returns the number of transfers queued.
+
+        Raises queue.Full, having queued nothing, if the transfers do not all fit.
+        """
+        transfers = []
+        for event in events:
+            transfers.extend(decode_transfer_event(event, self.contract_address))
+        received_at = time.time()
+        for transfer in transfers:
+            transfer['received_at'] = received_at
+
+        with self._put_lock:
+            fits = not self._queue.maxsize or len(transfers) <= self._queue.maxsize - self._queue.qsize()
+            if fits:
+                for transfer in transfers:
+                    self._queue.put_nowait(transfer)
+        if not fits:
+            self._count('refused', len(events))
+            raise queue.Full(f"{len(transfers)} transfers do not fit in the event queue")
+
+        self._count('received', len(events))
+        self._count('ignored', len(events) - len(transfers))
+        self._count('queued', len(transfers))
+        return len(transfers)
+
+    def requeue(self, transfers: List[Dict[str, Any]]):
+        """Put back transfers whose ingestion failed"""
+        with self._put_lock:
+            for transfer in transfers:
+                try:
+                    self._queue.put_nowait(transfer)
+                except queue.Full:
+                    # The reconciler picks up anything dropped here
+                    logger.warning("Event queue full, leaving remaining transfers to the reconciler")
+                    return
+
+    def defer(self, transfers: List[Dict[str, Any]]):
+        """Queue transfers the solid node does not show yet again after retry_delay"""
+        now = time.time()
+        ready_at = time.monotonic() + self.retry_delay
+        with self._stats_lock:
+            for transfer in transfers:
+                if now - transfer.get('received_at', now) > self.verify_timeout:
+                    self._stats['unverified'] += 1
+                    logger.warning(f"Pushed transfer {transfer.get('transaction_id')} never appeared on the "
+                                   f"solid node, leaving it to the reconciler")
+                    continue
+                heapq.heappush(self._deferred, (ready_at, next(self._sequence), transfer))
+
+    def _release_deferred(self):
+        """Move deferred transfers whose delay has passed back onto the queue"""
+        now = time.monotonic()
+        with self._stats_lock, self._put_lock:
+            while self._deferred and self._deferred[0][0] <= now:
+                try:
+                    self._queue.put_nowait(self._deferred[0][2])
+                except queue.Full:
+                    return
+                heapq.heappop(self._deferred)
+
+    def drain(self, max_items: int = 500, timeout: float = 1.0) -> List[Dict[str, Any]]:
+        """Wait up to timeout for a transfer, then take whatever else is queued"""
+        self._release_deferred()
+        try:
+            transfers = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(transfers) < max_items:
+            try:
+                transfers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return transfers
+
+    def _handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(f"Event webhook: {format % args}")
+
+            def _reply(self, status: int, body: Dict[str, Any]):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._reply(200, {'status': 'ok', 'queued': receiver._queue.qsize()})
+
+            def do_POST(self):
+                if not receiver.secret or not hmac.compare_digest(
+                        self.headers.get('X-Webhook-Secret', ''), receiver.secret):
+                    receiver._count('rejected')
+                    self._reply(401, {'error': 'invalid secret'})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                except ValueError:
+                    receiver._count('rejected')
+                    self._reply(400, {'error': 'invalid JSON'})
+                    return
+
+                events = body if isinstance(body, list) else [body]
+                try:
+                    self._reply(202, {'accepted': receiver.accept(events)})
+                except queue.Full:
+                    # Nothing from this request was queued; retrying all of it is safe
+                    self._reply(503, {'error': 'queue full', 'accepted': 0, 'refused': len(events)})
+
+        return Handler
+
+    def start(self):
+        """Serve the webhook on a background thread"""
+        if not self.secret:
+            raise RuntimeError("EVENT_WEBHOOK_SECRET is not set; refusing to accept pushed events unauthenticated")
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        threading.Thread(target=self._server.serve_forever, name='event-webhook', daemon=True).start()
+        logger.info(f"Listening for pushed Transfer events on http://{self.host}:{self.port}")
+
+    def stop(self):
+        """Stop the webhook server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return event counters and queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['deferred'] = len(self._deferred)
+        stats['depth'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Fee Estimator for TRC20 Automation Service
+Sizes USDT transfer fee limits from dry-run energy costs
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Typical USDT transfer energy when a dry run is unavailable: sending to an address
+# that already holds USDT updates a storage slot, a fresh holder creates one
+DEFAULT_ENERGY = {'holder': 65_000, 'fresh': 131_000}
+# Sun burned per energy unit when the chain parameter cannot be read
+DEFAULT_ENERGY_PRICE = 420
+
+
+def _encode_address(address: str) -> str:
+    """ABI-encode a TRON address as a 32-byte word"""
+    from tronpy.keys import to_hex_address
+    return to_hex_address(address)[2:].lower().rjust(64, '0')
+
+
+def _encode_uint(value: int) -> str:
+    """ABI-encode an unsigned integer as a 32-byte word"""
+    return format(value, 'x').rjust(64, '0')
+
+
+class _TTLCache:
+    """Small thread-safe cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Any, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def set(self, key: Any, value: Any):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[1] >= now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (value, now + self.ttl)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FeeEstimator:
+    """Energy and fee_limit estimates for USDT transfers from one owner.
+
+    Energy is measured by dry-running transfer() with triggerconstantcontract and
+    cached per destination class ('holder' or 'fresh'), since that is what drives
+    the cost. Each destination's class is cached separately (balanceOf), for
+    longer, because holders rarely go back to zero. The fee limit is the
+    estimated burn plus a safety margin, capped at max_fee_limit.
+    """
+
+    def __init__(self, make_request: Callable, contract_address: str, owner_address: str,
+                 energy_ttl: float = 600, address_ttl: float = 3600, margin: float = 0.2,
+                 max_fee_limit: int = 100_000_000):
+        self.make_request = make_request
+        self.contract_address = contract_address
+        self.owner_address = owner_address
+        self.margin = margin
+        self.max_fee_limit = max_fee_limit
+
+        self._energy = _TTLCache(energy_ttl)
+        self._classes = _TTLCache(address_ttl)
+        self._params = _TTLCache(energy_ttl)
+        self._stats = {'dry_runs': 0, 'class_lookups': 0, 'fallbacks': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _trigger_constant(self, selector: str, parameter: str) -> Dict[str, Any]:
+        result = self.make_request('wallet/triggerconstantcontract', {
+            'owner_address': self.owner_address,
+            'contract_address': self.contract_address,
+            'function_selector': selector,
+            'parameter': parameter,
+            'visible': True,
+        })
+        if not result.get('result', {}).get('result'):
+            raise ValueError(f"Constant call {selector} failed: {result.get('result', {}).get('message')}")
+        return result
+
+    def destination_class(self, to_address: str) -> str:
+        """'holder' if the address already holds USDT, otherwise 'fresh'"""
+        cached = self._classes.get(to_address)
+        if cached:
+            return cached
+
+        self._count('class_lookups')
+        result = self._trigger_constant('balanceOf(address)', _encode_address(to_address))
+        balance = int((result.get('constant_result') or ['0'])[0] or '0', 16)
+        destination_class = 'holder' if balance > 0 else 'fresh'
+        self._classes.set(to_address, destination_class)
+        return destination_class
+
+    def energy(self, to_address: str, amount_sun: int) -> int:
+        """Energy a transfer to this address is expected to use"""
+        try:
+            destination_class = self.destination_class(to_address)
+        except Exception as e:
+            logger.warning(f"Could not classify {to_address}, assuming a fresh holder: {e}")
+            self._count('fallbacks')
+            return DEFAULT_ENERGY['fresh']
+
+        cached = self._energy.get(destination_class)
+        if cached:
+            return cached
+
+        try:
+            self._count('dry_runs')
+            result = self._trigger_constant(
+                'transfer(address,uint256)', _encode_address(to_address) + _encode_uint(amount_sun)
+            )
+            energy = int(result.get('energy_used') or 0) + int(result.get('energy_penalty') or 0)
+            if not energy:
+                raise ValueError("Dry run reported no energy")
+        except Exception as e:
+            logger.warning(f"Energy dry run failed for {destination_class} destination: {e}")
+            self._count('fallbacks')
+            return DEFAULT_ENERGY[destination_class]
+
+        self._energy.set(destination_class, energy)
+        return energy
+
+    def energy_price(self) -> int:
+        """Sun burned per energy unit (getEnergyFee chain parameter)"""
+        cached = self._params.get('energy_price')
+        if cached:
+            return cached
+
+        try:
+            params = self.make_request('wallet/getchainparameters')
+            price = next(p['value'] for p in params.get('chainParameter', []) if p.get('key') == 'getEnergyFee')
+        except Exception as e:
+            logger.warning(f"Could not read energy price, using {DEFAULT_ENERGY_PRICE} sun: {e}")
+            return DEFAULT_ENERGY_PRICE
+
+        self._params.set('energy_price', price)
+        return price
+
+    def fee_limit(self, to_address: str, amount_sun: int) -> int:
+        """Fee limit in sun: the full energy burn plus the margin, capped at max_fee_limit"""
+        energy = self.energy(to_address, amount_sun)
+        return min(self.max_fee_limit, int(energy * self.energy_price() * (1 + self.margin)))
+
+    def available_energy(self) -> int:
+        """Staked or delegated energy the owner can spend before burning TRX"""
+        try:
+            resources = self.make_request('wallet/getaccountresource',
+                                          {'address': self.owner_address, 'visible': True})
+            return max(0, resources.get('EnergyLimit', 0) - resources.get('EnergyUsed', 0))
+        except Exception as e:
+            logger.warning(f"Could not read account energy: {e}")
+            return 0
+
+    def predict_batch(self, transfers: List[Tuple[str, int]]) -> Dict[str, Any]:
+        """Predict energy and TRX burn for (to_address, amount_sun) transfers, in order.
+
+        burn_sun[i] is the cumulative burn after the first i+1 transfers, so callers
+        can cut a batch down to what the wallet can pay for.
+        """
+        price = self.energy_price()
+        remaining_energy = self.available_energy()
+        total_energy = 0
+        burned = 0
+        burn_sun = []
+
+        for to_address, amount_sun in transfers:
+            energy = self.energy(to_address, amount_sun)
+            total_energy += energy
+            covered = min(energy, remaining_energy)
+            remaining_energy -= covered
+            burned += (energy - covered) * price
+            burn_sun.append(burned)
+
+        return {'energy': total_energy, 'burn_sun': burn_sun, 'total_burn_sun': burned}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return dry-run counters and cache sizes"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['cached_addresses'] = len(self._classes)
+        stats['cached_classes'] = len(self._energy)
+        return stats
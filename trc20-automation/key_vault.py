@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Key Vault for TRC20 Automation Service
+Envelope encryption of stored private keys: AES-GCM data keys wrapped by a master key
+"""
+
+import os
+import sys
+import time
+import base64
+import hashlib
+import logging
+import secrets
+import threading
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 'v1'
+NONCE_BYTES = 12
+
+
+class FileKEK:
+    """Key-encryption key read from a local file holding 32 random bytes as hex.
+
+    Meant for testing and single-host deployments; a KMS-backed KEK only needs
+    the same key_id/wrap/unwrap interface.
+    """
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            key = bytes.fromhex(f.read().strip())
+        if len(key) != 32:
+            raise ValueError(f"KEK file {path} must hold 32 bytes of hex")
+        self._aead = AESGCM(key)
+        self.key_id = hashlib.sha256(key).hexdigest()[:16]
+
+    @staticmethod
+    def create(path: str):
+        """Write a new random KEK readable only by the current user"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+
+    def wrap(self, data_key: bytes) -> bytes:
+        nonce = os.urandom(NONCE_BYTES)
+        return nonce + self._aead.encrypt(nonce, data_key, self.key_id.encode())
+
+    def unwrap(self, wrapped: bytes) -> bytes:
+        return self._aead.decrypt(wrapped[:NONCE_BYTES], wrapped[NONCE_BYTES:], self.key_id.encode())
+
+
+class KeyVault:
+    """Encrypts secrets with cached AES-256-GCM data keys (DEKs) wrapped by a KEK.
+
+    Ciphertexts are 'v1:<dek id>:<base64 nonce+ciphertext>'. A DEK is generated
+    on first use, wrapped by the KEK and persisted through save_data_key
+    before anything is encrypted with it. It is rotated after rotate_after
+    seconds or max_uses encryptions. Unwrapped DEKs stay cached, so batches of
+    thousands of keys cost one KEK operation per DEK, not one per key. An
+    optional associated value (e.g. the address) binds each ciphertext to
+    its row.
+    """
+
+    def __init__(self, kek: FileKEK, save_data_key: Callable[[str, str, str], None],
+                 load_data_key: Callable[[str], Optional[Tuple[str, str]]],
+                 rotate_after: float = 24 * 3600, max_uses: int = 1_000_000):
+        self.kek = kek
+        self.save_data_key = save_data_key
+        self.load_data_key = load_data_key
+        self.rotate_after = rotate_after
+        self.max_uses = max_uses
+
+        self._active: Optional[Dict[str, Any]] = None
+        self._cache: Dict[str, AESGCM] = {}
+        self._lock = threading.Lock()
+        self._stats = {'encrypted': 0, 'decrypted': 0, 'data_keys_created': 0, 'data_keys_unwrapped': 0}
+
+    def _active_key(self, uses: int) -> Dict[str, Any]:
+        """Return the DEK to encrypt with, rotating it when it is too old or too used"""
+        with self._lock:
+            active = self._active
+            if (active is None or time.monotonic() - active['created'] > self.rotate_after or
+                    active['uses'] + uses > self.max_uses):
+                data_key = AESGCM.generate_key(bit_length=256)
+                dek_id = secrets.token_hex(8)
+                wrapped = base64.b64encode(self.kek.wrap(data_key)).decode()
+                # Persist first: a ciphertext whose DEK was never stored is unrecoverable
+                self.save_data_key(dek_id, wrapped, self.kek.key_id)
+                active = {'id': dek_id, 'aead': AESGCM(data_key), 'created': time.monotonic(), 'uses': 0}
+                self._active = active
+                self._cache[dek_id] = active['aead']
+                self._stats['data_keys_created'] += 1
+                logger.info(f"Created data key {dek_id}")
+            active['uses'] += uses
+            return active
+
+    def _data_key(self, dek_id: str) -> AESGCM:
+        """Return a cached DEK, unwrapping it with the KEK on first use"""
+        with self._lock:
+            aead = self._cache.get(dek_id)
+        if aead:
+            return aead
+
+        stored = self.load_data_key(dek_id)
+        if not stored:
+            raise KeyError(f"Unknown data key {dek_id}")
+        wrapped, kek_id = stored
+        if kek_id != self.kek.key_id:
+            raise ValueError(f"Data key {dek_id} is wrapped by KEK {kek_id}, not {self.kek.key_id}")
+
+        aead = AESGCM(self.kek.unwrap(base64.b64decode(wrapped)))
+        with self._lock:
+            self._cache[dek_id] = aead
+            self._stats['data_keys_unwrapped'] += 1
+        return aead
+
+    def encrypt_many(self, plaintexts: List[str], associated: Optional[List[str]] = None) -> List[str]:
+        """Encrypt a batch of secrets under the active DEK"""
+        active = self._active_key(len(plaintexts))
+        associated = associated or [None] * len(plaintexts)
+        tokens = []
+        for plaintext, aad in zip(plaintexts, associated):
+            nonce = os.urandom(NONCE_BYTES)
+            ciphertext = active['aead'].encrypt(nonce, plaintext.encode(), aad.encode() if aad else None)
+            tokens.append(f"{TOKEN_VERSION}:{active['id']}:{base64.b64encode(nonce + ciphertext).decode()}")
+        with self._lock:
+            self._stats['encrypted'] += len(tokens)
+        return tokens
+
+    def decrypt_many(self, tokens: List[str], associated: Optional[List[str]] = None) -> List[str]:
+        """Decrypt a batch of ciphertexts, unwrapping each distinct DEK once"""
+        associated = associated or [None] * len(tokens)
+        plaintexts = []
+        for token, aad in zip(tokens, associated):
+            version, dek_id, payload = token.split(':', 2)
+            if version != TOKEN_VERSION:
+                raise ValueError(f"Unsupported ciphertext version {version}")
+            raw = base64.b64decode(payload)
+            plaintext = self._data_key(dek_id).decrypt(
+                raw[:NONCE_BYTES], raw[NONCE_BYTES:], aad.encode() if aad else None
+            )
+            plaintexts.append(plaintext.decode())
+        with self._lock:
+            self._stats['decrypted'] += len(plaintexts)
+        return plaintexts
+
+    def encrypt(self, plaintext: str, associated: Optional[str] = None) -> str:
+        """Encrypt one secret"""
+        return self.encrypt_many([plaintext], [associated])[0]
+
+    def decrypt(self, token: str, associated: Optional[str] = None) -> str:
+        """Decrypt one ciphertext"""
+        return self.decrypt_many([token], [associated])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return encryption counters and the number of cached data keys"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_data_keys'] = len(self._cache)
+        return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--create-kek':
+        FileKEK.create(sys.argv[2])
+        print(f"Created KEK file {sys.argv[2]}")
+    elif sys.argv[1:] == ['--reencrypt-legacy']:
+        # Uses the service's database and KEY_ENCRYPTION_KEY_FILE settings
+        from main import TRC20AutomationService
+        service = TRC20AutomationService()
+        try:
+            print(f"Re-encrypted {service.reencrypt_legacy_keys()} legacy private keys")
+        finally:
+            service.db_pool.close()
+    else:
+        print("Usage: python key_vault.py --create-kek <path> | --reencrypt-legacy")
+        sys.exit(1)
@@ -9,20 +9,41 @@ import os
 import time
 import logging
 import json
-import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Tuple, TYPE_CHECKING
 from decimal import Decimal
 
-from tronpy import Tron
-from tronpy.keys import PrivateKey
-from tronpy.providers import HTTPProvider
-from tronpy.exceptions import TransactionError, ValidationError
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import requests
 from dotenv import load_dotenv
 
+from address_monitor import AddressScheduler
+from address_pool import generate_keypairs, generate_keypairs_parallel
+from async_engine import AsyncEngine
+from block_scanner import decode_transfer_logs, fetch_block_receipts, fetch_block_transfers
+from chain_cache import ChainCache, CachedProvider
+from confirmations import ConfirmationService, PendingConfirmationQueue
+from db_pool import ConnectionPool
+from event_ingest import EventReceiver
+from fee_estimator import FeeEstimator
+from metrics import (
+    CHAIN_LAG_BLOCKS, DEPOSIT_CREDIT_SECONDS, DEPOSITS, QUEUE_DEPTH, REGISTRY, SOLID_HEAD_AGE,
+    WITHDRAWALS, MetricsServer
+)
+from provider_pool import ProviderPool
+from tracing import TRACER, stage
+from trongrid_client import tronpy_provider
+from tx_index import ProcessedTransactionIndex
+from withdrawal_tracker import WithdrawalTracker
+
+if TYPE_CHECKING:
+    from tronpy import Tron
+    from tronpy.contract import Contract
+    from tronpy.keys import PrivateKey
+    from key_vault import KeyVault
+
 # Load environment variables
 load_dotenv()
 
@@ -37,32 +58,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Placeholder owner for main-wallet deposits until the user is identified
+SYSTEM_USER_EMAIL = 'system@ticglobal.com'
+
+# admin_notes on deposits this service inserted before they were confirmed, so
+# manually submitted pending deposits are never auto-credited
+PENDING_CONFIRMATION_NOTE = 'Awaiting confirmations (TRC20 automation service)'
+
 class TRC20AutomationService:
     def __init__(self):
         # TRON Configuration
         self.network = os.getenv('TRON_NETWORK', 'mainnet')
-        self.api_key = os.getenv('TRONGRID_API_KEY')
 
-        # Initialize TRON client
-        if self.network == 'mainnet':
-            provider_url = "https://api.trongrid.io"
-        else:
-            provider_url = "https://api.shasta.trongrid.io"  # Testnet
+        # Initialize TRON client; tronpy and REST calls share the provider pool's
+        # health-based routing and each provider's rate limits. The tronpy client
+        # and the USDT contract are created on first use.
+        self.trongrid = ProviderPool.from_env(self.network)
+        self._tron = None
 
-        self.tron = Tron(HTTPProvider(provider_url, api_key=self.api_key))
+        # Solid blocks, receipts and closed transfer windows are read from a local
+        # cache after their first fetch, so replays and backfills skip the API
+        chain_cache_file = os.getenv('CHAIN_CACHE_FILE', 'trc20_chain_cache.db')
+        if chain_cache_file:
+            self.trongrid = CachedProvider(
+                self.trongrid,
+                ChainCache(chain_cache_file, int(float(os.getenv('CHAIN_CACHE_MAX_MB', '512')) * 1024 * 1024)),
+                solid_age=float(os.getenv('CHAIN_CACHE_SOLID_AGE', '300'))
+            )
 
         # USDT TRC20 Contract
         self.usdt_contract_address = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
-        self.usdt_contract = self.tron.get_contract(self.usdt_contract_address)
+        self.abi_cache_file = os.getenv('ABI_CACHE_FILE', 'usdt_contract_abi.json')
+        self._usdt_contract = None
 
         # Main wallet configuration - this is where deposits are received
         self.main_wallet_private_key = os.getenv('TRON_MAIN_WALLET_PRIVATE_KEY')
         self.main_wallet_address = os.getenv('TRON_MAIN_WALLET_ADDRESS', 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ')
+        self._signer = None
+
+        # Withdrawal processing
+        self.withdrawal_batch_size = int(os.getenv('WITHDRAWAL_BATCH_SIZE', '100'))
+        self.withdrawal_interval = int(os.getenv('WITHDRAWAL_INTERVAL', '15'))
+        self.withdrawal_tracker = WithdrawalTracker()
+
+        # Fee limits sized from dry-run energy, cached per destination class
+        self.fee_estimator = FeeEstimator(
+            self.trongrid.post,
+            self.usdt_contract_address,
+            self.main_wallet_address,
+            energy_ttl=float(os.getenv('FEE_ENERGY_TTL', '600')),
+            address_ttl=float(os.getenv('FEE_ADDRESS_TTL', '3600')),
+            margin=float(os.getenv('FEE_LIMIT_MARGIN', '0.2')),
+            max_fee_limit=int(float(os.getenv('MAX_FEE_LIMIT_TRX', '100')) * 1_000_000)
+        )
 
         # Configuration
+        self.monitoring_interval = int(os.getenv('MONITORING_INTERVAL', '30'))
         self.min_confirmations = int(os.getenv('MIN_CONFIRMATIONS', '1'))
         self.min_deposit_amount = Decimal(os.getenv('MIN_DEPOSIT_AMOUNT', '10.0'))
         self.max_deposit_amount = Decimal(os.getenv('MAX_DEPOSIT_AMOUNT', '200000.0'))
+        self.confirmation_service = ConfirmationService(self._fetch_solid_head)
+        self.pending_confirmations = PendingConfirmationQueue(self.min_confirmations)
+
+        # Incremental scanning - TronGrid returns at most 200 transfers per page
+        self.page_size = min(int(os.getenv('TRONGRID_PAGE_SIZE', '200')), 200)
+        self.scan_cursor_file = os.getenv('SCAN_CURSOR_FILE', 'trc20_scan_cursor.json')
+        self.scan_lookback_hours = int(os.getenv('SCAN_LOOKBACK_HOURS', '24'))
+
+        # 'poll' queries TronGrid per watched address; 'blocks' walks solid blocks
+        # once and matches USDT Transfer logs against every watched address;
+        # 'push' ingests events sent to a local webhook and keeps 'poll' or
+        # 'blocks' running every RECONCILE_INTERVAL seconds to fill any gaps
+        self.ingestion_mode = os.getenv('INGESTION_MODE', 'poll')
+        self.reconcile_mode = os.getenv('RECONCILE_MODE', 'poll')
+        self.reconcile_interval = int(os.getenv('RECONCILE_INTERVAL', '300'))
+        self.block_cursor_file = os.getenv('BLOCK_CURSOR_FILE', 'trc20_block_cursor.json')
+        self.block_scan_batch = int(os.getenv('BLOCK_SCAN_BATCH', '20'))
+        self.block_scan_max_blocks = int(os.getenv('BLOCK_SCAN_MAX_BLOCKS', '1200'))
 
         # Database configuration
         self.db_config = {
@@ -72,6 +144,67 @@ class TRC20AutomationService:
             'password': os.getenv('DB_PASSWORD'),
             'port': int(os.getenv('DB_PORT', 5432))
         }
+        self.db_pool = ConnectionPool(
+            self.db_config,
+            minconn=int(os.getenv('DB_POOL_MIN', '1')),
+            maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+            statement_timeout_ms=int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000')),
+            acquire_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+            health_check_interval=float(os.getenv('DB_HEALTH_CHECK_INTERVAL', '60')),
+            # Transaction-mode poolers (Supabase's port 6543) cannot keep prepared statements
+            prepare=os.getenv('DB_PREPARED_STATEMENTS',
+                              'false' if self.db_config['port'] == 6543 else 'true').lower() == 'true'
+        )
+
+        # In-memory index of processed transaction hashes, warmed from deposits at startup
+        self.tx_index = ProcessedTransactionIndex(
+            max_bytes=int(float(os.getenv('TX_INDEX_MAX_MB', '64')) * 1024 * 1024),
+            expected_items=int(os.getenv('TX_INDEX_EXPECTED_ITEMS', '1000000')),
+            false_positive_rate=float(os.getenv('TX_INDEX_FP_RATE', '0.001'))
+        )
+
+        # Per-user deposit addresses, polled hot or cold depending on recent activity
+        self.address_scheduler = AddressScheduler(
+            hot_interval=float(os.getenv('ADDRESS_HOT_INTERVAL', '30')),
+            cold_interval=float(os.getenv('ADDRESS_COLD_INTERVAL', '21600')),
+            hot_window=float(os.getenv('ADDRESS_HOT_WINDOW_HOURS', '24')) * 3600,
+            max_per_cycle=int(os.getenv('ADDRESS_MAX_PER_CYCLE', '500'))
+        )
+        self._addresses_synced_at = 0.0
+
+        # Pre-generated deposit addresses, refilled in bulk across worker processes
+        self.address_pool_target = int(os.getenv('ADDRESS_POOL_TARGET', '1000'))
+        self.address_pool_low = int(os.getenv('ADDRESS_POOL_LOW', '200'))
+        self.address_pool_interval = int(os.getenv('ADDRESS_POOL_INTERVAL', '60'))
+        self.keygen_workers = int(os.getenv('KEYGEN_WORKERS', str(os.cpu_count() or 1)))
+        self._keygen_executor = None
+
+        # Envelope encryption for stored private keys
+        self.kek_file = os.getenv('KEY_ENCRYPTION_KEY_FILE')
+        self.dek_rotation_hours = float(os.getenv('DEK_ROTATION_HOURS', '24'))
+        self.dek_max_uses = int(os.getenv('DEK_MAX_USES', '1000000'))
+        self._key_vault = None
+        self.address_monitor_interval = int(os.getenv('ADDRESS_MONITOR_INTERVAL', '10'))
+
+        # Prometheus metrics endpoint, off unless METRICS_PORT is set
+        metrics_port = os.getenv('METRICS_PORT', '')
+        self.metrics_server = MetricsServer(
+            os.getenv('METRICS_HOST', '127.0.0.1'), int(metrics_port)
+        ) if metrics_port else None
+        # Slow-cycle reports (SIGUSR1 profiles the next cycles on demand)
+        TRACER.configure_from_env()
+
+        # Pushed Transfer events (push ingestion mode)
+        self.event_receiver = EventReceiver(
+            self.usdt_contract_address,
+            host=os.getenv('EVENT_HOST', '127.0.0.1'),
+            port=int(os.getenv('EVENT_PORT', '8787')),
+            secret=os.getenv('EVENT_WEBHOOK_SECRET'),
+            max_queue=int(os.getenv('EVENT_QUEUE_SIZE', '100000')),
+            retry_delay=float(os.getenv('EVENT_VERIFY_RETRY', '10')),
+            verify_timeout=float(os.getenv('EVENT_VERIFY_TIMEOUT', '600'))
+        )
+        self.event_batch_size = int(os.getenv('EVENT_BATCH_SIZE', '500'))
 
         # Supabase configuration for API calls
         self.supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
@@ -82,204 +215,698 @@ class TRC20AutomationService:
         logger.info(f"Min confirmations: {self.min_confirmations}")
         logger.info(f"Deposit limits: {self.min_deposit_amount} - {self.max_deposit_amount} USDT")
 
+    @property
+    def tron(self) -> 'Tron':
+        """tronpy client, created on first use since importing tronpy is slow"""
+        if self._tron is None:
+            from tronpy import Tron
+            self._tron = Tron(provider=tronpy_provider(self.trongrid))
+        return self._tron
+
+    @property
+    def usdt_contract(self) -> 'Contract':
+        """USDT contract, built from the on-disk ABI cache when possible"""
+        if self._usdt_contract is None:
+            self._usdt_contract = self._load_usdt_contract()
+        return self._usdt_contract
+
+    def _load_usdt_contract(self) -> 'Contract':
+        """Build the contract from the ABI cache, fetching and caching it on a miss"""
+        from tronpy.contract import Contract
+
+        try:
+            with open(self.abi_cache_file) as f:
+                cached = json.load(f)
+            if cached['address'] == self.usdt_contract_address:
+                return Contract(
+                    addr=cached['address'],
+                    name=cached.get('name'),
+                    abi=cached['abi'],
+                    user_resource_percent=cached.get('user_resource_percent', 100),
+                    origin_energy_limit=cached.get('origin_energy_limit', 1),
+                    origin_address=cached.get('origin_address'),
+                    code_hash=cached.get('code_hash'),
+                    client=self.tron
+                )
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        contract = self.tron.get_contract(self.usdt_contract_address)
+        try:
+            tmp_file = f"{self.abi_cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    'address': self.usdt_contract_address,
+                    'name': contract.name,
+                    'abi': contract.abi,
+                    'user_resource_percent': contract.user_resource_percent,
+                    'origin_energy_limit': contract.origin_energy_limit,
+                    'origin_address': contract.origin_address,
+                    'code_hash': contract.code_hash
+                }, f)
+            os.replace(tmp_file, self.abi_cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write ABI cache: {e}")
+        return contract
+
     def get_db_connection(self):
-        """Get database connection"""
-        return psycopg2.connect(**self.db_config)
+        """Borrow a pooled database connection (use as a context manager)"""
+        return self.db_pool.connection()
 
     def generate_deposit_address(self, user_email: str) -> Dict[str, Any]:
-        """Generate a new deposit address for user"""
+        """Return the user's deposit address, assigning one from the pre-generated pool on first request"""
         try:
-            # Generate new private key and address
-            private_key = PrivateKey.random()
-            address = private_key.public_key.to_base58check_address()
-            
-            # Store in database (encrypted private key)
-            with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO trc20_deposit_addresses 
-                        (user_email, address, private_key_encrypted, created_at)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (user_email) 
-                        DO UPDATE SET 
-                            address = EXCLUDED.address,
-                            private_key_encrypted = EXCLUDED.private_key_encrypted,
-                            updated_at = NOW()
-                        RETURNING address
-                    """, (user_email, address, self._encrypt_private_key(str(private_key)), datetime.now()))
-                    
-                    result = cur.fetchone()
-                    conn.commit()
-                    
-            logger.info(f"Generated deposit address for {user_email}: {address}")
+            address = self.address_scheduler.address_for(user_email)
+            if address:
+                self.address_scheduler.mark_hot(address)
+            else:
+                address = self._assign_deposit_address(user_email)
+                self.address_scheduler.add(address, user_email)
+                logger.info(f"Assigned deposit address for {user_email}: {address}")
+
             return {
                 'success': True,
                 'address': address,
                 'network': 'TRC20',
                 'token': 'USDT'
             }
-            
+
         except Exception as e:
             logger.error(f"Error generating deposit address: {e}")
             return {'success': False, 'error': str(e)}
 
+    def _assign_deposit_address(self, user_email: str) -> str:
+        """Return the user's stored address, or give them the oldest unassigned pool address"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT address FROM trc20_deposit_addresses WHERE user_email = %s", (user_email,))
+                existing = cur.fetchone()
+                if existing:
+                    return existing[0]
+
+                cur.execute("""
+                    UPDATE trc20_address_pool
+                    SET assigned_to = %s, assigned_at = NOW()
+                    WHERE id = (
+                        SELECT id FROM trc20_address_pool
+                        WHERE assigned_to IS NULL
+                        ORDER BY id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING address, private_key_encrypted
+                """, (user_email,))
+                pooled = cur.fetchone()
+                if pooled:
+                    address, private_key_encrypted = pooled
+                else:
+                    logger.warning("Deposit address pool is empty, generating an address inline")
+                    address, private_key = generate_keypairs(1)[0]
+                    private_key_encrypted = self._encrypt_private_key(private_key, address)
+
+                # Never replace an existing address: funds sent to it would be orphaned
+                cur.execute("""
+                    INSERT INTO trc20_deposit_addresses
+                    (user_email, address, private_key_encrypted, created_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (user_email) DO NOTHING
+                    RETURNING address
+                """, (user_email, address, private_key_encrypted))
+                if cur.fetchone() is None:
+                    # A concurrent request assigned one first; leave the pool address unassigned
+                    conn.rollback()
+                    cur.execute("SELECT address FROM trc20_deposit_addresses WHERE user_email = %s",
+                                (user_email,))
+                    return cur.fetchone()[0]
+
+                conn.commit()
+        return address
+
+    def _address_pool_enabled(self) -> bool:
+        """Whether pool keys can be encrypted and the pool table exists"""
+        if not self.kek_file:
+            logger.warning("KEY_ENCRYPTION_KEY_FILE is not set; deposit address pool refill disabled")
+            return False
+        try:
+            with self.get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT to_regclass('trc20_address_pool') IS NOT NULL")
+                    if cur.fetchone()[0]:
+                        return True
+        except Exception as e:
+            logger.error(f"Error checking deposit address pool: {e}")
+            return False
+        logger.warning("trc20_address_pool does not exist; run the address pool migration to enable refill")
+        return False
+
+    def refill_address_pool(self):
+        """Top the deposit address pool up to its target size once it runs low"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM trc20_address_pool WHERE assigned_to IS NULL")
+                available = cur.fetchone()[0]
+
+        if available >= self.address_pool_low:
+            return
+
+        started = time.monotonic()
+        if self._keygen_executor is None:
+            # Spawned, not forked: a fork of this threaded process can inherit held locks
+            self._keygen_executor = ProcessPoolExecutor(max_workers=self.keygen_workers,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+        keypairs = generate_keypairs_parallel(self._keygen_executor, self.address_pool_target - available)
+        addresses = [address for address, _ in keypairs]
+        encrypted = self._encrypt_private_keys([private_key for _, private_key in keypairs], addresses)
+        rows = list(zip(addresses, encrypted))
+
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO trc20_address_pool (address, private_key_encrypted)
+                    VALUES %s
+                    ON CONFLICT (address) DO NOTHING
+                """, rows, page_size=500)
+                conn.commit()
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Added {len(rows)} addresses to the deposit address pool in {elapsed:.1f}s "
+                    f"({len(rows) / max(elapsed, 0.001):.0f}/s), {available + len(rows)} available")
+
     def monitor_deposits(self):
         """Monitor for incoming USDT deposits to main wallet"""
         try:
             logger.info("Starting deposit monitoring...")
 
             # Monitor the main wallet address for incoming USDT transactions
-            self._check_main_wallet_transactions()
+            with stage('deposit_scan'):
+                self._check_main_wallet_transactions()
+
+            logger.debug(f"Database pool: {self.db_pool.stats()}")
+            logger.debug(f"Transaction index: {self.tx_index.stats()}")
 
         except Exception as e:
             logger.error(f"Error monitoring deposits: {e}")
 
     def _check_main_wallet_transactions(self):
-        """Check transactions for the main wallet address"""
+        """Check new transactions for the main wallet address since the saved cursor"""
         try:
             address = self.main_wallet_address
-            logger.info(f"Checking transactions for main wallet: {address}")
-
-            # Get recent TRC20 transactions for the main wallet
-            # Using TronGrid API to get TRC20 transfers
-            api_url = f"https://api.trongrid.io/v1/accounts/{address}/transactions/trc20"
-            headers = {}
-            if self.api_key:
-                headers['TRON-PRO-API-KEY'] = self.api_key
-
-            params = {
-                'limit': 50,
-                'order_by': 'block_timestamp,desc',
-                'contract_address': self.usdt_contract_address
-            }
+            cursor = self._load_scan_cursor()
 
-            response = requests.get(api_url, headers=headers, params=params)
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch transactions: {response.status_code}")
-                return
+            # One solid-head lookup serves every transfer in this cycle
+            self.confirmation_service.refresh()
+            logger.info(f"Checking transactions for main wallet: {address} "
+                        f"(since {cursor['block_timestamp']})")
 
-            data = response.json()
-            transactions = data.get('data', [])
+            # Page through every TRC20 transfer received since the cursor, oldest first
+            fingerprint = cursor.get('fingerprint')
+            high_water = cursor.get('high_water', cursor['block_timestamp'])
+            total = 0
 
-            logger.info(f"Found {len(transactions)} recent TRC20 transactions")
+            while True:
+                data = self._fetch_transfer_page(address, cursor['block_timestamp'], fingerprint)
+                if data is None:
+                    return
 
-            for tx in transactions:
-                if self._is_usdt_deposit(tx):
-                    self._process_deposit_transaction(tx)
+                transactions = data.get('data', [])
+                total += len(transactions)
+
+                # One duplicate check and one bulk insert for the whole page
+                deposits = [tx for tx in transactions if self._is_usdt_deposit(tx)]
+                unprocessed = self._filter_unprocessed_transactions(
+                    [tx.get('transaction_id') for tx in deposits]
+                )
+                new_deposits = [tx for tx in deposits if tx.get('transaction_id') in unprocessed]
+
+                if self._ingest_deposits(new_deposits) is None:
+                    # Leave the cursor where it is so this page is retried next cycle
+                    logger.warning("Deposit ingestion failed, cursor not advanced")
+                    return
+
+                for tx in transactions:
+                    high_water = max(high_water, tx.get('block_timestamp', 0))
+
+                fingerprint = data.get('meta', {}).get('fingerprint')
+                if not fingerprint:
+                    break
+
+                # Persist mid-scan progress so a restart resumes from this page
+                self._save_scan_cursor({
+                    'block_timestamp': cursor['block_timestamp'],
+                    'fingerprint': fingerprint,
+                    'high_water': high_water
+                })
+
+            # min_timestamp is inclusive, so transfers at high_water are re-read once
+            # next cycle and dropped by duplicate detection
+            self._save_scan_cursor({'block_timestamp': high_water, 'fingerprint': None})
+            logger.info(f"Found {total} new TRC20 transactions")
 
         except Exception as e:
             logger.error(f"Error checking main wallet transactions: {e}")
 
-    def _check_address_transactions(self, addr_info: Dict):
-        """Check transactions for a specific address"""
+    def _load_scan_cursor(self) -> Dict[str, Any]:
+        """Load the incremental scan cursor, starting from the lookback window if none is saved"""
+        try:
+            with open(self.scan_cursor_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            start = datetime.now() - timedelta(hours=self.scan_lookback_hours)
+            return {'block_timestamp': int(start.timestamp() * 1000), 'fingerprint': None}
+
+    def _save_scan_cursor(self, cursor: Dict[str, Any], path: Optional[str] = None):
+        """Atomically persist the incremental scan cursor"""
+        path = path or self.scan_cursor_file
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(cursor, f)
+        os.replace(tmp_file, path)
+
+    async def scan_blocks_async(self):
+        """Walk solid blocks since the block cursor and ingest USDT transfers to any watched address"""
+        await self.engine.call('db', self._sync_deposit_addresses)
+
+        # Head and blocks come from one provider, so every block up to the head
+        # is one it has reached; another may still answer {} for it
+        tron = self.trongrid.pinned()
+        try:
+            head = await self.engine.call('tron', self._fetch_solid_head, tron)
+        except Exception as e:
+            logger.error(f"Error fetching solid head block: {e}")
+            return
+
+        next_block = self._load_block_cursor(head['number']) + 1
+        last_block = min(head['number'], next_block + self.block_scan_max_blocks - 1)
+        scanned = matched = 0
+        started = time.monotonic()
+
+        for batch_start in range(next_block, last_block + 1, self.block_scan_batch):
+            block_numbers = range(batch_start, min(batch_start + self.block_scan_batch, last_block + 1))
+            results = await self.engine.gather(
+                'tron',
+                lambda num: fetch_block_transfers(tron.post, num, self.usdt_contract_address),
+                block_numbers
+            )
+
+            failed = [r for r in results if isinstance(r, BaseException)]
+            if failed:
+                logger.error(f"Error fetching blocks {block_numbers[0]}-{block_numbers[-1]}: {failed[0]}")
+                break
+
+            transfers = [tx for block_transfers in results for tx in block_transfers]
+            if await self.engine.call('db', self._ingest_block_transfers, transfers) is None:
+                logger.warning("Block ingestion failed, block cursor not advanced")
+                break
+
+            self._save_scan_cursor({'block_number': block_numbers[-1]}, self.block_cursor_file)
+            scanned += len(block_numbers)
+            matched += len(transfers)
+
+        CHAIN_LAG_BLOCKS.set(head['number'] - next_block - scanned + 1)
+        if scanned:
+            elapsed = time.monotonic() - started
+            logger.info(f"Scanned {scanned} blocks ({scanned / max(elapsed, 0.001):.1f} blocks/s), "
+                        f"{matched} USDT transfers, {head['number'] - next_block - scanned + 1} blocks behind")
+
+    def _ingest_block_transfers(self, transfers: List[Dict]) -> Optional[int]:
+        """Ingest decoded transfers to watched addresses, returning the number inserted (None on error)"""
+        watched = [tx for tx in transfers if tx.get('to') == self.main_wallet_address
+                   or self.address_scheduler.user_email_for(tx.get('to'))]
+
+        # Across every recipient: a transaction paying two watched addresses would
+        # otherwise insert one of them and drop the other as a conflict
+        by_recipient: Dict[str, List[Dict]] = {}
+        for tx in self._reject_multi_transfer(watched):
+            by_recipient.setdefault(tx.get('to'), []).append(tx)
+
+        inserted = 0
+        for address, deposits in by_recipient.items():
+            if address == self.main_wallet_address:
+                user_email, deposit_address = SYSTEM_USER_EMAIL, None
+            else:
+                user_email, deposit_address = self.address_scheduler.user_email_for(address), address
+
+            unprocessed = self._filter_unprocessed_transactions(
+                [tx.get('transaction_id') for tx in deposits]
+            )
+            new_deposits = [tx for tx in deposits if tx.get('transaction_id') in unprocessed]
+            rows = self._ingest_deposits(new_deposits, user_email, deposit_address)
+            if rows is None:
+                return None
+            inserted += len(rows)
+
+        return inserted
+
+    async def ingest_pushed_events_async(self):
+        """Ingest pushed Transfer events as soon as the solid node confirms them.
+
+        Only the transaction id of an event is used: amount, recipient and block
+        come from the solid node's receipt, so a forged or replayed event can
+        neither create a deposit nor make one look confirmed.
+        """
+        pushed = await self.engine.call('events', self.event_receiver.drain, self.event_batch_size)
+        if not pushed:
+            return
+
+        # Events can name an address created moments ago
+        await self.engine.call('db', self._sync_deposit_addresses)
+        pushed = [tx for tx in pushed if tx.get('to') == self.main_wallet_address
+                  or self.address_scheduler.user_email_for(tx.get('to'))]
+
+        by_tx: Dict[str, List[Dict]] = {}
+        for tx in pushed:
+            by_tx.setdefault(tx['transaction_id'], []).append(tx)
+        tx_ids = list(by_tx)
+        tx_infos = await self.engine.gather(
+            'tron', lambda tx_id: self.trongrid.post('walletsolidity/gettransactioninfobyid', {'value': tx_id}),
+            tx_ids
+        )
+
+        transfers, unverified = [], []
+        for tx_id, info in zip(tx_ids, tx_infos):
+            if isinstance(info, BaseException) or not info or info.get('id') != tx_id:
+                # Not solid yet (or the lookup failed); checked again after a delay
+                unverified.extend(by_tx[tx_id])
+            else:
+                transfers.extend(decode_transfer_logs([info], self.usdt_contract_address))
+        if unverified:
+            self.event_receiver.defer(unverified)
+        if not transfers:
+            return
+
+        if await self.engine.call('db', self._ingest_block_transfers, transfers) is None:
+            logger.warning(f"Event ingestion failed, requeueing {len(transfers)} transfers")
+            self.event_receiver.requeue(transfers)
+            return
+
+        newest = max(tx.get('block_timestamp') or 0 for tx in transfers)
+        if newest:
+            logger.info(f"Ingested {len(transfers)} pushed transfers, "
+                        f"{time.time() - newest / 1000:.1f}s after their block")
+
+    def _load_block_cursor(self, head_number: int) -> int:
+        """Load the last scanned block, starting from the lookback window if none is saved"""
         try:
-            address = addr_info['address']
-            user_email = addr_info['user_email']
-            
-            # Get USDT transactions for this address
-            transactions = self.tron.get_account_transactions(address, limit=50)
-            
-            for tx in transactions:
-                if self._is_usdt_deposit(tx, address):
-                    self._process_deposit_transaction(tx, user_email, address)
-                    
+            with open(self.block_cursor_file) as f:
+                return json.load(f)['block_number']
+        except FileNotFoundError:
+            # One block every 3 seconds
+            return head_number - self.scan_lookback_hours * 1200
+
+    def _fetch_transfer_page(self, address: str, min_timestamp: int, fingerprint: Optional[str] = None,
+                             max_timestamp: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Fetch one page of USDT transfers received by an address, oldest first"""
+        params = {
+            'limit': self.page_size,
+            'order_by': 'block_timestamp,asc',
+            'only_to': 'true',
+            'only_confirmed': 'true',
+            'min_timestamp': min_timestamp,
+            'contract_address': self.usdt_contract_address
+        }
+        if max_timestamp is not None:
+            params['max_timestamp'] = max_timestamp
+        if fingerprint:
+            params['fingerprint'] = fingerprint
+
+        try:
+            return self.trongrid.get(f"v1/accounts/{address}/transactions/trc20", params)
+        except requests.RequestException as e:
+            logger.error(f"Failed to fetch transactions for {address}: {e}")
+            return None
+
+    async def monitor_deposit_addresses_async(self):
+        """Poll the per-user deposit addresses that are due, with bounded concurrency"""
+        await self.engine.call('db', self._sync_deposit_addresses)
+
+        due = self.address_scheduler.due()
+        if not due:
+            return
+
+        self.confirmation_service.refresh()
+        results = await self.engine.gather('tron', self._check_address_transactions, due)
+        credited = sum(1 for result in results if result is True)
+        logger.info(f"Checked {len(due)} deposit addresses, {credited} with new deposits "
+                    f"({self.address_scheduler.stats()})")
+
+    def _sync_deposit_addresses(self):
+        """Load deposit addresses created or reassigned since the last sync"""
+        try:
+            with self.get_db_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("""
+                        SELECT user_email, address,
+                               EXTRACT(EPOCH FROM COALESCE(updated_at, created_at))::float AS active_at
+                        FROM trc20_deposit_addresses
+                        WHERE COALESCE(updated_at, created_at) > to_timestamp(%s)
+                        ORDER BY active_at
+                    """, (self._addresses_synced_at,))
+                    rows = cur.fetchall()
+
+            # Hot or cold by real activity, but never scanned back past the lookback
+            lookback_start = time.time() - self.scan_lookback_hours * 3600
+            self.address_scheduler.add_many(
+                {**row, 'min_timestamp': int(max(row['active_at'], lookback_start) * 1000)}
+                for row in rows
+            )
+
+            if rows:
+                self._addresses_synced_at = max(self._addresses_synced_at, rows[-1]['active_at'])
+                logger.info(f"Tracking {len(self.address_scheduler)} deposit addresses (+{len(rows)})")
+
         except Exception as e:
-            logger.error(f"Error checking address {addr_info['address']}: {e}")
+            logger.error(f"Error loading deposit addresses: {e}")
 
-    def _is_usdt_deposit(self, tx: Dict) -> bool:
-        """Check if transaction is a USDT deposit to our main wallet"""
+    def _check_address_transactions(self, addr_info: Dict) -> bool:
+        """Check new transactions for a per-user deposit address, returning True if any were ingested"""
+        address = addr_info['address']
+        user_email = addr_info['user_email']
+        latest_timestamp = None
         try:
-            # Check if it's a TRC20 transfer to our main wallet address
-            to_address = tx.get('to')
-            token_info = tx.get('token_info', {})
-            contract_address = token_info.get('address', '')
+            fingerprint = None
+            ingested = False
 
-            # Verify it's USDT contract and sent to our main wallet
-            if (contract_address.lower() == self.usdt_contract_address.lower() and
-                to_address.lower() == self.main_wallet_address.lower()):
+            while True:
+                data = self._fetch_transfer_page(address, addr_info['min_timestamp'], fingerprint)
+                if data is None:
+                    self.address_scheduler.record(address, failed=True)
+                    return False
 
-                # Check if we haven't processed this transaction yet
-                tx_hash = tx.get('transaction_id')
-                if self._is_transaction_processed(tx_hash):
+                transactions = data.get('data', [])
+                deposits = [tx for tx in transactions if self._is_usdt_deposit(tx, address)]
+                unprocessed = self._filter_unprocessed_transactions(
+                    [tx.get('transaction_id') for tx in deposits]
+                )
+                new_deposits = [tx for tx in deposits if tx.get('transaction_id') in unprocessed]
+
+                inserted = self._ingest_deposits(new_deposits, user_email, address)
+                if inserted is None:
+                    self.address_scheduler.record(address, failed=True)
                     return False
+                ingested = ingested or bool(inserted)
+
+                for tx in transactions:
+                    latest_timestamp = max(latest_timestamp or 0, tx.get('block_timestamp', 0))
+
+                fingerprint = data.get('meta', {}).get('fingerprint')
+                if not fingerprint:
+                    break
 
-                return True
+            self.address_scheduler.record(address, latest_timestamp)
+            return ingested
 
+        except Exception as e:
+            logger.error(f"Error checking address {address}: {e}")
+            self.address_scheduler.record(address, failed=True)
             return False
+
+    def _is_usdt_deposit(self, tx: Dict, address: Optional[str] = None) -> bool:
+        """Check if transaction is a USDT transfer to our main wallet (or the given address)"""
+        try:
+            # Check if it's a TRC20 transfer to the watched address
+            to_address = tx.get('to') or ''
+            token_info = tx.get('token_info', {})
+            contract_address = token_info.get('address', '')
+            address = address or self.main_wallet_address
+
+            # Verify it's USDT contract and sent to the watched address
+            return (contract_address.lower() == self.usdt_contract_address.lower() and
+                    to_address.lower() == address.lower() and
+                    bool(tx.get('transaction_id')))
         except Exception as e:
             logger.error(f"Error checking if USDT deposit: {e}")
             return False
 
-    def _is_transaction_processed(self, tx_hash: str) -> bool:
-        """Check if transaction has already been processed"""
+    def _filter_unprocessed_transactions(self, tx_hashes: List[str]) -> Set[str]:
+        """Return the subset of transaction hashes not yet recorded in deposits.
+
+        Checks the whole batch in one round trip. Errors propagate so the caller
+        does not advance past transfers it could not check.
+        """
+        hashes = {tx_hash for tx_hash in tx_hashes if tx_hash}
+        if not hashes:
+            return set()
+
+        # Hashes the in-memory index can rule on never reach the database
+        _, new, unknown = self.tx_index.partition(hashes)
+        if not unknown:
+            return new
+
+        with stage('dedup'), self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                self.db_pool.execute_prepared(cur, 'filter_processed', (list(unknown),))
+                processed = {row[0] for row in cur.fetchall()}
+
+        self.tx_index.add_many(processed)
+        return new | (unknown - processed)
+
+    def _warm_tx_index(self):
+        """Load processed transaction hashes from deposits into the in-memory index"""
         try:
+            loaded = 0
             with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
+                # Server-side cursor so millions of rows stream in batches
+                with conn.cursor(name='tx_index_warmup') as cur:
+                    cur.itersize = 10000
                     cur.execute("""
-                        SELECT id FROM deposits
-                        WHERE transaction_hash = %s
-                        LIMIT 1
-                    """, (tx_hash,))
-                    return cur.fetchone() is not None
+                        SELECT transaction_hash FROM deposits
+                        WHERE transaction_hash IS NOT NULL
+                        ORDER BY created_at
+                    """)
+                    for (tx_hash,) in cur:
+                        self.tx_index.add(tx_hash)
+                        loaded += 1
+
+            self.tx_index.warmed = True
+            logger.info(f"Loaded {loaded} processed transactions into index: {self.tx_index.stats()}")
+
         except Exception as e:
-            logger.error(f"Error checking if transaction processed: {e}")
-            return True  # Assume processed to avoid duplicates
+            logger.error(f"Error warming transaction index: {e}")
 
-    def _process_deposit_transaction(self, tx: Dict):
-        """Process a confirmed deposit transaction"""
-        try:
-            tx_hash = tx.get('transaction_id')
-            if not tx_hash:
-                logger.error("No transaction hash found")
-                return
+    def _process_deposit_transaction(self, tx: Dict, user_email: str = SYSTEM_USER_EMAIL,
+                                     deposit_address: Optional[str] = None) -> bool:
+        """Process a single deposit transaction, returning False if it should be retried"""
+        return self._ingest_deposits([tx], user_email, deposit_address) is not None
 
-            # Extract transaction details
-            amount = self._extract_usdt_amount(tx)
-            from_address = tx.get('from', '')
-            block_timestamp = tx.get('block_timestamp', 0)
+    def _build_deposit_row(self, tx: Dict, user_email: str = SYSTEM_USER_EMAIL,
+                           deposit_address: Optional[str] = None) -> Optional[tuple]:
+        """Validate a deposit transaction and build its deposits row"""
+        tx_hash = tx.get('transaction_id')
+        if not tx_hash:
+            logger.error("No transaction hash found")
+            return None
 
-            if amount <= 0:
-                logger.warning(f"Invalid amount for transaction {tx_hash}: {amount}")
-                return
+        # Extract transaction details
+        amount = self._extract_usdt_amount(tx)
+        block_timestamp = tx.get('block_timestamp', 0)
 
-            # Validate deposit amount
-            if amount < self.min_deposit_amount or amount > self.max_deposit_amount:
-                logger.warning(f"Deposit amount {amount} outside limits for tx {tx_hash}")
-                return
+        if amount <= 0:
+            logger.warning(f"Invalid amount for transaction {tx_hash}: {amount}")
+            return None
 
-            # Get confirmations
-            confirmations = self._get_confirmations(tx_hash)
+        # Validate deposit amount
+        if amount < self.min_deposit_amount or amount > self.max_deposit_amount:
+            logger.warning(f"Deposit amount {amount} outside limits for tx {tx_hash}")
+            return None
 
-            logger.info(f"Processing deposit: {amount} USDT from {from_address} (tx: {tx_hash})")
+        # Always inserted pending: the wallet-credit triggers fire on the UPDATE to completed
+        return (
+            user_email,  # SYSTEM_USER_EMAIL until the user is identified
+            float(amount), 'USD', 'usdt-trc20', 'USDT', 'TRC20',
+            deposit_address or self.main_wallet_address, tx_hash, self._get_confirmations(tx),
+            self.min_confirmations, 'pending', float(amount), PENDING_CONFIRMATION_NOTE,
+            datetime.fromtimestamp(block_timestamp / 1000) if block_timestamp else datetime.now()
+        )
 
-            # Store deposit record in database
-            with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
+    def _ingest_deposits(self, transactions: List[Dict], user_email: str = SYSTEM_USER_EMAIL,
+                         deposit_address: Optional[str] = None) -> Optional[List[Dict]]:
+        """Bulk-insert deposit transactions, returning the newly inserted rows (None on error).
+
+        Duplicates are dropped by ON CONFLICT (transaction_hash) DO NOTHING, so the
+        same transfer can be ingested more than once without double-crediting.
+        Rows are inserted pending and the confirmed ones promoted in the same
+        transaction, so the wallet-credit triggers see the status change.
+        """
+        try:
+            rows = {}
+            for tx in self._reject_multi_transfer(transactions):
+                row = self._build_deposit_row(tx, user_email, deposit_address)
+                if row:
+                    rows[row[7]] = row
+            if not rows:
+                return []
+
+            txs_by_hash = {tx.get('transaction_id'): tx for tx in transactions}
+            with stage('insert'), self.get_db_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    inserted = execute_values(cur, """
                         INSERT INTO deposits
                         (user_email, amount, currency, method_id, method_name, network,
                          deposit_address, transaction_hash, confirmation_count,
-                         required_confirmations, status, final_amount, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        RETURNING id
-                    """, (
-                        'system@ticglobal.com',  # Will be updated when user is identified
-                        float(amount), 'USD', 'usdt-trc20', 'USDT', 'TRC20',
-                        self.main_wallet_address, tx_hash, confirmations,
-                        self.min_confirmations, 'pending', float(amount),
-                        datetime.fromtimestamp(block_timestamp / 1000) if block_timestamp else datetime.now()
-                    ))
-                    deposit_id = cur.fetchone()[0]
+                         required_confirmations, status, final_amount, admin_notes, created_at)
+                        VALUES %s
+                        ON CONFLICT (transaction_hash) DO NOTHING
+                        RETURNING id, transaction_hash, amount, status
+                    """, list(rows.values()), page_size=1000, fetch=True)
+
+                    # Only transfers read from a solid receipt know their block; listed
+                    # ones wait for process_pending_confirmations_async to read it
+                    confirmed = [str(deposit['id']) for deposit in inserted
+                                 if rows[deposit['transaction_hash']][8] >= self.min_confirmations
+                                 and txs_by_hash[deposit['transaction_hash']].get('block_number') is not None]
+                    if confirmed:
+                        self.db_pool.execute_prepared(cur, 'complete_deposits', (confirmed,))
+                        completed = {str(row['id']) for row in cur.fetchall()}
+                        for deposit in inserted:
+                            if str(deposit['id']) in completed:
+                                deposit['status'] = 'completed'
                     conn.commit()
 
-            # Auto-credit if enough confirmations
-            if confirmations >= self.min_confirmations:
-                self._auto_credit_deposit(deposit_id, tx_hash, amount)
+            # Conflicting rows are already in the database too
+            self.tx_index.add_many(rows.keys())
+
+            for deposit in inserted:
+                DEPOSITS.inc(status=deposit['status'])
+                if deposit['status'] == 'completed':
+                    self._observe_credit_latency(txs_by_hash[deposit['transaction_hash']].get('block_timestamp'))
+                amount = Decimal(str(deposit['amount']))
+                logger.info(f"Processed deposit: {amount} USDT (ID: {deposit['id']}, "
+                            f"tx: {deposit['transaction_hash']}, status: {deposit['status']})")
+                if deposit['status'] == 'completed':
+                    self._notify_admin_deposit(deposit['id'], deposit['transaction_hash'], amount)
+                else:
+                    self._queue_pending_deposit(deposit, txs_by_hash[deposit['transaction_hash']])
 
-            logger.info(f"Processed deposit: {amount} USDT (ID: {deposit_id})")
+            logger.info(f"Ingested {len(inserted)} new deposits ({len(rows) - len(inserted)} already recorded)")
+            return inserted
 
         except Exception as e:
-            logger.error(f"Error processing deposit transaction: {e}")
+            logger.error(f"Error ingesting deposit transactions: {e}")
+            return None
+
+    def _reject_multi_transfer(self, transactions: List[Dict]) -> List[Dict]:
+        """Drop, with an error, transactions carrying more than one distinct transfer.
+
+        deposits holds one row per transaction hash, so a second transfer in the
+        same transaction could never be recorded. Repeats of one transfer are kept.
+        """
+        transfers: Dict[str, set] = {}
+        for tx in transactions:
+            transfers.setdefault(tx.get('transaction_id'), set()).add(
+                (tx.get('to'), str(tx.get('value')), tx.get('log_index'))
+            )
+
+        rejected = {tx_hash for tx_hash, seen in transfers.items() if len(seen) > 1}
+        for tx_hash in rejected:
+            DEPOSITS.inc(status='rejected')
+            logger.error(f"Rejected tx {tx_hash}: it carries {len(transfers[tx_hash])} USDT transfers to "
+                         f"watched addresses and deposits record one per transaction; credit it manually")
+        return [tx for tx in transactions if tx.get('transaction_id') not in rejected]
+
+    def _observe_credit_latency(self, block_timestamp: Optional[int]):
+        """Record the time from a deposit's block to its credit"""
+        if block_timestamp:
+            DEPOSIT_CREDIT_SECONDS.observe(max(0.0, time.time() - block_timestamp / 1000))
 
     def _extract_usdt_amount(self, tx: Dict) -> Decimal:
         """Extract USDT amount from transaction"""
@@ -297,67 +924,144 @@ class TRC20AutomationService:
             logger.error(f"Error extracting USDT amount: {e}")
             return Decimal('0.0')
 
-    def _get_confirmations(self, tx_hash: str) -> int:
-        """Get number of confirmations for transaction"""
+    def _get_confirmations(self, tx: Dict) -> int:
+        """Get number of confirmations for transaction against the cached solid head"""
         try:
-            tx_info = self.tron.get_transaction(tx_hash)
-            if 'blockNumber' in tx_info:
-                current_block = self.tron.get_latest_solid_block_number()
-                return current_block - tx_info['blockNumber']
-            return 0
+            return self.confirmation_service.confirmations(tx)
         except Exception as e:
             logger.error(f"Error getting confirmations: {e}")
             return 0
 
-    def _credit_user_wallet(self, user_email: str, amount: Decimal, tx_hash: str):
-        """Credit user's wallet with deposited amount"""
+    def _fetch_solid_head(self, provider: Optional[Any] = None) -> Dict[str, Any]:
+        """Fetch the latest solid block number, timestamp and id (the withdrawal ref-block)"""
+        block = (provider or self.trongrid).post('walletsolidity/getnowblock')
+        raw_data = block['block_header']['raw_data']
+        return {'number': raw_data['number'], 'timestamp': raw_data['timestamp'], 'id': block['blockID']}
+
+    def _queue_pending_deposit(self, deposit: Dict, tx: Dict):
+        """Queue an unconfirmed deposit to be credited once its block is deep enough"""
+        block_number = self.confirmation_service.block_number(tx)
+        if block_number is None:
+            # No solid head yet; it is picked up again by the next warm start
+            logger.warning(f"Cannot place pending deposit {deposit['id']} without a solid head")
+            return
+
+        self.pending_confirmations.push({
+            'id': deposit['id'],
+            'transaction_hash': deposit['transaction_hash'],
+            'amount': Decimal(str(deposit['amount'])),
+            'block_number': block_number,
+            'block_timestamp': tx.get('block_timestamp'),
+            # Decoded from a solid receipt rather than estimated from a timestamp
+            'solid': tx.get('block_number') is not None
+        })
+
+    def _warm_pending_confirmations(self):
+        """Queue deposits this service left pending before a restart"""
         try:
-            # Call your existing wallet credit function
             with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT credit_user_wallet(%s, %s, %s, %s)
-                    """, (user_email, float(amount), tx_hash, 'TRC20 USDT Deposit'))
-                    conn.commit()
-            
-            # Update deposit status
-            with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute("""
-                        UPDATE trc20_deposits 
-                        SET status = 'completed', completed_at = NOW()
-                        WHERE transaction_hash = %s
-                    """, (tx_hash,))
-                    conn.commit()
-                    
-            logger.info(f"Credited {amount} USDT to {user_email}")
-            
+                        SELECT id, transaction_hash, amount,
+                               (EXTRACT(EPOCH FROM created_at) * 1000)::bigint AS block_timestamp
+                        FROM deposits
+                        WHERE status = 'pending' AND method_id = 'usdt-trc20'
+                          AND admin_notes = %s
+                    """, (PENDING_CONFIRMATION_NOTE,))
+                    rows = cur.fetchall()
+
+            # created_at holds the transfer's block timestamp
+            self.confirmation_service.refresh()
+            for row in rows:
+                self._queue_pending_deposit(row, {'block_timestamp': row['block_timestamp']})
+
+            logger.info(f"Loaded {len(rows)} deposits awaiting confirmations")
+
         except Exception as e:
-            logger.error(f"Error crediting wallet: {e}")
+            logger.error(f"Error loading pending deposits: {e}")
 
-    def _auto_credit_deposit(self, deposit_id: str, tx_hash: str, amount: Decimal):
-        """Auto-credit deposit to system (since we don't know the user yet)"""
-        try:
-            with self.get_db_connection() as conn:
-                with conn.cursor() as cur:
-                    # Update deposit status to completed
-                    cur.execute("""
-                        UPDATE deposits
-                        SET status = 'completed',
-                            updated_at = %s,
-                            admin_notes = 'Auto-credited by TRC20 automation service'
-                        WHERE id = %s
-                    """, (datetime.now(), deposit_id))
+    async def process_pending_confirmations_async(self):
+        """Credit, in one batched update, every queued deposit the solid node has confirmed.
 
-                    conn.commit()
+        Deposits found by listing only have a block estimated from their
+        timestamp. Once that estimate is deep enough their receipts are read from
+        the solid node in one batch, and they are credited only if the receipt
+        carries the transfer and its real block is deep enough.
+        """
+        head = await self.engine.call('tron', self.confirmation_service.refresh)
+        if not head or not len(self.pending_confirmations):
+            return
 
-            logger.info(f"Auto-credited deposit {deposit_id}: {amount} USDT (tx: {tx_hash})")
+        released = self.pending_confirmations.pop_confirmed(head['number'])
+        if not released:
+            return
 
-            # Notify admin about the deposit
-            self._notify_admin_deposit(deposit_id, tx_hash, amount)
+        unverified = [entry for entry in released if not entry.get('solid')]
+        tx_infos = await self.engine.gather(
+            'tron', lambda entry: self.trongrid.post('walletsolidity/gettransactioninfobyid',
+                                                     {'value': entry['transaction_hash']}),
+            unverified
+        )
+        receipts = {entry['transaction_hash']: info for entry, info in zip(unverified, tx_infos)}
 
+        confirmed = []
+        for entry in released:
+            if not entry.get('solid'):
+                info = receipts[entry['transaction_hash']]
+                if isinstance(info, BaseException) or not info or info.get('id') != entry['transaction_hash']:
+                    # Not solid yet (or the lookup failed); read again one confirmation window later
+                    self.pending_confirmations.push({**entry, 'block_number': head['number']})
+                    continue
+                if not self._receipt_has_deposit(info, entry):
+                    DEPOSITS.inc(status='rejected')
+                    logger.error(f"Deposit {entry['id']} left pending: the solid receipt of "
+                                 f"{entry['transaction_hash']} carries no matching USDT transfer")
+                    continue
+                entry = {**entry, 'block_number': info['blockNumber'], 'solid': True}
+                if head['number'] - entry['block_number'] < self.pending_confirmations.min_confirmations:
+                    self.pending_confirmations.push(entry)
+                    continue
+            confirmed.append(entry)
+
+        if confirmed:
+            await self.engine.call('db', self._credit_confirmed_deposits, confirmed, head['number'])
+
+    def _receipt_has_deposit(self, info: Dict, entry: Dict) -> bool:
+        """Check that a solid receipt carries a successful USDT transfer of the deposit's amount"""
+        amount = Decimal(str(entry['amount'])).quantize(Decimal('0.000001'))
+        return any(
+            self._extract_usdt_amount(transfer).quantize(Decimal('0.000001')) == amount
+            for transfer in decode_transfer_logs([info], self.usdt_contract_address)
+        )
+
+    def _credit_confirmed_deposits(self, confirmed: List[Dict], head_number: int):
+        """Promote confirmed pending deposits to completed, requeueing them on error"""
+        try:
+            with stage('credit'), self.get_db_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    self.db_pool.execute_prepared(
+                        cur, 'complete_deposits', ([str(entry['id']) for entry in confirmed],)
+                    )
+                    credited = cur.fetchall()
+                    conn.commit()
         except Exception as e:
-            logger.error(f"Error auto-crediting deposit: {e}")
+            logger.error(f"Error crediting confirmed deposits: {e}")
+            for entry in confirmed:
+                self.pending_confirmations.push(entry)
+            return
+
+        # Rows an admin already handled are skipped by the status filter
+        self.pending_confirmations.record_credited(confirmed)
+        DEPOSITS.inc(len(credited), status='credited')
+        block_timestamps = {str(entry['id']): entry.get('block_timestamp') for entry in confirmed}
+        for deposit in credited:
+            self._observe_credit_latency(block_timestamps.get(str(deposit['id'])))
+            amount = Decimal(str(deposit['amount']))
+            logger.info(f"Auto-credited deposit {deposit['id']}: {amount} USDT (tx: {deposit['transaction_hash']})")
+            self._notify_admin_deposit(deposit['id'], deposit['transaction_hash'], amount)
+
+        logger.info(f"Credited {len(credited)} confirmed deposits at block {head_number} "
+                    f"({self.pending_confirmations.stats()})")
 
     def _notify_admin_deposit(self, deposit_id: str, tx_hash: str, amount: Decimal):
         """Notify admin about new deposit"""
@@ -374,83 +1078,541 @@ class TRC20AutomationService:
     def process_withdrawal(self, withdrawal_id: str) -> Dict[str, Any]:
         """Process a withdrawal request"""
         try:
-            # Get withdrawal details
-            with self.get_db_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT * FROM trc20_withdrawals 
-                        WHERE id = %s AND status = 'pending'
-                    """, (withdrawal_id,))
-                    withdrawal = cur.fetchone()
-            
-            if not withdrawal:
+            claimed = self._claim_withdrawals(withdrawal_id=withdrawal_id)
+            if not claimed:
                 return {'success': False, 'error': 'Withdrawal not found'}
-            
-            # Create and send transaction
-            private_key = PrivateKey(bytes.fromhex(self.main_wallet_private_key))
-            
-            # Build USDT transfer transaction
-            txn = (
-                self.usdt_contract.functions.transfer(
-                    withdrawal['to_address'],
-                    int(withdrawal['amount'] * 1_000_000)  # USDT has 6 decimals
-                )
-                .with_owner(self.main_wallet_address)
-                .fee_limit(50_000_000)  # 50 TRX fee limit
-                .build()
-                .sign(private_key)
-            )
-            
-            # Broadcast transaction
-            result = txn.broadcast()
-            
-            if result['result']:
-                tx_hash = result['txid']
-                
-                # Update withdrawal status
-                with self.get_db_connection() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            UPDATE trc20_withdrawals 
-                            SET status = 'broadcasted', 
-                                transaction_hash = %s,
-                                broadcasted_at = NOW()
-                            WHERE id = %s
-                        """, (tx_hash, withdrawal_id))
-                        conn.commit()
-                
-                logger.info(f"Withdrawal broadcasted: {tx_hash}")
+
+            self.confirmation_service.refresh()
+            try:
+                signed = self._build_signed_withdrawal(claimed[0])
+            except Exception:
+                self._release_withdrawals([claimed[0]['id']])
+                raise
+
+            self._record_signed_withdrawals([signed])
+            result = self._broadcast_withdrawal(signed)
+            self._record_broadcast_results([result])
+
+            if result['ok']:
                 return {
                     'success': True,
-                    'transaction_hash': tx_hash,
+                    'transaction_hash': result['txid'],
                     'message': 'Withdrawal broadcasted successfully'
                 }
-            else:
-                return {'success': False, 'error': 'Failed to broadcast transaction'}
-                
+            return {'success': False, 'error': result['error'] or 'Failed to broadcast transaction'}
+
         except Exception as e:
             logger.error(f"Error processing withdrawal: {e}")
             return {'success': False, 'error': str(e)}
 
-    def _encrypt_private_key(self, private_key: str) -> str:
-        """Encrypt private key for storage (implement proper encryption)"""
-        # TODO: Implement proper encryption
-        return private_key
+    async def process_withdrawals_async(self):
+        """Claim a batch of pending withdrawals, sign them in parallel and broadcast them concurrently"""
+        claimed = await self.engine.call('db', self._claim_withdrawals, self.withdrawal_batch_size)
+        if not claimed:
+            return
+
+        claimed, deferred = await self.engine.call('tron', self._split_affordable_withdrawals, claimed)
+        if deferred:
+            await self.engine.call('db', self._release_withdrawals, [w['id'] for w in deferred])
+        if not claimed:
+            return
+
+        # One solid head provides the ref-block for the whole batch
+        await self.engine.call('tron', self.confirmation_service.refresh)
+        started = time.monotonic()
+
+        built = await self.engine.gather('sign', self._build_signed_withdrawal, claimed)
+        signed = [item for item in built if not isinstance(item, BaseException)]
+        unsigned = [w['id'] for w, item in zip(claimed, built) if isinstance(item, BaseException)]
+        for error in (item for item in built if isinstance(item, BaseException)):
+            logger.error(f"Error building withdrawal transaction: {error}")
+
+        if unsigned:
+            await self.engine.call('db', self._release_withdrawals, unsigned)
+        if not signed:
+            return
+
+        # Persist txids before broadcasting so a crash never loses track of a payout
+        await self.engine.call('db', self._record_signed_withdrawals, signed)
+        results = await self.engine.gather('broadcast', self._broadcast_withdrawal, signed)
+        results = [r for r in results if not isinstance(r, BaseException)]
+        await self.engine.call('db', self._record_broadcast_results, results)
+
+        broadcasted = sum(1 for r in results if r['ok'])
+        elapsed = time.monotonic() - started
+        logger.info(f"Broadcasted {broadcasted}/{len(claimed)} withdrawals in {elapsed:.1f}s")
+
+    @property
+    def signer(self) -> 'PrivateKey':
+        """Main wallet signing key, parsed once"""
+        if self._signer is None:
+            from tronpy.keys import PrivateKey
+            self._signer = PrivateKey(bytes.fromhex(self.main_wallet_private_key))
+        return self._signer
+
+    def _claim_withdrawals(self, limit: int = 1, withdrawal_id: Optional[str] = None) -> List[Dict]:
+        """Move pending withdrawals to processing; concurrent workers never claim the same row"""
+        with self.get_db_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    UPDATE trc20_withdrawals
+                    SET status = 'processing'
+                    WHERE id IN (
+                        SELECT id FROM trc20_withdrawals
+                        WHERE status = 'pending' AND (%s::text IS NULL OR id::text = %s::text)
+                        ORDER BY created_at
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING *
+                """, (withdrawal_id, withdrawal_id, limit))
+                claimed = cur.fetchall()
+                conn.commit()
+        return claimed
+
+    def _release_withdrawals(self, withdrawal_ids: List[Any]):
+        """Return withdrawals that were never signed to pending"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE trc20_withdrawals
+                    SET status = 'pending'
+                    WHERE id::text = ANY(%s) AND status = 'processing'
+                """, ([str(i) for i in withdrawal_ids],))
+                conn.commit()
+
+    def _split_affordable_withdrawals(self, withdrawals: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Split a batch into the withdrawals the main wallet's TRX can pay for and the rest"""
+        try:
+            prediction = self.fee_estimator.predict_batch(
+                [(w['to_address'], int(w['amount'] * 1_000_000)) for w in withdrawals]
+            )
+            balance_sun = int(self.tron.get_account_balance(self.main_wallet_address) * 1_000_000)
+        except Exception as e:
+            logger.error(f"Error predicting withdrawal fees, sending the batch as is: {e}")
+            return withdrawals, []
+
+        affordable = sum(1 for burned in prediction['burn_sun'] if burned <= balance_sun)
+        logger.info(f"Predicted spend for {len(withdrawals)} withdrawals: {prediction['energy']} energy, "
+                    f"{prediction['total_burn_sun'] / 1_000_000:.2f} TRX burned "
+                    f"(balance {balance_sun / 1_000_000:.2f} TRX)")
+        if affordable < len(withdrawals):
+            logger.warning(f"Insufficient TRX for fees, deferring {len(withdrawals) - affordable} withdrawals")
+        return withdrawals[:affordable], withdrawals[affordable:]
+
+    def _build_signed_withdrawal(self, withdrawal: Dict) -> Dict[str, Any]:
+        """Build and sign a USDT transfer against the cached ref-block"""
+        amount_sun = int(withdrawal['amount'] * 1_000_000)  # USDT has 6 decimals
+        with stage('withdrawal_build'):
+            builder = (
+                self.usdt_contract.functions.transfer(withdrawal['to_address'], amount_sun)
+                .with_owner(self.main_wallet_address)
+                .fee_limit(self.fee_estimator.fee_limit(withdrawal['to_address'], amount_sun))
+            )
+
+            head = self.confirmation_service.head
+            if not head or not head.get('id'):
+                raise RuntimeError("No solid head to use as the withdrawal ref-block")
+            try:
+                # Offline build computes the txid locally from the shared ref-block;
+                # a malformed ref-block raises instead of signing against another one
+                txn = builder.build(offline=True, ref_block_id=head['id'])
+            except (ImportError, AttributeError) as e:
+                # Older tronpy without offline support (or protobuf) fetches its own ref-block
+                logger.warning(f"Offline build unavailable, tronpy picks the ref-block: {e}")
+                txn = builder.build()
+
+        with stage('withdrawal_sign'):
+            txn.sign(self.signer)
+        return {
+            'withdrawal': withdrawal,
+            'txn': txn,
+            'txid': txn.txid,
+            'expiration': txn.to_json()['raw_data'].get('expiration')
+        }
+
+    def _record_signed_withdrawals(self, signed: List[Dict]):
+        """Store the txids of signed withdrawals in one statement"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE trc20_withdrawals AS w
+                    SET status = 'signed', transaction_hash = data.txid
+                    FROM (VALUES %s) AS data(id, txid)
+                    WHERE w.id::text = data.id
+                """, [(str(item['withdrawal']['id']), item['txid']) for item in signed])
+                conn.commit()
+        WITHDRAWALS.inc(len(signed), status='signed')
+
+        for item in signed:
+            created_at = item['withdrawal'].get('created_at')
+            self.withdrawal_tracker.track({
+                'id': item['withdrawal']['id'],
+                'txid': item['txid'],
+                'expiration': item['expiration'],
+                'created_at': created_at.timestamp() if created_at else None
+            })
+
+    def _broadcast_withdrawal(self, item: Dict) -> Dict[str, Any]:
+        """Broadcast a signed withdrawal; ok is None when the outcome is unknown"""
+        from tronpy.exceptions import TransactionError, ValidationError
+        withdrawal_id = item['withdrawal']['id']
+        try:
+            with stage('withdrawal_broadcast'):
+                result = self.tron.broadcast(item['txn'])
+            ok = bool(result.get('result'))
+            error = None if ok else result.get('message') or result.get('code')
+            if ok:
+                logger.info(f"Withdrawal broadcasted: {item['txid']}")
+            else:
+                logger.error(f"Withdrawal {withdrawal_id} rejected by node: {error}")
+            return {'id': withdrawal_id, 'txid': item['txid'], 'ok': ok, 'error': error}
+        except (TransactionError, ValidationError, ValueError) as e:
+            logger.error(f"Withdrawal {withdrawal_id} rejected by node: {e}")
+            return {'id': withdrawal_id, 'txid': item['txid'], 'ok': False, 'error': str(e)}
+        except Exception as e:
+            # The node may or may not have accepted it; leave the row signed
+            logger.error(f"Error broadcasting withdrawal {withdrawal_id}: {e}")
+            return {'id': withdrawal_id, 'txid': item['txid'], 'ok': None, 'error': str(e)}
+
+    def _record_broadcast_results(self, results: List[Dict]):
+        """Mark broadcasted and rejected withdrawals in bulk"""
+        broadcasted = [str(r['id']) for r in results if r['ok']]
+        rejected = [str(r['id']) for r in results if r['ok'] is False]
+        for result in results:
+            if result['ok'] is False:
+                self.withdrawal_tracker.untrack(result['txid'])
+        if not broadcasted and not rejected:
+            return
+
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                if broadcasted:
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'broadcasted', broadcasted_at = NOW()
+                        WHERE id::text = ANY(%s)
+                    """, (broadcasted,))
+                if rejected:
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'failed'
+                        WHERE id::text = ANY(%s)
+                    """, (rejected,))
+                conn.commit()
+        WITHDRAWALS.inc(len(broadcasted), status='broadcasted')
+        WITHDRAWALS.inc(len(rejected), status='rejected')
+
+    def _recover_withdrawals(self):
+        """Return withdrawals claimed but never signed before a restart to pending"""
+        try:
+            with self.get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'pending'
+                        WHERE status = 'processing' AND transaction_hash IS NULL
+                    """)
+                    recovered = cur.rowcount
+                    conn.commit()
+            if recovered:
+                logger.info(f"Returned {recovered} interrupted withdrawals to pending")
+        except Exception as e:
+            logger.error(f"Error recovering withdrawals: {e}")
+
+    async def track_withdrawals_async(self):
+        """Resolve in-flight withdrawals from the receipts of each new solid block"""
+        tracker = self.withdrawal_tracker
+        # Head, receipts and expiry lookups all come from one provider, so a
+        # lagging node cannot make a block look empty or a withdrawal look absent
+        tron = self.trongrid.pinned()
+        try:
+            head = await self.engine.call('tron', self._fetch_solid_head, tron)
+        except Exception as e:
+            logger.error(f"Error fetching solid head block: {e}")
+            return
+        if head['number'] <= (tracker.last_block or 0):
+            return
+
+        # Anything signed from here on lands above the current solid head
+        if tracker.last_block is None or not len(tracker):
+            tracker.last_block = head['number']
+            return
+
+        confirmed, failed = [], []
+        last_block = min(head['number'], tracker.last_block + self.block_scan_max_blocks)
+        for batch_start in range(tracker.last_block + 1, last_block + 1, self.block_scan_batch):
+            block_numbers = range(batch_start, min(batch_start + self.block_scan_batch, last_block + 1))
+            results = await self.engine.gather(
+                'tron', lambda num: fetch_block_receipts(tron.post, num), block_numbers
+            )
+
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                logger.error(f"Error fetching receipts for blocks {block_numbers[0]}-{block_numbers[-1]}: {errors[0]}")
+                break
+
+            for tx_infos in results:
+                block_confirmed, block_failed = tracker.match_receipts(tx_infos)
+                confirmed.extend(block_confirmed)
+                failed.extend(block_failed)
+            tracker.last_block = block_numbers[-1]
+
+        # Past its expiration a txid missing from every solid block can never be included,
+        # but it is only re-queued once the solid node confirms it does not know it
+        expired = []
+        candidates = tracker.past_expiration(head['timestamp']) if tracker.last_block == head['number'] else []
+        if candidates:
+            results = await self.engine.gather(
+                'tron', lambda entry: tron.post('walletsolidity/gettransactioninfobyid', {'value': entry['txid']}),
+                candidates
+            )
+            absent, tx_infos = [], []
+            for entry, info in zip(candidates, results):
+                if isinstance(info, BaseException) or (info and not info.get('id')):
+                    # Unknown state; checked again next block
+                    logger.warning(f"Could not confirm expired withdrawal {entry['id']} is absent: {info}")
+                elif info:
+                    tx_infos.append(info)
+                else:
+                    absent.append(entry['txid'])
+            block_confirmed, block_failed = tracker.match_receipts(tx_infos)
+            confirmed.extend(block_confirmed)
+            failed.extend(block_failed)
+            expired = tracker.expire(absent)
+
+        if confirmed or failed or expired:
+            await self.engine.call('db', self._record_withdrawal_outcomes, confirmed, failed, expired)
+            stats = tracker.stats()
+            logger.info(f"Withdrawals: {len(confirmed)} confirmed, {len(failed)} failed, "
+                        f"{len(expired)} expired and re-queued; {stats['in_flight']} in flight, "
+                        f"payout latency avg {stats['latency_avg_seconds']:.0f}s "
+                        f"max {stats['latency_max_seconds']:.0f}s")
+
+    def _record_withdrawal_outcomes(self, confirmed: List[Dict], failed: List[Dict], expired: List[Dict]):
+        """Mark confirmed and failed withdrawals and return expired ones to pending in bulk"""
+        for entry in failed:
+            logger.error(f"Withdrawal {entry['id']} failed on chain: {entry.get('reason')}")
+
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                if confirmed:
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'confirmed', confirmed_at = NOW()
+                        WHERE transaction_hash = ANY(%s)
+                    """, ([e['txid'] for e in confirmed],))
+                if failed:
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'failed'
+                        WHERE transaction_hash = ANY(%s)
+                    """, ([e['txid'] for e in failed],))
+                if expired:
+                    # Cleared hashes let the withdrawals job claim and re-sign them
+                    cur.execute("""
+                        UPDATE trc20_withdrawals
+                        SET status = 'pending', transaction_hash = NULL, broadcasted_at = NULL
+                        WHERE transaction_hash = ANY(%s) AND status IN ('signed', 'broadcasted')
+                    """, ([e['txid'] for e in expired],))
+                conn.commit()
+        WITHDRAWALS.inc(len(confirmed), status='confirmed')
+        WITHDRAWALS.inc(len(failed), status='failed')
+        WITHDRAWALS.inc(len(expired), status='expired')
+
+    def _warm_withdrawal_tracker(self):
+        """Track withdrawals signed or broadcasted before a restart"""
+        try:
+            head = self.confirmation_service.refresh(force=True)
+            if not head:
+                return
+            self.withdrawal_tracker.last_block = head['number']
+
+            with self.get_db_connection() as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("""
+                        SELECT id, transaction_hash, created_at
+                        FROM trc20_withdrawals
+                        WHERE status IN ('signed', 'broadcasted') AND transaction_hash IS NOT NULL
+                    """)
+                    rows = cur.fetchall()
+
+            # A transaction expires at most 60s after it is signed, so now + 60s is a
+            # safe bound for anything that is not already in a solid block
+            expiration = int((time.time() + 60) * 1000)
+            tx_infos = []
+            for row in rows:
+                self.withdrawal_tracker.track({
+                    'id': row['id'],
+                    'txid': row['transaction_hash'],
+                    'expiration': expiration,
+                    'created_at': row['created_at'].timestamp() if row['created_at'] else None
+                })
+                try:
+                    tx_infos.append(self.tron.get_solid_transaction_info(row['transaction_hash']))
+                except Exception:
+                    # Not in a solid block yet; the block receipts will resolve it
+                    pass
+
+            confirmed, failed = self.withdrawal_tracker.match_receipts(tx_infos)
+            if confirmed or failed:
+                self._record_withdrawal_outcomes(confirmed, failed, [])
+            logger.info(f"Tracking {len(self.withdrawal_tracker)} in-flight withdrawals")
+        except Exception as e:
+            logger.error(f"Error warming withdrawal tracker: {e}")
+
+    @property
+    def key_vault(self) -> 'KeyVault':
+        """Envelope encryption vault, opened on first use"""
+        if self._key_vault is None:
+            from key_vault import FileKEK, KeyVault
+            if not self.kek_file:
+                raise RuntimeError("KEY_ENCRYPTION_KEY_FILE is not set; refusing to store private keys unencrypted")
+            self._key_vault = KeyVault(
+                FileKEK(self.kek_file),
+                save_data_key=self._save_data_key,
+                load_data_key=self._load_data_key,
+                rotate_after=self.dek_rotation_hours * 3600,
+                max_uses=self.dek_max_uses
+            )
+        return self._key_vault
+
+    def _save_data_key(self, dek_id: str, wrapped_key: str, kek_id: str):
+        """Persist a wrapped data key before it encrypts anything"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO trc20_data_keys (id, wrapped_key, kek_id)
+                    VALUES (%s, %s, %s)
+                """, (dek_id, wrapped_key, kek_id))
+                conn.commit()
+
+    def _load_data_key(self, dek_id: str) -> Optional[Tuple[str, str]]:
+        """Load a wrapped data key and the id of the KEK that wrapped it"""
+        with self.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT wrapped_key, kek_id FROM trc20_data_keys WHERE id = %s", (dek_id,))
+                row = cur.fetchone()
+        return tuple(row) if row else None
+
+    def _encrypt_private_key(self, private_key: str, address: Optional[str] = None) -> str:
+        """Encrypt private key for storage, bound to its address"""
+        return self.key_vault.encrypt(private_key, address)
+
+    def _encrypt_private_keys(self, private_keys: List[str], addresses: List[str]) -> List[str]:
+        """Encrypt a batch of private keys, each bound to its address"""
+        return self.key_vault.encrypt_many(private_keys, addresses)
+
+    def _decrypt_private_keys(self, encrypted_keys: List[str], addresses: List[str]) -> List[str]:
+        """Decrypt a batch of stored private keys, e.g. for a sweep"""
+        return self.key_vault.decrypt_many(encrypted_keys, addresses)
+
+    def reencrypt_legacy_keys(self, batch_size: int = 500) -> int:
+        """Encrypt deposit address keys stored in plaintext before envelope encryption.
+
+        Each batch is checked to decrypt back to the original keys before it
+        replaces them, and rows are locked so a concurrent run skips them.
+        Returns the number of keys re-encrypted.
+        """
+        total = 0
+        while True:
+            with self.get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT address, private_key_encrypted FROM trc20_deposit_addresses
+                        WHERE private_key_encrypted IS NOT NULL AND private_key_encrypted NOT LIKE 'v1:%%'
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    """, (batch_size,))
+                    rows = cur.fetchall()
+                    if not rows:
+                        conn.rollback()
+                        break
+
+                    addresses = [address for address, _ in rows]
+                    private_keys = [private_key for _, private_key in rows]
+                    encrypted = self._encrypt_private_keys(private_keys, addresses)
+                    if self._decrypt_private_keys(encrypted, addresses) != private_keys:
+                        conn.rollback()
+                        raise RuntimeError("Re-encrypted keys do not decrypt to the originals; nothing was written")
+
+                    execute_values(cur, """
+                        UPDATE trc20_deposit_addresses AS t
+                        SET private_key_encrypted = v.private_key_encrypted
+                        FROM (VALUES %s) AS v(address, private_key_encrypted)
+                        WHERE t.address = v.address
+                    """, list(zip(addresses, encrypted)), page_size=batch_size)
+                    conn.commit()
+
+            total += len(rows)
+            logger.info(f"Re-encrypted {total} legacy deposit address keys")
+        return total
+
+    def _collect_metrics(self):
+        """Copy queue depths and the solid head age into gauges at scrape time"""
+        QUEUE_DEPTH.set(len(self.pending_confirmations), queue='pending_confirmations')
+        QUEUE_DEPTH.set(len(self.withdrawal_tracker), queue='withdrawals_in_flight')
+        QUEUE_DEPTH.set(self.event_receiver.stats()['depth'], queue='pushed_events')
+        QUEUE_DEPTH.set(len(self.address_scheduler), queue='deposit_addresses')
+        head = self.confirmation_service.cached_head
+        if head:
+            SOLID_HEAD_AGE.set(max(0.0, time.time() - head['timestamp'] / 1000))
 
     def start_monitoring(self):
         """Start the monitoring service"""
         logger.info("Starting TRC20 monitoring service...")
-        
-        while True:
-            try:
-                self.monitor_deposits()
-                time.sleep(30)  # Check every 30 seconds
-            except KeyboardInterrupt:
-                logger.info("Monitoring service stopped")
-                break
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(60)  # Wait longer on error
+        TRACER.install_signal_handler()
+        if self.metrics_server:
+            REGISTRY.add_collector(self._collect_metrics)
+            self.metrics_server.start()
+        self._warm_tx_index()
+        self._warm_pending_confirmations()
+
+        # Each job runs on its own schedule, so a slow TronGrid or database call
+        # only delays the job that made it
+        self.engine = AsyncEngine(
+            limits={
+                'tron': int(os.getenv('TRON_CONCURRENCY', '4')),
+                'db': int(os.getenv('DB_CONCURRENCY', '8')),
+                'notify': int(os.getenv('NOTIFY_CONCURRENCY', '4')),
+                'sign': int(os.getenv('SIGN_CONCURRENCY', '4')),
+                'broadcast': int(os.getenv('BROADCAST_CONCURRENCY', '8'))
+            },
+            call_timeout=float(os.getenv('CALL_TIMEOUT', '60')),
+            error_backoff=float(os.getenv('ERROR_RETRY_INTERVAL', '60'))
+        )
+        self.engine.add_job('confirmations', self.process_pending_confirmations_async, 3)
+        if self._address_pool_enabled():
+            self.engine.add_job('address_pool', self.refill_address_pool, self.address_pool_interval)
+        if self.main_wallet_private_key:
+            self._recover_withdrawals()
+            self._warm_withdrawal_tracker()
+            self.engine.add_job('withdrawals', self.process_withdrawals_async, self.withdrawal_interval)
+            self.engine.add_job('withdrawal_tracker', self.track_withdrawals_async, 3)
+
+        scan_mode, scan_interval = self.ingestion_mode, None
+        if self.ingestion_mode == 'push':
+            self._sync_deposit_addresses()
+            self.event_receiver.start()
+            self.engine.add_job('events', self.ingest_pushed_events_async, 0)
+            # Polling stays on as a slow reconciler for events missed while down
+            scan_mode, scan_interval = self.reconcile_mode, self.reconcile_interval
+
+        if scan_mode == 'blocks':
+            self.engine.add_job('block_scan', self.scan_blocks_async, scan_interval or 3)
+        else:
+            self.engine.add_job('deposits', self.monitor_deposits, scan_interval or self.monitoring_interval)
+            self.engine.add_job('deposit_addresses', self.monitor_deposit_addresses_async,
+                                scan_interval or self.address_monitor_interval)
+        self.engine.run()
+
+        logger.info("Monitoring service stopped")
+        self.event_receiver.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self._keygen_executor is not None:
+            self._keygen_executor.shutdown()
+        self.db_pool.close()
 
 if __name__ == "__main__":
     service = TRC20AutomationService()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Metrics for TRC20 Automation Service
+Counters, gauges and latency histograms served in the Prometheus text format
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Registry:
+    """Collection of metrics rendered together; collectors refresh gauges at scrape time"""
+
+    def __init__(self):
+        self._metrics: List['_Metric'] = []
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric'):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Call collector before every scrape, e.g. to copy queue depths into gauges"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return ''.join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional[Registry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def _header(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"{self.name}{_format_labels(key)} {float(value)}\n" for key, value in values.items()]
+        return self._header() + ''.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, registry: Optional[Registry] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with-block takes, including when it raises"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def render(self) -> str:
+        with self._lock:
+            values = {key: {'counts': list(e['counts']), 'sum': e['sum'], 'count': e['count']}
+                      for key, e in self._values.items()}
+        lines = []
+        for key, entry in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', str(float(bound))),))} {cumulative}\n")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {entry['count']}\n")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {entry['sum']}\n")
+            lines.append(f"{self.name}_count{_format_labels(key)} {entry['count']}\n")
+        return self._header() + ''.join(lines)
+
+
+# Service metrics shared by main.py and trc20_service.py
+STAGE_SECONDS = Histogram(
+    'trc20_stage_seconds', 'Time spent in each processing stage', ('stage',)
+)
+DEPOSITS = Counter('trc20_deposits_total', 'Deposits recorded or credited, by status', ('status',))
+WITHDRAWALS = Counter('trc20_withdrawals_total', 'Withdrawal state changes, by status', ('status',))
+DEPOSIT_CREDIT_SECONDS = Histogram(
+    'trc20_deposit_credit_seconds', 'Time from a deposit\'s block to its credit',
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1800, 3600, 21600)
+)
+CHAIN_LAG_BLOCKS = Gauge('trc20_chain_lag_blocks', 'Solid blocks not yet scanned (blocks mode)')
+SOLID_HEAD_AGE = Gauge('trc20_solid_head_age_seconds', 'Age of the cached solid head block')
+QUEUE_DEPTH = Gauge('trc20_queue_depth', 'Items waiting in in-process queues', ('queue',))
+
+
+class MetricsServer:
+    """Serves GET /metrics from a registry on a background thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464, registry: Optional[Registry] = None):
+        self.host = host
+        self.port = port
+        self.registry = registry or REGISTRY
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics: {format % args}")
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> bool:
+        """Serve metrics on a background thread; a port that cannot be bound only disables metrics"""
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        except OSError as e:
+            logger.error(f"Metrics disabled, cannot listen on {self.host}:{self.port}: {e}")
+            return False
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        """Stop the metrics server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
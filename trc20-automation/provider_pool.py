@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Provider Pool for TRC20 Automation Service
+Routes TRON reads across several HTTP endpoints by health and latency, with hedging
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List
+
+from metrics import STAGE_SECONDS
+from tracing import span
+from trongrid_client import TronGridClient, NETWORK_URLS
+
+logger = logging.getLogger(__name__)
+
+# Calls that change chain state are sent once, to one provider
+NON_IDEMPOTENT_PATHS = {'wallet/broadcasttransaction', 'wallet/broadcasthex'}
+# Account paths are traced without the address so spans group by endpoint
+ACCOUNT_PATH = re.compile(r'v1/accounts/[^/]+')
+
+
+class ProviderPool:
+    """A set of TronGrid/full-node clients used as one.
+
+    Each provider keeps an EWMA of its latency, a window of recent latencies
+    and its recent error rate. Requests go to the best-scoring provider. If
+    it has not answered by its own p95 latency, the same read is sent to the
+    next provider and the first success wins. Errors fail over down the
+    ranking. A provider with failure_threshold consecutive failures is
+    skipped for cooldown seconds, unless every provider is in that state.
+
+    The pool has the same get/post/request interface as TronGridClient, so it
+    can back TronGridProvider.
+    """
+
+    def __init__(self, clients: List[TronGridClient], hedge: bool = True, hedge_delay: float = 1.0,
+                 min_hedge_delay: float = 0.05, window: int = 200, failure_threshold: int = 3,
+                 cooldown: float = 30):
+        self.hedge = hedge and len(clients) > 1
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.providers = [
+            {
+                'name': client.base_url,
+                'client': client,
+                'latencies': deque(maxlen=window),
+                'ewma': None,
+                'outcomes': deque(maxlen=50),
+                'consecutive_failures': 0,
+                'open_until': 0.0,
+            }
+            for client in clients
+        ]
+        self.base_url = clients[0].base_url
+        self.timeout = max(client.timeout for client in clients)
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 8 * len(clients)),
+                                            thread_name_prefix='tron-provider')
+        self._stats = {'requests': 0, 'hedged': 0, 'secondary_wins': 0, 'failovers': 0}
+
+    @classmethod
+    def from_env(cls, network: str = 'mainnet') -> 'ProviderPool':
+        """Build a pool from TRON_PROVIDERS (comma-separated URLs) and TRONGRID_* settings"""
+        default_url = os.getenv('TRONGRID_URL') or NETWORK_URLS.get(network, NETWORK_URLS['shasta'])
+        urls = [url.strip() for url in os.getenv('TRON_PROVIDERS', default_url).split(',') if url.strip()]
+
+        clients = [TronGridClient.from_env(network, url) for url in urls]
+        if len(clients) > 1:
+            # The pool fails over instead of retrying a degraded provider
+            for client in clients:
+                client.max_retries = min(client.max_retries, int(os.getenv('TRON_PROVIDER_RETRIES', '1')))
+
+        return cls(
+            clients,
+            hedge=os.getenv('TRON_HEDGE_REQUESTS', 'true').lower() == 'true',
+            hedge_delay=float(os.getenv('TRON_HEDGE_DELAY', '1.0')),
+            cooldown=float(os.getenv('TRON_PROVIDER_COOLDOWN', '30'))
+        )
+
+    def _score(self, provider: Dict[str, Any]) -> float:
+        """Lower is better: EWMA latency inflated by the recent error rate"""
+        outcomes = provider['outcomes']
+        error_rate = outcomes.count(False) / len(outcomes) if outcomes else 0.0
+        latency = provider['ewma'] if provider['ewma'] is not None else 0.0
+        return latency * (1 + 4 * error_rate) + error_rate
+
+    def _ranked(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [p for p in self.providers if p['open_until'] <= now]
+            resting = [p for p in self.providers if p['open_until'] > now]
+            return sorted(healthy, key=self._score) + sorted(resting, key=lambda p: p['open_until'])
+
+    def _p95(self, provider: Dict[str, Any]) -> float:
+        with self._lock:
+            latencies = sorted(provider['latencies'])
+        if len(latencies) < 20:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, latencies[int(len(latencies) * 0.95) - 1])
+
+    def _record(self, provider: Dict[str, Any], latency: Optional[float]):
+        with self._lock:
+            if latency is None:
+                provider['outcomes'].append(False)
+                provider['consecutive_failures'] += 1
+                if provider['consecutive_failures'] >= self.failure_threshold:
+                    provider['open_until'] = time.monotonic() + self.cooldown
+                    logger.warning(f"TRON provider {provider['name']} unhealthy, resting for {self.cooldown:.0f}s")
+                return
+            provider['outcomes'].append(True)
+            provider['consecutive_failures'] = 0
+            provider['open_until'] = 0.0
+            provider['latencies'].append(latency)
+            provider['ewma'] = latency if provider['ewma'] is None else 0.8 * provider['ewma'] + 0.2 * latency
+
+    def _call(self, provider: Dict[str, Any], method: str, path: str, params: Optional[Dict],
+              json: Optional[Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = provider['client'].request(method, path, params=params, json=json)
+        except Exception:
+            self._record(provider, None)
+            raise
+        self._record(provider, time.monotonic() - started)
+        return result
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None,
+                json: Optional[Any] = None) -> Any:
+        """Send a request to the best provider, hedging slow reads and failing over on errors"""
+        name = f"tron {ACCOUNT_PATH.sub('v1/accounts/*', path.strip('/'))}"
+        if path.strip('/') in NON_IDEMPOTENT_PATHS:
+            # Broadcasts are timed by the withdrawal stage that sends them
+            with span(name):
+                return self._request(method, path, params, json)
+        with STAGE_SECONDS.time(stage='trongrid_fetch'), span(name):
+            return self._request(method, path, params, json)
+
+    def _request(self, method: str, path: str, params: Optional[Dict], json: Optional[Any]) -> Any:
+        with self._lock:
+            self._stats['requests'] += 1
+        ranked = self._ranked()
+
+        if path.strip('/') in NON_IDEMPOTENT_PATHS or len(ranked) == 1:
+            return self._call(ranked[0], method, path, params, json)
+
+        candidates = iter(ranked)
+        primary = next(candidates)
+        pending = {self._executor.submit(self._call, primary, method, path, params, json): primary}
+        hedge_delay = self._p95(primary) if self.hedge else None
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            done, _ = wait(pending, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Only one hedge per request, so a slow moment costs at most 2x load
+                hedge_delay = None
+                provider = next(candidates, None)
+                if provider:
+                    with self._lock:
+                        self._stats['hedged'] += 1
+                    pending[self._executor.submit(self._call, provider, method, path, params, json)] = provider
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                if future.exception() is None:
+                    if provider is not primary:
+                        with self._lock:
+                            self._stats['secondary_wins'] += 1
+                    return future.result()
+                last_error = future.exception()
+                logger.warning(f"TRON provider {provider['name']} failed for {path}: {last_error}")
+
+            if not pending:
+                provider = next(candidates, None)
+                if provider:
+                    with self._lock:
+                        self._stats['failovers'] += 1
+                    pending[self._executor.submit(self._call, provider, method, path, params, json)] = provider
+
+        raise last_error
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Any:
+        """GET a TronGrid REST path from the best provider"""
+        return self.request('GET', path, params=params)
+
+    def post(self, path: str, payload: Optional[Dict] = None) -> Any:
+        """POST to a node API path on the best provider"""
+        return self.request('POST', path, json=payload or {})
+
+    def pinned(self) -> 'PinnedProvider':
+        """Return a view that sends every request to the current best provider.
+
+        For reads that must agree with each other, such as a solid head and the
+        blocks below it: another provider may not have reached that head yet.
+        """
+        return PinnedProvider(self, self._ranked()[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """Return routing counters and each provider's health"""
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+        stats['providers'] = []
+        for provider in self.providers:
+            client_stats = provider['client'].stats()
+            stats['providers'].append({
+                'name': provider['name'],
+                'ewma_ms': round((provider['ewma'] or 0) * 1000, 1),
+                'p95_ms': round(self._p95(provider) * 1000, 1),
+                'healthy': provider['open_until'] <= now,
+                'score': round(self._score(provider), 3),
+                **client_stats,
+            })
+        stats['keys'] = sum(p['keys'] for p in stats['providers'])
+        return stats
+
+
+class PinnedProvider:
+    """One provider of a ProviderPool, without hedging or failover.
+
+    Calls still update the provider's health in the pool.
+    """
+
+    def __init__(self, pool: ProviderPool, provider: Dict[str, Any]):
+        self.pool = pool
+        self.provider = provider
+        self.base_url = provider['name']
+        self.timeout = provider['client'].timeout
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None,
+                json: Optional[Any] = None) -> Any:
+        """Send a request to the pinned provider"""
+        name = f"tron {ACCOUNT_PATH.sub('v1/accounts/*', path.strip('/'))}"
+        with STAGE_SECONDS.time(stage='trongrid_fetch'), span(name):
+            return self.pool._call(self.provider, method, path, params, json)
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Any:
+        """GET a TronGrid REST path from the pinned provider"""
+        return self.request('GET', path, params=params)
+
+    def post(self, path: str, payload: Optional[Dict] = None) -> Any:
+        """POST to a node API path on the pinned provider"""
+        return self.request('POST', path, json=payload or {})
+
+    def pinned(self) -> 'PinnedProvider':
+        """Return this provider; it is already pinned"""
+        return self
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Reconciliation for TRC20 Automation Service
+Merge-joins on-chain USDT transfers of the main wallet against database rows
+"""
+
+import os
+import sys
+import json
+import heapq
+import logging
+import argparse
+import tempfile
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple, Callable
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; amounts are then compared in pure Python
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SUN_PER_USDT = 1_000_000
+# deposits.amount is stored to the cent, so allow half a cent of rounding
+DEFAULT_TOLERANCE_SUN = 5_000
+
+# (txid, amount_sun, timestamp_ms, ref); ref identifies the database row, '' on chain
+Record = Tuple[str, int, int, str]
+
+
+def _spill(records: List[Record], tmp_dir: Optional[str]) -> str:
+    """Write a sorted run to a temporary file and return its path"""
+    fd, path = tempfile.mkstemp(prefix='reconcile-', suffix='.tsv', dir=tmp_dir)
+    with os.fdopen(fd, 'w') as f:
+        for txid, amount, timestamp, ref in records:
+            f.write(f"{txid}\t{amount}\t{timestamp}\t{ref}\n")
+    return path
+
+
+def _read_run(f) -> Iterator[Record]:
+    for line in f:
+        txid, amount, timestamp, ref = line.rstrip('\n').split('\t')
+        yield txid, int(amount), int(timestamp), ref
+
+
+def external_sort(records: Iterable[Record], chunk_size: int = 500_000,
+                  tmp_dir: Optional[str] = None) -> Iterator[Record]:
+    """Sort records by txid and timestamp holding at most chunk_size of them in memory"""
+    runs, chunk = [], []
+    try:
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                runs.append(_spill(sorted(chunk), tmp_dir))
+                chunk = []
+
+        if not runs:
+            yield from sorted(chunk)
+            return
+        if chunk:
+            runs.append(_spill(sorted(chunk), tmp_dir))
+        chunk = []
+
+        files = [open(path) for path in runs]
+        try:
+            yield from heapq.merge(*(_read_run(f) for f in files))
+        finally:
+            for f in files:
+                f.close()
+    finally:
+        for path in runs:
+            os.remove(path)
+
+
+def group_by_txid(records: Iterable[Record]) -> Iterator[Dict[str, Any]]:
+    """Collapse consecutive records with the same txid, summing their amounts"""
+    group = None
+    for txid, amount, timestamp, ref in records:
+        if group and group['txid'] == txid:
+            group['amount_sun'] += amount
+            group['count'] += 1
+            if ref:
+                group['refs'].append(ref)
+            continue
+        if group:
+            yield group
+        group = {'txid': txid, 'amount_sun': amount, 'count': 1, 'timestamp': timestamp,
+                 'refs': [ref] if ref else []}
+    if group:
+        yield group
+
+
+def mismatched(chain_amounts: array, db_amounts: array, tolerance_sun: int) -> List[int]:
+    """Indices where two integer-sun amount arrays differ by more than the tolerance"""
+    if np is not None:
+        chain = np.frombuffer(chain_amounts, dtype=np.int64)
+        db = np.frombuffer(db_amounts, dtype=np.int64)
+        return np.nonzero(np.abs(chain - db) > tolerance_sun)[0].tolist()
+    return [i for i, (a, b) in enumerate(zip(chain_amounts, db_amounts)) if abs(a - b) > tolerance_sun]
+
+
+class Reconciler:
+    """Merge-join of two txid-ordered streams in constant memory.
+
+    Both inputs are grouped by txid. Txids found on only one side are
+    reported as missing_in_db or missing_on_chain, except chain transfers
+    outside chain_amount_range (dust and spam the service never records),
+    which are reported as ignored_amount and are not failures. A txid with more than one
+    database row is reported as duplicate_in_db. Matched pairs are buffered
+    into integer-sun arrays and compared a batch at a time, and differences
+    are reported as amount_mismatch. Each issue is passed to report as a dict.
+    """
+
+    def __init__(self, report: Callable[[Dict[str, Any]], None], tolerance_sun: int = DEFAULT_TOLERANCE_SUN,
+                 batch_size: int = 10_000, chain_amount_range: Optional[Tuple[int, int]] = None):
+        self.report = report
+        self.tolerance_sun = tolerance_sun
+        self.batch_size = batch_size
+        self.chain_amount_range = chain_amount_range
+
+        self.stats = {'chain': 0, 'db': 0, 'matched': 0, 'missing_in_db': 0, 'ignored_amount': 0,
+                      'missing_on_chain': 0, 'duplicate_in_db': 0, 'amount_mismatch': 0}
+        self._pairs: List[Tuple[Dict, Dict]] = []
+        self._chain_amounts = array('q')
+        self._db_amounts = array('q')
+
+    def _issue(self, kind: str, chain: Optional[Dict] = None, db: Optional[Dict] = None):
+        self.stats[kind] += 1
+        self.report({
+            'issue': kind,
+            'txid': (chain or db)['txid'],
+            'chain_amount': chain['amount_sun'] / SUN_PER_USDT if chain else None,
+            'db_amount': db['amount_sun'] / SUN_PER_USDT if db else None,
+            'timestamp': (chain or db)['timestamp'],
+            'rows': db['refs'] if db else [],
+        })
+
+    def _flush(self):
+        for index in mismatched(self._chain_amounts, self._db_amounts, self.tolerance_sun):
+            chain, db = self._pairs[index]
+            self._issue('amount_mismatch', chain, db)
+        self._pairs = []
+        self._chain_amounts = array('q')
+        self._db_amounts = array('q')
+
+    def _recordable(self, chain: Dict) -> bool:
+        """Whether the service would have recorded a chain transfer of this amount"""
+        if self.chain_amount_range is None:
+            return True
+        low, high = self.chain_amount_range
+        return low <= chain['amount_sun'] <= high
+
+    def _pair(self, chain: Dict, db: Dict):
+        self.stats['matched'] += 1
+        self._pairs.append((chain, db))
+        self._chain_amounts.append(chain['amount_sun'])
+        self._db_amounts.append(db['amount_sun'])
+        if len(self._pairs) >= self.batch_size:
+            self._flush()
+
+    def run(self, chain_records: Iterable[Record], db_records: Iterable[Record]) -> Dict[str, int]:
+        """Reconcile two streams that are both sorted by txid and timestamp"""
+        chain_groups = group_by_txid(chain_records)
+        db_groups = group_by_txid(db_records)
+        chain = next(chain_groups, None)
+        db = next(db_groups, None)
+
+        while chain or db:
+            if db is None or (chain and chain['txid'] < db['txid']):
+                self.stats['chain'] += 1
+                self._issue('missing_in_db' if self._recordable(chain) else 'ignored_amount', chain=chain)
+                chain = next(chain_groups, None)
+                continue
+
+            self.stats['db'] += 1
+            if db['count'] > 1:
+                self._issue('duplicate_in_db', db=db)
+
+            if chain is None or db['txid'] < chain['txid']:
+                self._issue('missing_on_chain', db=db)
+            else:
+                self.stats['chain'] += 1
+                self._pair(chain, db)
+                chain = next(chain_groups, None)
+            db = next(db_groups, None)
+
+        self._flush()
+        return dict(self.stats)
+
+
+def chain_transfers(service, direction: str, since_ms: int, until_ms: int) -> Iterator[Record]:
+    """Stream confirmed USDT transfers to ('in') or from ('out') the main wallet, oldest first"""
+    params = {
+        'limit': service.page_size,
+        'order_by': 'block_timestamp,asc',
+        'only_confirmed': 'true',
+        'only_to' if direction == 'in' else 'only_from': 'true',
+        'min_timestamp': since_ms,
+        'max_timestamp': until_ms,
+        'contract_address': service.usdt_contract_address,
+    }
+    path = f"v1/accounts/{service.main_wallet_address}/transactions/trc20"
+    while True:
+        page = service.trongrid.get(path, params)
+        for tx in page.get('data', []):
+            yield tx['transaction_id'].lower(), int(tx.get('value') or 0), int(tx.get('block_timestamp') or 0), ''
+        fingerprint = page.get('meta', {}).get('fingerprint')
+        if not fingerprint:
+            return
+        params['fingerprint'] = fingerprint
+
+
+DB_QUERIES = {
+    'in': """
+        SELECT lower(transaction_hash) AS txid,
+               ROUND(amount * 1000000)::bigint,
+               (EXTRACT(EPOCH FROM created_at) * 1000)::bigint AS ts,
+               'deposits:' || id || ':' || status
+        FROM deposits
+        WHERE network = 'TRC20' AND transaction_hash IS NOT NULL AND deposit_address = %(address)s
+          AND created_at >= to_timestamp(%(since)s) AND created_at < to_timestamp(%(until)s)
+        ORDER BY txid COLLATE "C", ts
+    """,
+    'out': """
+        SELECT txid, amount_sun, ts, ref FROM (
+            SELECT lower(transaction_hash) AS txid,
+                   ROUND(amount * 1000000)::bigint AS amount_sun,
+                   (EXTRACT(EPOCH FROM created_at) * 1000)::bigint AS ts,
+                   'trc20_withdrawals:' || id || ':' || status AS ref
+            FROM trc20_withdrawals
+            WHERE transaction_hash IS NOT NULL AND status IN ('broadcasted', 'confirmed')
+              AND created_at >= to_timestamp(%(since)s) AND created_at < to_timestamp(%(until)s)
+            UNION ALL
+            SELECT lower(blockchain_hash),
+                   ROUND(final_amount * 1000000)::bigint,
+                   (EXTRACT(EPOCH FROM created_at) * 1000)::bigint,
+                   'withdrawal_requests:' || id || ':' || status
+            FROM withdrawal_requests
+            WHERE blockchain_hash IS NOT NULL AND method_id = 'usdt-trc20' AND status = 'completed'
+              AND created_at >= to_timestamp(%(since)s) AND created_at < to_timestamp(%(until)s)
+        ) AS withdrawals
+        ORDER BY txid COLLATE "C", ts
+    """,
+}
+
+
+def db_rows(conn, direction: str, address: str, since_ms: int, until_ms: int) -> Iterator[Record]:
+    """Stream database rows for one direction, ordered by txid (byte order) and timestamp"""
+    # Server-side cursor so millions of rows stream in batches
+    with conn.cursor(name=f"reconcile_{direction}") as cur:
+        cur.itersize = 10000
+        cur.execute(DB_QUERIES[direction], {'address': address, 'since': since_ms / 1000, 'until': until_ms / 1000})
+        for txid, amount_sun, timestamp, ref in cur:
+            yield txid, amount_sun, timestamp, ref
+
+
+def reconcile(service, since: datetime, until: datetime, directions: List[str], output,
+              tolerance_sun: int = DEFAULT_TOLERANCE_SUN, chunk_size: int = 500_000) -> Dict[str, Dict[str, int]]:
+    """Reconcile the main wallet's deposits and/or withdrawals, writing issues as JSON lines"""
+    since_ms, until_ms = int(since.timestamp() * 1000), int(until.timestamp() * 1000)
+    results = {}
+
+    for direction in directions:
+        label = 'deposits' if direction == 'in' else 'withdrawals'
+
+        def report(issue: Dict[str, Any]):
+            output.write(json.dumps({'kind': label, **issue}) + '\n')
+
+        # Deposits outside the service's limits are never inserted, so they are not missing
+        amount_range = None
+        if direction == 'in':
+            amount_range = (int(service.min_deposit_amount * SUN_PER_USDT),
+                            int(service.max_deposit_amount * SUN_PER_USDT))
+        reconciler = Reconciler(report, tolerance_sun, chain_amount_range=amount_range)
+        with service.get_db_connection() as conn:
+            results[label] = reconciler.run(
+                external_sort(chain_transfers(service, direction, since_ms, until_ms), chunk_size),
+                db_rows(conn, direction, service.main_wallet_address, since_ms, until_ms)
+            )
+        logger.info(f"Reconciled {label}: {results[label]}")
+
+    return results
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Reconcile on-chain USDT transfers with the database")
+    parser.add_argument('--kind', choices=['deposits', 'withdrawals', 'all'], default='all')
+    parser.add_argument('--days', type=int, default=30, help="window ending now (ignored with --since)")
+    parser.add_argument('--since', help="window start, ISO date or datetime (UTC)")
+    parser.add_argument('--until', help="window end, ISO date or datetime (UTC); defaults to now")
+    parser.add_argument('--output', help="JSON lines file for issues (default stdout)")
+    parser.add_argument('--tolerance-sun', type=int, default=DEFAULT_TOLERANCE_SUN)
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="chain rows sorted in memory per run")
+    args = parser.parse_args()
+
+    def parse(value: str) -> datetime:
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    until = parse(args.until) if args.until else datetime.now(timezone.utc)
+    since = parse(args.since) if args.since else until - timedelta(days=args.days)
+    directions = {'deposits': ['in'], 'withdrawals': ['out'], 'all': ['in', 'out']}[args.kind]
+
+    from main import TRC20AutomationService
+    service = TRC20AutomationService()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        results = reconcile(service, since, until, directions, output, args.tolerance_sun, args.chunk_size)
+    finally:
+        if args.output:
+            output.close()
+        service.db_pool.close()
+
+    issues = sum(stats[k] for stats in results.values()
+                 for k in ('missing_in_db', 'missing_on_chain', 'duplicate_in_db', 'amount_mismatch'))
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,10 @@ Provides easy startup with configuration validation
 import os
 import sys
 import time
+import signal
+import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
 def print_banner():
@@ -46,7 +49,7 @@ def validate_configuration():
     print("✅ Configuration validation passed")
     return True
 
-def test_database_connection():
+def test_database_connection(timeout=10):
     """Test database connection"""
     print("🔍 Testing database connection...")
     
@@ -63,7 +66,7 @@ def test_database_connection():
             'Content-Type': 'application/json'
         }
         
-        response = requests.get(f"{supabase_url}/rest/v1/deposits?limit=1", headers=headers)
+        response = requests.get(f"{supabase_url}/rest/v1/deposits?limit=1", headers=headers, timeout=timeout)
         
         if response.status_code == 200:
             print("✅ Database connection successful")
@@ -130,8 +133,56 @@ def start_service():
         print(f"❌ Service error: {e}")
         return 1
 
+def run_preflight_checks(timeout):
+    """Run configuration and database checks concurrently, failing any that exceed timeout"""
+    load_dotenv()
+    started = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    checks = {
+        executor.submit(validate_configuration): 'configuration',
+        executor.submit(test_database_connection, timeout): 'database',
+    }
+    done, not_done = wait(checks, timeout=timeout)
+    executor.shutdown(wait=False)
+
+    passed = True
+    for future in not_done:
+        print(f"❌ {checks[future]} check timed out after {timeout}s")
+        passed = False
+    for future in done:
+        if future.exception() is not None or not future.result():
+            print(f"❌ {checks[future]} check failed")
+            passed = False
+
+    print(f"Preflight checks finished in {time.monotonic() - started:.2f}s")
+    return passed
+
+def run_daemon():
+    """Non-interactive startup for systemd and other supervisors"""
+    # Stop gracefully on SIGTERM, the same way as Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    if not run_preflight_checks(float(os.getenv('PREFLIGHT_TIMEOUT', '5'))):
+        return 1
+    return start_service()
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="TRC20 USDT Automation Service")
+    parser.add_argument('--daemon', action='store_true',
+                        help="start without prompts, running preflight checks concurrently")
+    parser.add_argument('--profile-cycles', type=int, default=0, metavar='N',
+                        help="write a span and profile report for each of the first N monitoring cycles")
+    args = parser.parse_args()
+
+    if args.profile_cycles:
+        from tracing import TRACER
+        TRACER.profile_next(args.profile_cycles)
+
+    if args.daemon:
+        return run_daemon()
+
     print_banner()
     
     # Validate configuration
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Deposit Address Scheduler Tests for TRC20 Automation Service
+Polling tiers, hot marks and address reassignment
+"""
+
+import time
+import unittest
+
+from address_monitor import AddressScheduler
+
+
+class AddressSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = AddressScheduler(hot_interval=30, cold_interval=3600, hot_window=86400, max_per_cycle=2)
+        self.now = time.time()
+
+    def test_first_checks_are_spread_across_the_interval(self):
+        self.scheduler.max_per_cycle = 100
+        for i in range(50):
+            self.scheduler.add(f"cold{i}", f"user{i}", self.now - 10 * 86400)
+        self.assertEqual(self.scheduler.stats()['cold'], 50)
+
+        first = self.scheduler.due(self.now + 60)
+        self.assertLess(len(first), 10)
+        self.assertEqual(len(first) + len(self.scheduler.due(self.now + 3601)), 50)
+
+    def test_hot_marks_go_before_the_backlog(self):
+        for i in range(5):
+            self.scheduler.add(f"addr{i}", f"user{i}", self.now - 10 * 86400)
+        self.scheduler.mark_hot('addr4')
+        batch = self.scheduler.due(self.now + 3601)
+        self.assertEqual(batch[0]['address'], 'addr4')
+        self.assertEqual(batch[0]['interval'], 30)
+
+    def test_record_backs_off_idle_addresses(self):
+        self.scheduler.add('addr', 'user', self.now - 10 * 86400)
+        self.scheduler.mark_hot('addr')
+        self.scheduler.due(self.now + 1)
+        self.scheduler._addresses['addr']['active_at'] = self.now - 10 * 86400
+        self.scheduler.record('addr')
+        self.assertEqual(self.scheduler._addresses['addr']['interval'], 60)
+
+        self.scheduler.record('addr', latest_timestamp=int(self.now * 1000))
+        self.assertEqual(self.scheduler._addresses['addr']['interval'], 30)
+
+    def test_repeated_old_transfer_decays_to_cold(self):
+        old_transfer = int((self.now - 5 * 86400) * 1000)
+        self.scheduler.add('addr', 'user', self.now - 10 * 86400, min_timestamp=old_transfer - 1000)
+        self.scheduler.record('addr', latest_timestamp=old_transfer)
+        self.assertEqual(self.scheduler._addresses['addr']['interval'], 30)
+
+        # Every later check sees the same transfer again, which is not activity
+        self.scheduler._addresses['addr']['active_at'] = self.now - 10 * 86400
+        for _ in range(10):
+            self.scheduler.record('addr', latest_timestamp=old_transfer)
+        self.assertEqual(self.scheduler._addresses['addr']['interval'], 3600)
+        self.assertEqual(self.scheduler.stats()['cold'], 1)
+
+    def test_reassignment_moves_the_address(self):
+        self.scheduler.add('addr', 'old@example.com')
+        self.scheduler.add_many([{'address': 'addr', 'user_email': 'new@example.com'}])
+        self.assertIsNone(self.scheduler.address_for('old@example.com'))
+        self.assertEqual(self.scheduler.address_for('new@example.com'), 'addr')
+        self.assertEqual(self.scheduler.user_email_for('addr'), 'new@example.com')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Async Engine Tests for TRC20 Automation Service
+Call timeouts, concurrency slots and periodic jobs
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from async_engine import AsyncEngine
+
+
+class ConcurrencyProbe:
+    """Blocking callable that records how many copies run at once"""
+
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.duration)
+        with self._lock:
+            self.running -= 1
+        return value
+
+
+class AsyncEngineTest(unittest.TestCase):
+    def test_call_returns_result(self):
+        engine = AsyncEngine()
+        self.assertEqual(asyncio.run(engine.call('db', lambda a, b=0: a + b, 2, b=3)), 5)
+
+    def test_call_times_out(self):
+        engine = AsyncEngine(limits={'tron': 1})
+        release = threading.Event()
+
+        async def scenario():
+            with self.assertRaises(asyncio.TimeoutError):
+                await engine.call('tron', release.wait, timeout=0.05)
+            release.set()
+
+        asyncio.run(scenario())
+
+    def test_timed_out_call_keeps_its_slot_until_it_returns(self):
+        engine = AsyncEngine(limits={'tron': 2})
+        probe = ConcurrencyProbe(0.2)
+
+        async def scenario():
+            for _ in range(2):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await engine.call('tron', probe, timeout=0.01)
+            # Both slots are still held by the abandoned calls
+            started = time.monotonic()
+            await engine.call('tron', probe, timeout=1)
+            return time.monotonic() - started
+
+        waited = asyncio.run(scenario())
+        self.assertLessEqual(probe.peak, 2)
+        self.assertGreater(waited, 0.1)
+
+    def test_gather_is_bounded_and_returns_failures(self):
+        engine = AsyncEngine(limits={'db': 3})
+        probe = ConcurrencyProbe(0.02)
+
+        def work(item):
+            if item == 4:
+                raise ValueError('bad item')
+            return probe(item)
+
+        results = asyncio.run(engine.gather('db', work, range(10)))
+        self.assertEqual(results[:4], [0, 1, 2, 3])
+        self.assertIsInstance(results[4], ValueError)
+        self.assertEqual(results[5:], [5, 6, 7, 8, 9])
+        self.assertLessEqual(probe.peak, 3)
+
+    def test_jobs_repeat_until_stopped(self):
+        engine = AsyncEngine(error_backoff=0.01)
+        runs = {'sync': 0, 'failing': 0}
+
+        def sync_job():
+            runs['sync'] += 1
+            if runs['sync'] == 3:
+                engine.stop()
+
+        async def failing_job():
+            runs['failing'] += 1
+            raise RuntimeError('boom')
+
+        engine.add_job('sync', sync_job, 0.01)
+        engine.add_job('failing', failing_job, 10)
+
+        asyncio.run(asyncio.wait_for(engine.run_async(), 5))
+        self.assertEqual(runs['sync'], 3)
+        # A failing job is retried after error_backoff, not its interval
+        self.assertGreater(runs['failing'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Backfill Tests for TRC20 Automation Service
+Partition checkpoints and resuming an interrupted block job
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import backfill
+from backfill import BackfillState, Backfiller
+
+
+class BackfillStateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'backfill.db')
+        self.state = BackfillState(self.path)
+        self.addCleanup(self.state.close)
+
+    def test_job_is_split_into_covering_partitions(self):
+        partitions = self.state.create_job('blocks:0-10', 'blocks', None, 0, 10, 3)
+        self.assertEqual([(p['start'], p['end']) for p in partitions], [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual([p['position'] for p in partitions], [0, 4, 8])
+
+    def test_existing_job_keeps_its_progress(self):
+        self.state.create_job('blocks:0-10', 'blocks', None, 0, 10, 2)
+        self.state.checkpoint('blocks:0-10', 0, 3, transfers=7)
+        partitions = self.state.create_job('blocks:0-10', 'blocks', None, 0, 10, 5)
+        self.assertEqual(len(partitions), 2)
+        self.assertEqual((partitions[0]['position'], partitions[0]['transfers']), (3, 7))
+
+    def test_checkpoints_survive_reopening(self):
+        self.state.create_job('old', 'blocks', None, 0, 10, 1)
+        self.state.create_job('new', 'time', 'addr', 0, 10, 1)
+        self.state.checkpoint('new', 0, 10, transfers=1, done=True)
+        self.state.close()
+
+        self.state = BackfillState(self.path)
+        job = self.state.latest_unfinished_job()
+        self.assertEqual((job['job'], job['mode'], job['start'], job['end']), ('old', 'blocks', 0, 10))
+
+        self.state.checkpoint('old', 0, 10, transfers=0, done=True)
+        self.assertIsNone(self.state.latest_unfinished_job())
+
+
+class BackfillerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(backfill, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.state = BackfillState(':memory:')
+        self.addCleanup(self.state.close)
+        self.ingested = []
+        self.fail_at = None
+        self.service = SimpleNamespace(
+            block_scan_batch=2, usdt_contract_address='USDT', trongrid=SimpleNamespace(post=None),
+            confirmation_service=mock.Mock(), _sync_deposit_addresses=lambda: None,
+            _ingest_block_transfers=self.ingest,
+        )
+
+    def ingest(self, transfers):
+        if transfers and transfers[0]['block'] == self.fail_at:
+            return None
+        self.ingested.extend(t['block'] for t in transfers)
+        return len(transfers)
+
+    def run_job(self):
+        with mock.patch.object(backfill, 'fetch_block_transfers',
+                               lambda post, number, contract: [{'block': number}]):
+            return Backfiller(self.service, self.state, workers=2).run('blocks:0-8', 'blocks')
+
+    def test_interrupted_partition_resumes_from_its_checkpoint(self):
+        self.state.create_job('blocks:0-8', 'blocks', None, 0, 8, 2)
+        self.fail_at = 6
+        stats = self.run_job()
+        self.assertEqual((stats['remaining'], stats['partitions_failed']), (1, 1))
+        self.assertEqual(sorted(self.ingested), [0, 1, 2, 3, 4, 5])
+
+        self.fail_at = None
+        stats = self.run_job()
+        self.assertEqual(stats['remaining'], 0)
+        # Only the unfinished batch is fetched again
+        self.assertEqual(sorted(self.ingested), list(range(8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
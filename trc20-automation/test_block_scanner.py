@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Block Scanner Tests for TRC20 Automation Service
+Decoding of USDT Transfer logs from solid block receipts
+"""
+
+import unittest
+
+from tronpy.keys import to_hex_address
+
+from block_scanner import TRANSFER_TOPIC, decode_transfer_logs, fetch_block_receipts
+
+USDT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+SENDER = 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ'
+RECIPIENT = 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7'
+
+
+def topic(address):
+    return to_hex_address(address)[2:].rjust(64, '0')
+
+
+def transfer_log(value, contract=USDT, to=RECIPIENT, topics=None):
+    return {
+        'address': to_hex_address(contract)[2:],
+        'topics': topics or [TRANSFER_TOPIC, topic(SENDER), topic(to)],
+        'data': format(value, '064x'),
+    }
+
+
+def tx_info(txid, logs, **fields):
+    return {'id': txid, 'blockNumber': 100, 'blockTimeStamp': 1_700_000_000_000,
+            'receipt': {'result': 'SUCCESS'}, 'log': logs, **fields}
+
+
+class DecodeTransferLogsTest(unittest.TestCase):
+    def test_decodes_transfer(self):
+        [transfer] = decode_transfer_logs([tx_info('aa', [transfer_log(25_500_000)])], USDT)
+        self.assertEqual(transfer['transaction_id'], 'aa')
+        self.assertEqual(transfer['from'], SENDER)
+        self.assertEqual(transfer['to'], RECIPIENT)
+        self.assertEqual(transfer['value'], '25500000')
+        self.assertEqual(transfer['block_number'], 100)
+        self.assertEqual(transfer['block_timestamp'], 1_700_000_000_000)
+        self.assertEqual(transfer['log_index'], 0)
+
+    def test_keeps_every_transfer_log_with_its_index(self):
+        info = tx_info('aa', [transfer_log(1), transfer_log(2, to=SENDER)])
+        transfers = decode_transfer_logs([info], USDT)
+        self.assertEqual([(t['value'], t['to'], t['log_index']) for t in transfers],
+                         [('1', RECIPIENT, 0), ('2', SENDER, 1)])
+
+    def test_skips_other_contracts_and_events(self):
+        approval = transfer_log(1, topics=['8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925',
+                                           topic(SENDER), topic(RECIPIENT)])
+        info = tx_info('aa', [transfer_log(1, contract=SENDER), approval])
+        self.assertEqual(decode_transfer_logs([info], USDT), [])
+
+    def test_skips_failed_transactions(self):
+        infos = [
+            tx_info('aa', [transfer_log(1)], result='FAILED'),
+            tx_info('bb', [transfer_log(1)], receipt={'result': 'REVERT'}),
+        ]
+        self.assertEqual(decode_transfer_logs(infos, USDT), [])
+
+
+class FetchBlockReceiptsTest(unittest.TestCase):
+    def test_empty_block(self):
+        self.assertEqual(fetch_block_receipts(lambda path, payload: [], 100), [])
+
+    def test_raises_on_unread_block(self):
+        for response in ({}, {'Error': 'block not found'}, None):
+            with self.assertRaises(RuntimeError):
+                fetch_block_receipts(lambda path, payload: response, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Chain Data Cache Tests for TRC20 Automation Service
+Storage, eviction and which provider reads are cached
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from chain_cache import ChainCache, CachedProvider
+
+
+class FakeProvider:
+    """Counts requests and answers with a scripted result per path"""
+
+    base_url = 'https://node.example'
+    timeout = 30
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.calls = []
+        self.pinned_calls = 0
+
+    def request(self, method, path, params=None, json=None):
+        self.calls.append(path)
+        return self.results.get(path, {'path': path})
+
+    def pinned(self):
+        self.pinned_calls += 1
+        return self
+
+    def stats(self):
+        return {'requests': len(self.calls)}
+
+
+class ChainCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'chain.db')
+
+    def test_values_round_trip_and_persist(self):
+        cache = ChainCache(self.path)
+        self.assertIsNone(cache.get('k'))
+        cache.put('k', {'blockNumber': 7, 'log': []})
+        self.assertEqual(cache.get('k'), {'blockNumber': 7, 'log': []})
+        cache.close()
+
+        reopened = ChainCache(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get('k'), {'blockNumber': 7, 'log': []})
+        self.assertGreater(reopened.stats()['bytes'], 0)
+
+    def test_evicts_least_recently_read_entries(self):
+        cache = ChainCache(self.path, max_bytes=2_000)
+        self.addCleanup(cache.close)
+        # Random-looking payloads so compression keeps them large
+        for i in range(20):
+            cache.put(f"k{i}", [os.urandom(200).hex()])
+            if i:
+                time.sleep(0.001)
+                cache.get('k0')
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 2_000)
+        self.assertGreater(stats['evicted'], 0)
+        self.assertIsNotNone(cache.get('k0'))
+        self.assertIsNone(cache.get('k1'))
+
+
+class CachedProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ChainCache(':memory:')
+        self.addCleanup(self.cache.close)
+
+    def test_solid_reads_are_served_from_the_cache(self):
+        provider = FakeProvider()
+        cached = CachedProvider(provider, self.cache)
+        for _ in range(3):
+            cached.post('walletsolidity/gettransactioninfobyblocknum', {'num': 5})
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_head_reads_and_broadcasts_are_not_cached(self):
+        provider = FakeProvider()
+        cached = CachedProvider(provider, self.cache)
+        for _ in range(2):
+            cached.post('walletsolidity/getnowblock')
+            cached.post('wallet/broadcasttransaction', {'txID': 'ab'})
+        self.assertEqual(len(provider.calls), 4)
+
+    def test_empty_answers_are_not_cached(self):
+        path = 'walletsolidity/gettransactioninfobyid'
+        provider = FakeProvider({path: {}})
+        cached = CachedProvider(provider, self.cache)
+        cached.post(path, {'value': 'ab'})
+        provider.results[path] = {'id': 'ab'}
+        self.assertEqual(cached.post(path, {'value': 'ab'}), {'id': 'ab'})
+        self.assertEqual(cached.post(path, {'value': 'ab'}), {'id': 'ab'})
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_only_old_transfer_pages_are_cached(self):
+        path = 'v1/accounts/TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7/transactions/trc20'
+        provider = FakeProvider({path: {'data': [{'transaction_id': 'ab'}]}})
+        cached = CachedProvider(provider, self.cache, solid_age=300)
+        now_ms = int(time.time() * 1000)
+        for _ in range(2):
+            cached.get(path, {'min_timestamp': 0, 'max_timestamp': now_ms - 3_600_000})
+            cached.get(path, {'min_timestamp': 0, 'max_timestamp': now_ms})
+            cached.get(path, {'min_timestamp': 0})
+        self.assertEqual(len(provider.calls), 5)
+
+    def test_pinned_shares_the_cache(self):
+        provider = FakeProvider()
+        cached = CachedProvider(provider, self.cache)
+        cached.post('walletsolidity/getblockbynum', {'num': 5})
+        pinned = cached.pinned()
+        pinned.post('walletsolidity/getblockbynum', {'num': 5})
+        self.assertEqual((provider.pinned_calls, len(provider.calls)), (1, 1))
+        self.assertIs(pinned.cache, self.cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
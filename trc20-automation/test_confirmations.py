@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Confirmation Tests for TRC20 Automation Service
+Confirmation counting and the pending confirmation queue
+"""
+
+import unittest
+
+from confirmations import ConfirmationService, PendingConfirmationQueue
+
+
+def entry(tx_hash, block_number, block_timestamp=None):
+    return {'id': tx_hash, 'transaction_hash': tx_hash, 'amount': 10,
+            'block_number': block_number, 'block_timestamp': block_timestamp}
+
+
+class PendingConfirmationQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = PendingConfirmationQueue(min_confirmations=19)
+
+    def test_releases_entries_in_block_order_once_deep_enough(self):
+        for tx_hash, block in (('c', 130), ('a', 100), ('b', 110)):
+            self.queue.push(entry(tx_hash, block))
+
+        self.assertEqual(self.queue.pop_confirmed(118), [])
+        self.assertEqual([e['transaction_hash'] for e in self.queue.pop_confirmed(129)], ['a', 'b'])
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.stats()['oldest_block'], 130)
+
+    def test_push_ignores_queued_duplicates(self):
+        self.queue.push(entry('a', 100))
+        self.queue.push(entry('a', 100))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_released_entry_can_be_queued_again(self):
+        self.queue.push(entry('a', 100))
+        released = self.queue.pop_confirmed(119)
+        self.queue.push(released[0])
+        self.assertEqual(len(self.queue), 1)
+
+    def test_record_credited_measures_time_from_block(self):
+        self.queue.record_credited([entry('a', 100, block_timestamp=1_000)])
+        stats = self.queue.stats()
+        self.assertEqual(stats['credited'], 1)
+        self.assertGreater(stats['avg_seconds'], 0)
+
+
+class ConfirmationServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.fetches = 0
+
+        def fetch():
+            self.fetches += 1
+            return {'number': 1_000, 'timestamp': 3_000_000}
+
+        self.service = ConfirmationService(fetch, refresh_seconds=60)
+
+    def test_uses_payload_block_number(self):
+        self.assertEqual(self.service.confirmations({'block_number': 990}), 10)
+
+    def test_estimates_block_from_timestamp(self):
+        self.assertEqual(self.service.confirmations({'block_timestamp': 3_000_000 - 30_000}), 10)
+
+    def test_transfers_above_the_head_are_unconfirmed(self):
+        self.assertEqual(self.service.confirmations({'block_number': 1_005}), 0)
+
+    def test_head_is_cached(self):
+        for _ in range(3):
+            self.service.confirmations({'block_number': 990})
+        self.assertEqual(self.fetches, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
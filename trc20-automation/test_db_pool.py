@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Connection Pool Tests for TRC20 Automation Service
+Connection reuse, discarding broken connections and prepared statements
+"""
+
+import unittest
+from unittest import mock
+
+import psycopg2
+
+import db_pool
+from db_pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.connection.executed.append((' '.join(query.split()), params))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakeThreadedPool:
+    """Mimics psycopg2's pool: idle connections beyond minconn are closed when returned"""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.minconn = minconn
+        self.idle = []
+        self.opened = 0
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.opened += 1
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close or len(self.idle) >= self.minconn:
+            conn.closed = 1
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        self.idle = []
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(db_pool.pg_pool, 'ThreadedConnectionPool', FakeThreadedPool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ConnectionPool({}, minconn=1, maxconn=4, acquire_timeout=0.05)
+
+    def test_idle_connections_are_kept(self):
+        with self.pool.connection() as first, self.pool.connection() as second:
+            pass
+        with self.pool.connection() as again:
+            self.assertIn(again, (first, second))
+        self.assertFalse(first.closed or second.closed)
+        self.assertEqual(self.pool._pool.opened, 2)
+
+    def test_broken_connection_is_discarded(self):
+        with self.assertRaises(psycopg2.OperationalError):
+            with self.pool.connection() as conn:
+                raise psycopg2.OperationalError("server closed the connection")
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.stats()['discarded'], 1)
+        self.assertEqual(self.pool.stats()['in_use'], 0)
+
+    def test_waiting_for_a_slot_times_out(self):
+        pool = ConnectionPool({}, maxconn=1, acquire_timeout=0.01)
+        with pool.connection():
+            with self.assertRaises(db_pool.pg_pool.PoolError):
+                with pool.connection():
+                    pass
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_statement_is_prepared_once_per_connection(self):
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            self.pool.execute_prepared(cur, 'filter_processed', (['aa'],))
+            self.pool.execute_prepared(cur, 'filter_processed', (['bb'],))
+
+        prepares = [query for query, _ in conn.executed if query.startswith('PREPARE')]
+        self.assertEqual(len(prepares), 1)
+        self.assertEqual(conn.executed[-1], ('EXECUTE filter_processed(%s)', (['bb'],)))
+
+        fresh = FakeConnection()
+        self.pool.execute_prepared(fresh.cursor(), 'filter_processed', (['cc'],))
+        self.assertTrue(fresh.executed[0][0].startswith('PREPARE filter_processed'))
+
+    def test_plain_sql_without_prepare(self):
+        pool = ConnectionPool({}, prepare=False)
+        conn = FakeConnection()
+        pool.execute_prepared(conn.cursor(), 'complete_deposits', (['id-1'],))
+        [(query, params)] = conn.executed
+        self.assertIn('WHERE id = ANY(%(1)s::uuid[])', query)
+        self.assertEqual(params, {'1': ['id-1']})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Deposit Ingestion Tests for TRC20 Automation Service
+Routing of decoded transfers, multi-transfer rejection and solid-receipt crediting
+"""
+
+import asyncio
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from tronpy.keys import to_hex_address
+
+import main
+from address_monitor import AddressScheduler
+from async_engine import AsyncEngine
+from block_scanner import TRANSFER_TOPIC
+from confirmations import ConfirmationService, PendingConfirmationQueue
+
+MAIN_WALLET = 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ'
+DEPOSIT_ADDRESS = 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7'
+USDT_CONTRACT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+
+
+def transfer(tx_hash, to, value, log_index=0):
+    return {'transaction_id': tx_hash, 'to': to, 'value': str(value), 'log_index': log_index}
+
+
+class DepositIngestTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, 'logger')
+        self.logger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Only the attributes the ingestion routing reads; no database or TronGrid
+        self.service = main.TRC20AutomationService.__new__(main.TRC20AutomationService)
+        self.service.main_wallet_address = MAIN_WALLET
+        self.service.address_scheduler = AddressScheduler()
+        self.service.address_scheduler.add(DEPOSIT_ADDRESS, 'user@example.com')
+        self.service._filter_unprocessed_transactions = lambda hashes: set(hashes)
+        self.ingested = []
+        self.service._ingest_deposits = lambda txs, user_email, address: (
+            self.ingested.append((user_email, [tx['transaction_id'] for tx in txs])) or txs
+        )
+
+    def test_repeats_of_one_transfer_are_kept(self):
+        kept = self.service._reject_multi_transfer([transfer('aa', MAIN_WALLET, 5), transfer('aa', MAIN_WALLET, 5)])
+        self.assertEqual(len(kept), 2)
+        self.logger.error.assert_not_called()
+
+    def test_transaction_paying_two_watched_addresses_is_rejected(self):
+        inserted = self.service._ingest_block_transfers([
+            transfer('aa', MAIN_WALLET, 5, 0),
+            transfer('aa', DEPOSIT_ADDRESS, 7, 1),
+            transfer('bb', DEPOSIT_ADDRESS, 9),
+        ])
+        self.assertEqual(inserted, 1)
+        self.assertEqual(self.ingested, [('user@example.com', ['bb'])])
+        self.assertIn('Rejected tx aa', self.logger.error.call_args[0][0])
+
+    def test_unwatched_recipients_do_not_cause_rejection(self):
+        inserted = self.service._ingest_block_transfers([
+            transfer('aa', MAIN_WALLET, 5, 0),
+            transfer('aa', USDT_CONTRACT, 7, 1),
+        ])
+        self.assertEqual(inserted, 1)
+        self.assertEqual(self.ingested, [(main.SYSTEM_USER_EMAIL, ['aa'])])
+
+    def test_failed_insert_is_reported(self):
+        self.service._ingest_deposits = lambda *args: None
+        self.assertIsNone(self.service._ingest_block_transfers([transfer('aa', MAIN_WALLET, 5)]))
+
+
+def receipt(tx_hash, block_number, value, to=DEPOSIT_ADDRESS, contract=USDT_CONTRACT):
+    """A solid transaction info carrying one USDT Transfer log"""
+    return {'id': tx_hash, 'blockNumber': block_number, 'blockTimeStamp': 1_000,
+            'receipt': {'result': 'SUCCESS'},
+            'log': [{'address': to_hex_address(contract)[2:],
+                     'topics': [TRANSFER_TOPIC, '0' * 24 + to_hex_address(MAIN_WALLET)[2:],
+                                '0' * 24 + to_hex_address(to)[2:]],
+                     'data': f"{value:064x}"}]}
+
+
+class PendingConfirmationTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.receipts = {}
+        self.service = main.TRC20AutomationService.__new__(main.TRC20AutomationService)
+        self.service.engine = AsyncEngine()
+        self.service.usdt_contract_address = USDT_CONTRACT
+        self.service.trongrid = mock.Mock()
+        self.service.trongrid.post.side_effect = lambda path, payload: self.receipts.get(payload['value'], {})
+        self.service.confirmation_service = ConfirmationService(lambda: {'number': 1_000, 'timestamp': 3_000_000})
+        self.service.pending_confirmations = PendingConfirmationQueue(min_confirmations=19)
+        self.credited = []
+        self.service._credit_confirmed_deposits = lambda entries, head_number: self.credited.extend(
+            entry['transaction_hash'] for entry in entries
+        )
+
+    def push(self, tx_hash, block_number, solid=False):
+        self.service.pending_confirmations.push({
+            'id': tx_hash, 'transaction_hash': tx_hash, 'amount': Decimal('5'),
+            'block_number': block_number, 'block_timestamp': 1_000, 'solid': solid
+        })
+
+    def run_job(self):
+        asyncio.run(self.service.process_pending_confirmations_async())
+
+    def test_estimated_deposits_are_credited_from_their_solid_receipt(self):
+        self.push('aa', 900)
+        self.receipts['aa'] = receipt('aa', 950, 5_000_000)
+        self.run_job()
+        self.assertEqual(self.credited, ['aa'])
+
+    def test_receipts_are_only_read_for_estimated_blocks(self):
+        self.push('aa', 900, solid=True)
+        self.run_job()
+        self.assertEqual(self.credited, ['aa'])
+        self.service.trongrid.post.assert_not_called()
+
+    def test_deposit_missing_from_the_solid_node_is_requeued(self):
+        self.push('aa', 900)
+        self.run_job()
+        self.assertEqual(self.credited, [])
+        self.assertEqual(self.service.pending_confirmations.stats()['oldest_block'], 1_000)
+
+    def test_real_block_too_shallow_is_requeued_with_it(self):
+        self.push('aa', 900)
+        self.receipts['aa'] = receipt('aa', 990, 5_000_000)
+        self.run_job()
+        self.assertEqual(self.credited, [])
+        self.assertEqual(self.service.pending_confirmations.stats()['oldest_block'], 990)
+
+    def test_receipt_without_the_transfer_is_not_credited(self):
+        self.push('aa', 900)
+        self.push('bb', 900)
+        self.receipts['aa'] = receipt('aa', 950, 7_000_000)
+        self.receipts['bb'] = receipt('bb', 950, 5_000_000, contract=MAIN_WALLET)
+        self.run_job()
+        self.assertEqual(self.credited, [])
+        self.assertEqual(len(self.service.pending_confirmations), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
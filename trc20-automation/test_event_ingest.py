@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Event Ingestion Tests for TRC20 Automation Service
+Webhook authentication, all-or-nothing queueing and deferred verification
+"""
+
+import json
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import event_ingest
+from event_ingest import EventReceiver, decode_transfer_event
+
+USDT_CONTRACT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+DEPOSIT_ADDRESS = 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7'
+
+
+def event(tx_hash, contract=USDT_CONTRACT, value='5000000'):
+    """A TronGrid event API Transfer row"""
+    return {'event_name': 'Transfer', 'contract_address': contract, 'transaction_id': tx_hash,
+            'block_number': 100, 'block_timestamp': 300_000,
+            'result': {'from': 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ', 'to': DEPOSIT_ADDRESS, 'value': value}}
+
+
+class DecodeTransferEventTest(unittest.TestCase):
+    def test_decodes_usdt_transfers_only(self):
+        transfers = decode_transfer_event(event('aa'), USDT_CONTRACT)
+        self.assertEqual(len(transfers), 1)
+        self.assertEqual((transfers[0]['to'], transfers[0]['value']), (DEPOSIT_ADDRESS, '5000000'))
+
+        self.assertEqual(decode_transfer_event(event('aa', contract=DEPOSIT_ADDRESS), USDT_CONTRACT), [])
+        self.assertEqual(decode_transfer_event({**event('aa'), 'removed': True}, USDT_CONTRACT), [])
+
+
+class EventReceiverTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(event_ingest, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, **kwargs):
+        receiver = EventReceiver(USDT_CONTRACT, port=0, secret='s3cret', **kwargs)
+        receiver.start()
+        self.addCleanup(receiver.stop)
+        return receiver
+
+    def post(self, receiver, body, secret='s3cret'):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{receiver._server.server_address[1]}/", data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json', 'X-Webhook-Secret': secret}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_refuses_to_start_without_a_secret(self):
+        with self.assertRaises(RuntimeError):
+            EventReceiver(USDT_CONTRACT, port=0).start()
+
+    def test_wrong_secret_is_rejected(self):
+        receiver = self.serve()
+        self.assertEqual(self.post(receiver, [event('aa')], secret='guess')[0], 401)
+        self.assertEqual(receiver.stats()['rejected'], 1)
+        self.assertEqual(receiver.stats()['depth'], 0)
+
+    def test_accepted_events_are_queued(self):
+        receiver = self.serve()
+        self.assertEqual(self.post(receiver, [event('aa'), event('bb', contract=DEPOSIT_ADDRESS)]),
+                         (202, {'accepted': 1}))
+        self.assertEqual([t['transaction_id'] for t in receiver.drain(timeout=0.1)], ['aa'])
+        self.assertEqual(receiver.stats()['ignored'], 1)
+
+    def test_batch_that_does_not_fit_is_refused_whole(self):
+        receiver = self.serve(max_queue=2)
+        status, body = self.post(receiver, [event('aa'), event('bb'), event('cc')])
+        self.assertEqual((status, body['accepted'], body['refused']), (503, 0, 3))
+        self.assertEqual(receiver.stats()['depth'], 0)
+        self.assertEqual(receiver.stats()['refused'], 3)
+
+        self.assertEqual(self.post(receiver, [event('aa'), event('bb')]), (202, {'accepted': 2}))
+
+    def test_deferred_transfers_return_after_the_delay(self):
+        receiver = EventReceiver(USDT_CONTRACT, retry_delay=0.05)
+        receiver.accept([event('aa')])
+        receiver.defer(receiver.drain(timeout=0.1))
+        self.assertEqual(receiver.drain(timeout=0.01), [])
+        self.assertEqual(receiver.stats()['deferred'], 1)
+
+        time.sleep(0.06)
+        self.assertEqual([t['transaction_id'] for t in receiver.drain(timeout=0.1)], ['aa'])
+
+    def test_transfers_unverified_past_the_timeout_are_dropped(self):
+        receiver = EventReceiver(USDT_CONTRACT, verify_timeout=60)
+        receiver.accept([event('aa')])
+        transfers = receiver.drain(timeout=0.1)
+        transfers[0]['received_at'] -= 120
+        receiver.defer(transfers)
+        self.assertEqual(receiver.stats()['deferred'], 0)
+        self.assertEqual(receiver.stats()['unverified'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
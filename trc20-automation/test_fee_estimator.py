@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Fee Estimator Tests for TRC20 Automation Service
+Dry-run energy caching, fallbacks and batch burn prediction
+"""
+
+import unittest
+
+from fee_estimator import FeeEstimator, DEFAULT_ENERGY, DEFAULT_ENERGY_PRICE
+
+USDT_CONTRACT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+OWNER = 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ'
+HOLDER = 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7'
+FRESH = 'TKHuVq1oKVruCGLvqVexFs6dawKv6fQgFs'
+
+
+class FakeNode:
+    """Answers the wallet/ calls FeeEstimator makes and counts them"""
+
+    def __init__(self, energy_used=64_285, dry_run_ok=True, energy_limit=0):
+        self.energy_used = energy_used
+        self.dry_run_ok = dry_run_ok
+        self.energy_limit = energy_limit
+        self.calls = []
+
+    def __call__(self, path, payload=None):
+        self.calls.append((path, (payload or {}).get('function_selector')))
+        if path == 'wallet/getchainparameters':
+            return {'chainParameter': [{'key': 'getEnergyFee', 'value': 100}]}
+        if path == 'wallet/getaccountresource':
+            return {'EnergyLimit': self.energy_limit, 'EnergyUsed': 0}
+        if payload['function_selector'] == 'balanceOf(address)':
+            balance = 1 if payload['parameter'].endswith(_hex_tail(HOLDER)) else 0
+            return {'result': {'result': True}, 'constant_result': [format(balance, '064x')]}
+        if not self.dry_run_ok:
+            return {'result': {'message': 'REVERT'}}
+        return {'result': {'result': True}, 'energy_used': self.energy_used}
+
+
+def _hex_tail(address):
+    from tronpy.keys import to_hex_address
+    return to_hex_address(address)[-40:].lower()
+
+
+class FeeEstimatorTest(unittest.TestCase):
+    def estimator(self, node, **kwargs):
+        return FeeEstimator(node, USDT_CONTRACT, OWNER, **kwargs)
+
+    def test_dry_run_is_cached_per_destination_class(self):
+        node = FakeNode()
+        estimator = self.estimator(node)
+        self.assertEqual(estimator.destination_class(HOLDER), 'holder')
+        self.assertEqual(estimator.destination_class(FRESH), 'fresh')
+
+        for _ in range(3):
+            self.assertEqual(estimator.energy(HOLDER, 1_000_000), 64_285)
+        self.assertEqual(estimator.stats()['dry_runs'], 1)
+        self.assertEqual(estimator.stats()['class_lookups'], 2)
+
+    def test_failed_dry_run_falls_back_without_caching(self):
+        estimator = self.estimator(FakeNode(dry_run_ok=False))
+        self.assertEqual(estimator.energy(FRESH, 1_000_000), DEFAULT_ENERGY['fresh'])
+        self.assertEqual(estimator.energy(FRESH, 1_000_000), DEFAULT_ENERGY['fresh'])
+        self.assertEqual(estimator.stats()['fallbacks'], 2)
+        self.assertEqual(estimator.stats()['cached_classes'], 0)
+
+    def test_unreadable_energy_price_uses_the_default(self):
+        estimator = self.estimator(lambda path, payload=None: {})
+        self.assertEqual(estimator.energy_price(), DEFAULT_ENERGY_PRICE)
+
+    def test_fee_limit_adds_the_margin_and_is_capped(self):
+        estimator = self.estimator(FakeNode(energy_used=100_000), margin=0.2)
+        self.assertEqual(estimator.fee_limit(HOLDER, 1), 12_000_000)
+
+        capped = self.estimator(FakeNode(energy_used=100_000), max_fee_limit=5_000_000)
+        self.assertEqual(capped.fee_limit(HOLDER, 1), 5_000_000)
+
+    def test_predict_batch_spends_staked_energy_first(self):
+        estimator = self.estimator(FakeNode(energy_used=50_000, energy_limit=70_000))
+        prediction = estimator.predict_batch([(HOLDER, 1), (HOLDER, 1), (HOLDER, 1)])
+        self.assertEqual(prediction['energy'], 150_000)
+        # 70k energy covers the first transfer and 20k of the second
+        self.assertEqual(prediction['burn_sun'], [0, 3_000_000, 8_000_000])
+        self.assertEqual(prediction['total_burn_sun'], 8_000_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Key Vault Tests for TRC20 Automation Service
+Envelope encryption round trips, address binding and data key handling
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cryptography.exceptions import InvalidTag
+
+from key_vault import FileKEK, KeyVault
+
+
+class KeyVaultTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.kek_file = os.path.join(self.tmp_dir, 'kek.key')
+        FileKEK.create(self.kek_file)
+        self.data_keys = {}
+        self.vault = self.open_vault()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def open_vault(self, **kwargs):
+        return KeyVault(
+            FileKEK(self.kek_file),
+            save_data_key=lambda dek_id, wrapped, kek_id: self.data_keys.__setitem__(dek_id, (wrapped, kek_id)),
+            load_data_key=self.data_keys.get,
+            **kwargs
+        )
+
+    def test_round_trip_bound_to_address(self):
+        tokens = self.vault.encrypt_many(['key-a', 'key-b'], ['addr-a', 'addr-b'])
+        self.assertTrue(all(token.startswith('v1:') for token in tokens))
+        self.assertNotIn('key-a', tokens[0])
+        self.assertEqual(self.vault.decrypt_many(tokens, ['addr-a', 'addr-b']), ['key-a', 'key-b'])
+
+    def test_wrong_address_fails(self):
+        token = self.vault.encrypt('key-a', 'addr-a')
+        with self.assertRaises(InvalidTag):
+            self.vault.decrypt(token, 'addr-b')
+        with self.assertRaises(InvalidTag):
+            self.vault.decrypt(token)
+
+    def test_new_vault_unwraps_stored_data_key(self):
+        token = self.vault.encrypt('key-a', 'addr-a')
+        reopened = self.open_vault()
+        self.assertEqual(reopened.decrypt(token, 'addr-a'), 'key-a')
+        self.assertEqual(reopened.stats()['data_keys_unwrapped'], 1)
+
+    def test_data_key_rotates_after_max_uses(self):
+        vault = self.open_vault(max_uses=2)
+        vault.encrypt_many(['a', 'b'])
+        vault.encrypt('c')
+        self.assertEqual(vault.stats()['data_keys_created'], 2)
+        self.assertEqual(len(self.data_keys), 2)
+
+    def test_data_key_from_another_kek_is_refused(self):
+        token = self.vault.encrypt('key-a')
+        other_kek = os.path.join(self.tmp_dir, 'other.key')
+        FileKEK.create(other_kek)
+        vault = KeyVault(FileKEK(other_kek), save_data_key=lambda *args: None, load_data_key=self.data_keys.get)
+        with self.assertRaises(ValueError):
+            vault.decrypt(token)
+
+    def test_unknown_version_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.vault.decrypt('v0:abc:AAAA')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Metrics Tests for TRC20 Automation Service
+Exposition format and the optional metrics endpoint
+"""
+
+import unittest
+import urllib.request
+from unittest import mock
+
+import metrics
+from metrics import Counter, MetricsServer, Registry
+
+
+class MetricsServerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, 'logger')
+        self.logger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry = Registry()
+        self.deposits = Counter('test_deposits_total', 'Deposits by status', ('status',), registry=self.registry)
+
+    def serve(self, port=0):
+        server = MetricsServer(port=port, registry=self.registry)
+        started = server.start()
+        self.addCleanup(server.stop)
+        return server, started
+
+    def test_serves_the_registry(self):
+        self.deposits.inc(status='credited')
+        server, started = self.serve()
+        self.assertTrue(started)
+
+        url = f"http://127.0.0.1:{server._server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode()
+        self.assertIn('# TYPE test_deposits_total counter', body)
+        self.assertIn('test_deposits_total{status="credited"} 1.0', body)
+
+    def test_port_in_use_disables_metrics_without_raising(self):
+        first, _ = self.serve()
+        second, started = self.serve(first._server.server_address[1])
+        self.assertFalse(started)
+        self.logger.error.assert_called_once()
+        # Stopping a server that never started is a no-op
+        second.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Provider Pool Tests for TRC20 Automation Service
+Failover, hedged reads, provider health and pinned views
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import provider_pool
+from provider_pool import ProviderPool
+
+
+class FakeClient:
+    """A provider that answers after delay seconds, or raises error"""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.base_url = name
+        self.timeout = 30
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, path, params=None, json=None):
+        with self._lock:
+            self.calls.append(path)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {'provider': self.base_url}
+
+    def stats(self):
+        return {'keys': 0}
+
+
+class ProviderPoolTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(provider_pool, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fails_over_to_the_next_provider(self):
+        down, up = FakeClient('down', error=RuntimeError('502')), FakeClient('up')
+        pool = ProviderPool([down, up], hedge=False)
+        self.assertEqual(pool.post('wallet/getnowblock'), {'provider': 'up'})
+        self.assertEqual(pool.stats()['failovers'], 1)
+
+    def test_raises_when_every_provider_fails(self):
+        pool = ProviderPool([FakeClient('a', error=RuntimeError('a')),
+                             FakeClient('b', error=RuntimeError('b'))], hedge=False)
+        with self.assertRaises(RuntimeError):
+            pool.post('wallet/getnowblock')
+
+    def test_failing_provider_rests_and_is_tried_last(self):
+        down, up = FakeClient('down', error=RuntimeError('502')), FakeClient('up')
+        pool = ProviderPool([down, up], hedge=False, failure_threshold=1, cooldown=60)
+        pool.post('wallet/getnowblock')
+        self.assertEqual([p['healthy'] for p in pool.stats()['providers']], [False, True])
+
+        for _ in range(3):
+            pool.post('wallet/getnowblock')
+        self.assertEqual(len(down.calls), 1)
+
+    def test_only_resting_providers_are_still_tried(self):
+        only = FakeClient('only', error=RuntimeError('502'))
+        pool = ProviderPool([only, FakeClient('other', error=RuntimeError('502'))],
+                            hedge=False, failure_threshold=1, cooldown=60)
+        with self.assertRaises(RuntimeError):
+            pool.post('wallet/getnowblock')
+        only.error = None
+        self.assertEqual(pool.post('wallet/getnowblock'), {'provider': 'only'})
+
+    def test_slow_read_is_hedged_and_the_first_answer_wins(self):
+        slow, fast = FakeClient('slow', delay=0.5), FakeClient('fast')
+        pool = ProviderPool([slow, fast], hedge_delay=0.05)
+        started = time.monotonic()
+        self.assertEqual(pool.post('wallet/getnowblock'), {'provider': 'fast'})
+        self.assertLess(time.monotonic() - started, 0.4)
+
+        stats = pool.stats()
+        self.assertEqual((stats['hedged'], stats['secondary_wins']), (1, 1))
+
+    def test_broadcasts_are_sent_once(self):
+        down, up = FakeClient('down', error=RuntimeError('502')), FakeClient('up')
+        pool = ProviderPool([down, up])
+        with self.assertRaises(RuntimeError):
+            pool.post('wallet/broadcasttransaction', {'txID': 'ab'})
+        self.assertEqual(up.calls, [])
+
+    def test_pinned_view_uses_one_provider_and_updates_its_health(self):
+        first, second = FakeClient('first'), FakeClient('second')
+        pool = ProviderPool([first, second], hedge=False, failure_threshold=1)
+        pinned = pool.pinned()
+        self.assertIs(pinned.pinned(), pinned)
+
+        for _ in range(3):
+            self.assertEqual(pinned.post('walletsolidity/getnowblock'), {'provider': 'first'})
+        self.assertEqual(second.calls, [])
+
+        first.error = RuntimeError('502')
+        with self.assertRaises(RuntimeError):
+            pinned.post('walletsolidity/getnowblock')
+        # No failover on a pinned view, but the pool now routes around the provider
+        self.assertEqual(second.calls, [])
+        self.assertEqual(pool.post('walletsolidity/getnowblock'), {'provider': 'second'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Reconciliation Tests for TRC20 Automation Service
+Merge-join of on-chain transfers against database rows
+"""
+
+import unittest
+
+from reconcile import Reconciler, external_sort, group_by_txid
+
+USDT = 1_000_000
+
+
+class ReconcilerTest(unittest.TestCase):
+    def run_reconciler(self, chain, db, **kwargs):
+        issues = []
+        stats = Reconciler(issues.append, **kwargs).run(sorted(chain), sorted(db))
+        return stats, {(issue['issue'], issue['txid']) for issue in issues}
+
+    def test_matches_and_reports_each_issue(self):
+        chain = [('aa', 10 * USDT, 1, ''), ('bb', 20 * USDT, 2, ''), ('cc', 30 * USDT, 3, '')]
+        db = [
+            ('aa', 10 * USDT, 1, 'deposits:1:completed'),
+            ('cc', 31 * USDT, 3, 'deposits:3:completed'),
+            ('dd', 40 * USDT, 4, 'deposits:4:pending'),
+        ]
+        stats, issues = self.run_reconciler(chain, db)
+        self.assertEqual(issues, {('missing_in_db', 'bb'), ('amount_mismatch', 'cc'), ('missing_on_chain', 'dd')})
+        self.assertEqual((stats['chain'], stats['db'], stats['matched']), (3, 3, 2))
+
+    def test_amounts_within_tolerance_match(self):
+        stats, issues = self.run_reconciler([('aa', 10 * USDT + 4_000, 1, '')],
+                                            [('aa', 10 * USDT, 1, 'deposits:1:completed')])
+        self.assertEqual(issues, set())
+        self.assertEqual(stats['amount_mismatch'], 0)
+
+    def test_duplicate_rows_are_reported(self):
+        stats, issues = self.run_reconciler(
+            [('aa', 10 * USDT, 1, '')],
+            [('aa', 5 * USDT, 1, 'deposits:1:completed'), ('aa', 5 * USDT, 1, 'deposits:2:completed')]
+        )
+        self.assertEqual(issues, {('duplicate_in_db', 'aa')})
+
+    def test_out_of_range_chain_transfers_are_ignored(self):
+        chain = [('aa', 1, 1, ''), ('bb', 20 * USDT, 2, '')]
+        stats, issues = self.run_reconciler(chain, [], chain_amount_range=(10 * USDT, 1_000 * USDT))
+        self.assertEqual(issues, {('ignored_amount', 'aa'), ('missing_in_db', 'bb')})
+        self.assertEqual((stats['ignored_amount'], stats['missing_in_db']), (1, 1))
+
+    def test_mismatches_found_across_batches(self):
+        chain = [(f"{i:04d}", USDT, i, '') for i in range(25)]
+        db = [(f"{i:04d}", 2 * USDT if i % 10 == 0 else USDT, i, f"deposits:{i}:completed") for i in range(25)]
+        stats, issues = self.run_reconciler(chain, db, batch_size=7)
+        self.assertEqual(issues, {('amount_mismatch', '0000'), ('amount_mismatch', '0010'),
+                                  ('amount_mismatch', '0020')})
+
+
+class SortAndGroupTest(unittest.TestCase):
+    def test_external_sort_spills_and_merges(self):
+        records = [(f"{i * 7 % 50:03d}", i, i, '') for i in range(50)]
+        self.assertEqual(list(external_sort(records, chunk_size=8)), sorted(records))
+
+    def test_group_sums_amounts_and_keeps_refs(self):
+        groups = list(group_by_txid([('aa', 1, 1, 'r1'), ('aa', 2, 2, 'r2'), ('bb', 3, 3, '')]))
+        self.assertEqual([(g['txid'], g['amount_sun'], g['count'], g['refs']) for g in groups],
+                         [('aa', 3, 2, ['r1', 'r2']), ('bb', 3, 1, [])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+TronGrid Client Tests for TRC20 Automation Service
+Token buckets, key rotation, throttling backoff and adaptive concurrency
+"""
+
+import json
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+import trongrid_client
+from trongrid_client import TokenBucket, TronGridClient
+
+
+def response(status_code=200, body=None, headers=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = body if isinstance(body, bytes) else json.dumps(body or {}).encode()
+    resp.headers.update(headers or {})
+    resp.url = 'https://api.trongrid.io/wallet/getnowblock'
+    return resp
+
+
+class FakeSession:
+    """Replays scripted responses (or exceptions) and records the API key of each request"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.keys = []
+
+    def request(self, method, url, params=None, json=None, headers=None, timeout=None):
+        self.keys.append(headers.get('TRON-PRO-API-KEY'))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_wait_for_refill(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        wait = bucket.try_acquire()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(rate=1000, burst=1)
+        bucket.try_acquire()
+        time.sleep(0.01)
+        self.assertEqual(bucket.try_acquire(), 0)
+
+
+class TronGridClientTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(trongrid_client.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(trongrid_client, 'logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client(self, *outcomes, **kwargs):
+        kwargs.setdefault('api_keys', ['key-a', 'key-b'])
+        client = TronGridClient('https://api.trongrid.io', rate_per_key=1000, **kwargs)
+        client.session = FakeSession(*outcomes)
+        return client
+
+    def test_requests_rotate_across_keys(self):
+        client = self.client(*(response(body={'ok': i}) for i in range(4)))
+        results = [client.post('wallet/getnowblock') for _ in range(4)]
+        self.assertEqual(results, [{'ok': i} for i in range(4)])
+        self.assertEqual(client.session.keys, ['key-a', 'key-b', 'key-a', 'key-b'])
+
+    def test_no_keys_sends_anonymous_requests(self):
+        client = self.client(response(), api_keys=[])
+        client.get('v1/blocks/latest')
+        self.assertEqual(client.session.keys, [None])
+
+    def test_throttled_key_rests_and_the_retry_uses_another(self):
+        client = self.client(response(429, headers={'Retry-After': '7'}), response(body={'ok': True}))
+        self.assertEqual(client.post('wallet/getnowblock'), {'ok': True})
+        self.assertEqual(client.session.keys, ['key-a', 'key-b'])
+        # The retry waits at least Retry-After
+        self.assertGreaterEqual(self.sleep.call_args[0][0], 7)
+
+        stats = client.stats()
+        self.assertEqual((stats['throttled'], stats['retries'], stats['resting_keys']), (1, 1, 1))
+
+    def test_quota_403_counts_as_throttling(self):
+        client = self.client(response(403, b'Exceed the user daily usage'), response())
+        client.post('wallet/getnowblock')
+        self.assertEqual(client.stats()['throttled'], 1)
+
+    def test_other_client_errors_are_not_retried(self):
+        client = self.client(response(404), response())
+        with self.assertRaises(requests.HTTPError):
+            client.get('v1/missing')
+        self.assertEqual(client.stats()['requests'], 1)
+
+    def test_server_errors_retry_until_max_retries(self):
+        client = self.client(*(response(502) for _ in range(3)), max_retries=2)
+        with self.assertRaises(requests.HTTPError):
+            client.post('wallet/getnowblock')
+        self.assertEqual(client.stats()['requests'], 3)
+        self.assertEqual(client.stats()['retries'], 2)
+
+    def test_connection_errors_retry_then_raise(self):
+        client = self.client(requests.ConnectionError('reset'), response(body={'ok': True}), max_retries=1)
+        self.assertEqual(client.post('wallet/getnowblock'), {'ok': True})
+
+        client = self.client(requests.Timeout('slow'), requests.Timeout('slow'), max_retries=1)
+        with self.assertRaises(requests.Timeout):
+            client.post('wallet/getnowblock')
+
+    def test_concurrency_grows_on_success_and_halves_on_throttling(self):
+        client = self.client(*(response() for _ in range(20)), response(429), response(),
+                             max_concurrency=4)
+        for _ in range(20):
+            client.post('wallet/getnowblock')
+        self.assertEqual(client.stats()['concurrency_limit'], 4)
+
+        client.post('wallet/getnowblock')
+        self.assertEqual(client.stats()['concurrency_limit'], 2)
+
+    def test_backoff_is_jittered_and_capped(self):
+        client = self.client(backoff_base=1, backoff_max=5)
+        delays = [client._backoff(10) for _ in range(50)]
+        self.assertTrue(all(0 <= delay <= 5 for delay in delays))
+        self.assertEqual(client._backoff(0, retry_after=9), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Processed Transaction Index Tests for TRC20 Automation Service
+Bloom filter and LRU partitioning of transaction hashes
+"""
+
+import unittest
+
+from tx_index import ProcessedTransactionIndex
+
+
+class ProcessedTransactionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ProcessedTransactionIndex(max_bytes=1024 * 1024, expected_items=10_000)
+
+    def test_seen_hashes_skip_the_database(self):
+        self.index.add_many(['aa', 'bb'])
+        seen, new, unknown = self.index.partition(['aa', 'bb', 'cc'])
+        self.assertEqual(seen, {'aa', 'bb'})
+        self.assertEqual(new | unknown, {'cc'})
+
+    def test_bloom_negatives_need_the_database_until_warmed(self):
+        _, new, unknown = self.index.partition(['aa'])
+        self.assertEqual((new, unknown), (set(), {'aa'}))
+
+        self.index.warmed = True
+        _, new, unknown = self.index.partition(['aa'])
+        self.assertEqual((new, unknown), ({'aa'}, set()))
+        self.assertEqual(self.index.stats()['bloom_negatives'], 2)
+
+    def test_evicted_hashes_go_back_to_the_database(self):
+        index = ProcessedTransactionIndex(max_bytes=16 * 1024, expected_items=1_000)
+        index.warmed = True
+        hashes = [f"{i:064x}" for i in range(index.lru_capacity + 10)]
+        index.add_many(hashes)
+
+        # The oldest hashes left the LRU but are still in the Bloom filter
+        seen, new, unknown = index.partition(hashes[:5])
+        self.assertEqual(seen, set())
+        self.assertEqual(new, set())
+        self.assertEqual(unknown, set(hashes[:5]))
+
+        seen, _, _ = index.partition(hashes[-5:])
+        self.assertEqual(seen, set(hashes[-5:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
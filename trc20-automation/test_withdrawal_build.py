@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Withdrawal Build Tests for TRC20 Automation Service
+Signing USDT transfers against the shared solid ref-block
+"""
+
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import main
+
+
+class FakeTransaction:
+    txid = 'ab' * 32
+
+    def __init__(self, ref_block_id):
+        self.ref_block_id = ref_block_id
+        self.signed_with = None
+
+    def sign(self, signer):
+        self.signed_with = signer
+
+    def to_json(self):
+        return {'raw_data': {'expiration': 60_000}}
+
+
+class FakeBuilder:
+    """Stands in for tronpy's contract call builder chain"""
+
+    def __init__(self, build_error=None):
+        self.build_error = build_error
+
+    def with_owner(self, owner):
+        return self
+
+    def fee_limit(self, fee_limit):
+        return self
+
+    def build(self, offline=False, ref_block_id=None):
+        if offline and self.build_error:
+            raise self.build_error
+        return FakeTransaction(ref_block_id)
+
+
+class WithdrawalBuildTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, 'logger')
+        self.logger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.builder = FakeBuilder()
+        self.service = main.TRC20AutomationService.__new__(main.TRC20AutomationService)
+        self.service.main_wallet_address = 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ'
+        self.service._signer = 'signer'
+        self.service.fee_estimator = mock.Mock(**{'fee_limit.return_value': 30_000_000})
+        self.service._usdt_contract = mock.Mock()
+        self.service._usdt_contract.functions.transfer.side_effect = lambda to, amount: self.builder
+        self.service.confirmation_service = mock.Mock(head={'number': 1_000, 'id': 'ref-block'})
+        self.withdrawal = {'id': 1, 'to_address': 'TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7', 'amount': Decimal('5')}
+
+    def test_signs_against_the_shared_ref_block(self):
+        signed = self.service._build_signed_withdrawal(self.withdrawal)
+        self.assertEqual(signed['txn'].ref_block_id, 'ref-block')
+        self.assertEqual(signed['txn'].signed_with, 'signer')
+        self.assertEqual(signed['expiration'], 60_000)
+        self.service._usdt_contract.functions.transfer.assert_called_once_with(self.withdrawal['to_address'], 5_000_000)
+
+    def test_missing_solid_head_raises(self):
+        self.service.confirmation_service.head = None
+        with self.assertRaises(RuntimeError):
+            self.service._build_signed_withdrawal(self.withdrawal)
+
+    def test_malformed_ref_block_surfaces(self):
+        self.builder = FakeBuilder(ValueError('bad ref_block_id'))
+        with self.assertRaises(ValueError):
+            self.service._build_signed_withdrawal(self.withdrawal)
+
+    def test_older_tronpy_falls_back_with_a_warning(self):
+        self.builder = FakeBuilder(ImportError('no protobuf'))
+        signed = self.service._build_signed_withdrawal(self.withdrawal)
+        self.assertIsNone(signed['txn'].ref_block_id)
+        self.logger.warning.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
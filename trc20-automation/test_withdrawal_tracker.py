@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Withdrawal Tracker Tests for TRC20 Automation Service
+Matching of solid block receipts and expiry of in-flight withdrawals
+"""
+
+import time
+import unittest
+
+from withdrawal_tracker import WithdrawalTracker
+
+
+def receipt(txid, result=None, receipt_result='SUCCESS'):
+    info = {'id': txid, 'receipt': {'result': receipt_result}}
+    if result:
+        info['result'] = result
+        info['resMessage'] = 'REVERT opcode executed'
+    return info
+
+
+class WithdrawalTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = WithdrawalTracker()
+        self.tracker.track({'id': 1, 'txid': 'aa', 'expiration': 1_000, 'created_at': time.time() - 5})
+        self.tracker.track({'id': 2, 'txid': 'bb', 'expiration': 5_000, 'created_at': time.time()})
+
+    def test_match_receipts_resolves_only_tracked_txids(self):
+        confirmed, failed = self.tracker.match_receipts([receipt('aa'), receipt('zz')])
+        self.assertEqual([entry['id'] for entry in confirmed], [1])
+        self.assertEqual(failed, [])
+        self.assertEqual(len(self.tracker), 1)
+        self.assertGreaterEqual(self.tracker.stats()['latency_max_seconds'], 5)
+
+    def test_match_receipts_reports_failed_transactions(self):
+        _, failed = self.tracker.match_receipts([receipt('aa', receipt_result='OUT_OF_ENERGY')])
+        self.assertEqual(failed[0]['reason'], 'OUT_OF_ENERGY')
+
+        _, failed = self.tracker.match_receipts([receipt('bb', result='FAILED')])
+        self.assertEqual(failed[0]['reason'], 'REVERT opcode executed')
+        self.assertEqual(self.tracker.stats()['failed'], 2)
+
+    def test_past_expiration_does_not_remove(self):
+        candidates = self.tracker.past_expiration(2_000)
+        self.assertEqual([entry['txid'] for entry in candidates], ['aa'])
+        self.assertEqual(len(self.tracker), 2)
+        self.assertEqual(self.tracker.stats()['expired'], 0)
+
+    def test_expire_removes_and_counts(self):
+        expired = self.tracker.expire(['aa', 'unknown'])
+        self.assertEqual([entry['id'] for entry in expired], [1])
+        self.assertEqual(len(self.tracker), 1)
+        self.assertEqual(self.tracker.stats()['expired'], 1)
+
+    def test_expired_txid_found_later_is_not_matched_twice(self):
+        self.tracker.expire(['aa'])
+        confirmed, failed = self.tracker.match_receipts([receipt('aa')])
+        self.assertEqual((confirmed, failed), ([], []))
+
+    def test_untrack(self):
+        self.tracker.untrack('bb')
+        self.assertEqual(self.tracker.past_expiration(10_000)[0]['txid'], 'aa')
+        self.assertEqual(len(self.tracker), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Cycle Tracing for TRC20 Automation Service
+Records spans around external calls and profiles monitoring cycles that run slow
+"""
+
+import os
+import sys
+import asyncio
+import time
+import signal
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('trace', default=None)
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar('span_depth', default=0)
+
+
+class Trace:
+    """Spans and stack samples collected during one run of a job"""
+
+    def __init__(self, name: str, sample: bool, max_spans: int = 5000):
+        self.name = name
+        self.sample = sample
+        self.max_spans = max_spans
+        self.started = time.monotonic()
+        self.wall_started = datetime.now()
+        self.duration: Optional[float] = None
+
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped_spans = 0
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._threads: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Dict[str, Any]):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def enter_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] += 1
+
+    def exit_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def active_threads(self) -> List[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def add_samples(self, stacks: List[str]):
+        with self._lock:
+            self.samples.update(stacks)
+            self.sample_count += 1
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a span of the current cycle; a no-op outside a traced cycle"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    # The event loop thread idles between awaits, so only worker-thread spans are sampled
+    ident = None if _in_event_loop() else threading.get_ident()
+    if ident is not None:
+        trace.enter_thread(ident)
+    started = time.monotonic()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if ident is not None:
+            trace.exit_thread(ident)
+        _depth.reset(token)
+        trace.add_span({
+            'name': name,
+            'start': started - trace.started,
+            'duration': time.monotonic() - started,
+            'depth': depth,
+            'thread': threading.current_thread().name,
+            'error': error,
+            **attrs,
+        })
+
+
+@contextmanager
+def stage(name: str):
+    """Time a processing stage in the stage latency histogram and as a span"""
+    with STAGE_SECONDS.time(stage=name), span(name):
+        yield
+
+
+def run_in_span(name: str, func: Callable, *args, **kwargs) -> Any:
+    """Call func inside a span; used to trace calls handed to worker threads"""
+    with span(name):
+        return func(*args, **kwargs)
+
+
+def _folded_stack(frame, max_depth: int = 48) -> str:
+    """Root-first 'func (file:line);...' stack, the format flame graph tools read"""
+    frames = []
+    while frame is not None and len(frames) < max_depth:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+class CycleTracer:
+    """Traces each job run and writes a report for cycles slower than slow_seconds.
+
+    Spans are always recorded, which is cheap. When sampling is on (a
+    sample_interval above 0; off by default, as it samples every cycle), a
+    background thread also samples the stacks of the threads that are inside
+    a traced cycle's spans every sample_interval seconds, giving a
+    pyinstrument-style profile of where slow cycles spent their time.
+    profile_next(n), also triggered by SIGUSR1, writes a report for the next
+    n cycles whatever their duration, sampling them even if sampling is off.
+    """
+
+    def __init__(self, slow_seconds: float = 10.0, report_dir: str = 'profiles', sample_interval: float = 0.0,
+                 signal_cycles: int = 5):
+        self.slow_seconds = slow_seconds
+        self.report_dir = report_dir
+        self.sample_interval = sample_interval
+        self.signal_cycles = signal_cycles
+
+        self._profile_remaining = 0
+        self._active: List[Trace] = []
+        self._lock = threading.Lock()
+        self._sampling = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def configure_from_env(self):
+        """Apply SLOW_CYCLE_SECONDS, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL and PROFILE_SIGNAL_CYCLES"""
+        self.slow_seconds = float(os.getenv('SLOW_CYCLE_SECONDS', str(self.slow_seconds)))
+        self.report_dir = os.getenv('PROFILE_DIR', self.report_dir)
+        self.sample_interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL', str(self.sample_interval)))
+        self.signal_cycles = int(os.getenv('PROFILE_SIGNAL_CYCLES', str(self.signal_cycles)))
+
+    def profile_next(self, cycles: int):
+        """Report the next cycles runs regardless of how long they take"""
+        with self._lock:
+            self._profile_remaining += cycles
+        logger.info(f"Profiling the next {cycles} cycles into {self.report_dir}/")
+
+    def install_signal_handler(self):
+        """Profile the next signal_cycles cycles on SIGUSR1 (where the platform has it)"""
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profile_next(self.signal_cycles))
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_loop, name='cycle-sampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        interval = self.sample_interval or 0.01
+        while True:
+            # Idle until some cycle is being sampled
+            self._sampling.wait()
+            time.sleep(interval)
+            with self._lock:
+                traces = list(self._active)
+            if not traces:
+                continue
+            frames = sys._current_frames()
+            for trace in traces:
+                stacks = [_folded_stack(frames[ident]) for ident in trace.active_threads() if ident in frames]
+                if stacks:
+                    trace.add_samples(stacks)
+
+    @contextmanager
+    def cycle(self, name: str):
+        """Trace one run of a job"""
+        with self._lock:
+            forced = self._profile_remaining > 0
+            if forced:
+                self._profile_remaining -= 1
+        trace = Trace(name, sample=forced or self.sample_interval > 0)
+        if trace.sample:
+            with self._lock:
+                self._active.append(trace)
+                self._sampling.set()
+            self._ensure_sampler()
+
+        token = _trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _trace.reset(token)
+            trace.duration = time.monotonic() - trace.started
+            if trace.sample:
+                with self._lock:
+                    self._active.remove(trace)
+                    if not self._active:
+                        self._sampling.clear()
+            if forced or trace.duration >= self.slow_seconds:
+                self._report(trace, forced)
+
+    def _report(self, trace: Trace, forced: bool):
+        """Log a one-line breakdown and write the full report to the report directory"""
+        by_name: Dict[str, Dict[str, float]] = {}
+        for item in trace.spans:
+            entry = by_name.setdefault(item['name'], {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0})
+            entry['count'] += 1
+            entry['total'] += item['duration']
+            entry['max'] = max(entry['max'], item['duration'])
+            entry['errors'] += item['error'] is not None
+        ranked = sorted(by_name.items(), key=lambda kv: kv[1]['total'], reverse=True)
+
+        top = ', '.join(f"{name} {e['total']:.1f}s x{e['count']}" for name, e in ranked[:3]) or 'no spans'
+        reason = 'profiled on request' if forced else f"over {self.slow_seconds:g}s"
+        path = None
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            path = os.path.join(self.report_dir,
+                                f"{trace.name}-{trace.wall_started.strftime('%Y%m%d-%H%M%S-%f')}.txt")
+            with open(path, 'w') as f:
+                f.write(self.render(trace, ranked))
+        except OSError as e:
+            logger.warning(f"Could not write cycle report: {e}")
+
+        logger.warning(f"Cycle {trace.name} took {trace.duration:.1f}s ({reason}): {top}"
+                       + (f"; report {path}" if path else ''))
+
+    def render(self, trace: Trace, ranked: List[Tuple[str, Dict[str, float]]]) -> str:
+        """Text report: span totals, the span timeline and the sampled call tree"""
+        lines = [f"Cycle {trace.name} started {trace.wall_started.isoformat()} took {trace.duration:.3f}s", ""]
+
+        lines.append(f"{'span':<60} {'count':>6} {'total s':>9} {'max s':>8} {'errors':>6}")
+        for name, e in ranked:
+            lines.append(f"{name[:60]:<60} {e['count']:>6} {e['total']:>9.3f} {e['max']:>8.3f} {e['errors']:>6}")
+        if trace.dropped_spans:
+            lines.append(f"({trace.dropped_spans} further spans not recorded)")
+
+        lines += ["", "Timeline (offset s, duration s):"]
+        for item in sorted(trace.spans, key=lambda s: s['start'])[:200]:
+            error = f" !{item['error']}" if item['error'] else ''
+            lines.append(f"{item['start']:>9.3f} {item['duration']:>8.3f} {'  ' * item['depth']}{item['name']}"
+                         f" [{item['thread']}]{error}")
+
+        if trace.sample_count:
+            lines += ["", f"Sampled profile ({trace.sample_count} samples every {self.sample_interval or 0.01:g}s, "
+                          f"threads inside spans only):"]
+            lines += self._render_tree(trace.samples)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_tree(samples: Counter, min_share: float = 0.01) -> List[str]:
+        """Merge folded stacks into a call tree, dropping branches under min_share of samples"""
+        tree: Dict[str, Any] = {'count': 0, 'children': {}}
+        for stack, count in samples.items():
+            node = tree
+            node['count'] += count
+            for frame in stack.split(';'):
+                node = node['children'].setdefault(frame, {'count': 0, 'children': {}})
+                node['count'] += count
+
+        total = tree['count'] or 1
+        lines = []
+
+        def walk(node: Dict[str, Any], depth: int):
+            for frame, child in sorted(node['children'].items(), key=lambda kv: kv[1]['count'], reverse=True):
+                if child['count'] / total < min_share:
+                    continue
+                lines.append(f"{child['count'] / total * 100:6.1f}% {'  ' * depth}{frame}")
+                walk(child, depth + 1)
+
+        walk(tree, 0)
+        return lines
+
+
+TRACER = CycleTracer()
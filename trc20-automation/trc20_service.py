@@ -13,6 +13,10 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from dotenv import load_dotenv
 
+from async_engine import AsyncEngine
+from metrics import DEPOSITS, WITHDRAWALS, MetricsServer
+from tracing import TRACER, stage
+
 # Load environment variables
 load_dotenv()
 
@@ -34,7 +38,7 @@ class TRC20AutomationService:
         self.service_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         self.main_wallet_address = os.getenv('TRON_MAIN_WALLET_ADDRESS', 'TTrhsfwjmFQwvG784GxKUj2Q3GFv3tX9qQ')
         self.monitoring_interval = int(os.getenv('MONITORING_INTERVAL', '30'))
-        self.trongrid_api_key = os.getenv('TRONGRID_API_KEY', 'demo')
+        self.request_timeout = int(os.getenv('REQUEST_TIMEOUT', '30'))
 
         # API headers for Supabase
         self.headers = {
@@ -43,47 +47,61 @@ class TRC20AutomationService:
             'Content-Type': 'application/json'
         }
 
-        # Initialize TRON client
+        # Initialize TRON client; the tronpy client itself is created on first use
         try:
-            from tronpy import Tron
-            if self.trongrid_api_key and self.trongrid_api_key != 'demo':
-                # Use API key in headers for requests
-                self.tron_headers = {'TRON-PRO-API-KEY': self.trongrid_api_key}
-                logger.info(f"Using TronGrid API key: {self.trongrid_api_key[:10]}...")
+            from provider_pool import ProviderPool
+            self.trongrid = ProviderPool.from_env('mainnet')
+            api_keys = self.trongrid.stats()['keys']
+            if api_keys:
+                logger.info(f"Using {api_keys} TronGrid API key(s)")
             else:
-                self.tron_headers = {}
                 logger.info("Using public TronGrid endpoint")
-
-            self.tron = Tron(network='mainnet')
-            logger.info("TRON client initialized successfully")
         except Exception as e:
             logger.warning(f"TRON client initialization warning: {e}")
-            self.tron = None
+            self.trongrid = None
+        self._tron = None
+
+        TRACER.configure_from_env()
 
         logger.info(f"TRC20 Service initialized")
         logger.info(f"Main wallet: {self.main_wallet_address}")
         logger.info(f"Monitoring interval: {self.monitoring_interval} seconds")
 
+    @property
+    def tron(self):
+        """tronpy client, created on first use since importing tronpy is slow"""
+        if self._tron is None and self.trongrid is not None:
+            from tronpy import Tron
+            from trongrid_client import tronpy_provider
+            self._tron = Tron(provider=tronpy_provider(self.trongrid))
+        return self._tron
+
     def check_pending_deposits(self):
         """Check for pending deposits that need confirmation"""
+        for deposit in self.fetch_pending_deposits():
+            self.process_pending_deposit(deposit)
+
+    def fetch_pending_deposits(self):
+        """Fetch pending deposits that need confirmation"""
         try:
             # Get pending deposits
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/deposits?status=eq.pending&method_id=eq.usdt-trc20",
-                headers=self.headers
-            )
+            with stage('supabase_rest'):
+                response = requests.get(
+                    f"{self.supabase_url}/rest/v1/deposits?status=eq.pending&method_id=eq.usdt-trc20",
+                    headers=self.headers,
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 200:
                 deposits = response.json()
                 logger.info(f"Found {len(deposits)} pending deposits")
-                
-                for deposit in deposits:
-                    self.process_pending_deposit(deposit)
+                return deposits
             else:
                 logger.error(f"Failed to fetch pending deposits: {response.status_code}")
                 
         except Exception as e:
             logger.error(f"Error checking pending deposits: {e}")
+        return []
 
     def process_pending_deposit(self, deposit):
         """Process a pending deposit"""
@@ -112,18 +130,22 @@ class TRC20AutomationService:
                 'admin_notes': 'Auto-approved by TRC20 automation service'
             }
             
-            response = requests.patch(
-                f"{self.supabase_url}/rest/v1/deposits?id=eq.{deposit_id}",
-                headers=self.headers,
-                json=update_data
-            )
+            with stage('supabase_rest'):
+                response = requests.patch(
+                    f"{self.supabase_url}/rest/v1/deposits?id=eq.{deposit_id}",
+                    headers=self.headers,
+                    json=update_data,
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 204:
                 logger.info(f"✅ Deposit {deposit_id} approved successfully")
+                DEPOSITS.inc(status='completed')
                 
                 # Credit user wallet if user_email is provided and not system
                 if user_email and user_email != 'system@ticglobal.com':
-                    self.credit_user_wallet(user_email, amount, deposit_id)
+                    with stage('credit'):
+                        self.credit_user_wallet(user_email, amount, deposit_id)
                 else:
                     logger.info(f"Deposit {deposit_id} approved but no user to credit")
                     
@@ -137,10 +159,12 @@ class TRC20AutomationService:
         """Credit user wallet with deposit amount"""
         try:
             # Get current wallet balance
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/user_wallets?user_email=eq.{user_email}",
-                headers=self.headers
-            )
+            with stage('supabase_rest'):
+                response = requests.get(
+                    f"{self.supabase_url}/rest/v1/user_wallets?user_email=eq.{user_email}",
+                    headers=self.headers,
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 200:
                 wallets = response.json()
@@ -149,16 +173,19 @@ class TRC20AutomationService:
                     new_balance = current_balance + float(amount)
                     
                     # Update wallet balance
-                    update_response = requests.patch(
-                        f"{self.supabase_url}/rest/v1/user_wallets?user_email=eq.{user_email}",
-                        headers=self.headers,
-                        json={
-                            'balance': new_balance,
-                            'updated_at': datetime.now().isoformat()
-                        }
-                    )
+                    with stage('supabase_rest'):
+                        update_response = requests.patch(
+                            f"{self.supabase_url}/rest/v1/user_wallets?user_email=eq.{user_email}",
+                            headers=self.headers,
+                            json={
+                                'balance': new_balance,
+                                'updated_at': datetime.now().isoformat()
+                            },
+                            timeout=self.request_timeout
+                        )
                     
                     if update_response.status_code == 204:
+                        DEPOSITS.inc(status='credited')
                         logger.info(f"✅ Credited {amount} USDT to {user_email} (new balance: {new_balance})")
                     else:
                         logger.error(f"Failed to update wallet for {user_email}")
@@ -172,23 +199,29 @@ class TRC20AutomationService:
 
     def check_withdrawal_requests(self):
         """Check for pending withdrawal requests"""
+        for withdrawal in self.fetch_withdrawal_requests():
+            self.process_withdrawal_request(withdrawal)
+
+    def fetch_withdrawal_requests(self):
+        """Fetch pending withdrawal requests"""
         try:
-            response = requests.get(
-                f"{self.supabase_url}/rest/v1/withdrawal_requests?status=eq.pending&method_id=eq.usdt-trc20",
-                headers=self.headers
-            )
+            with stage('supabase_rest'):
+                response = requests.get(
+                    f"{self.supabase_url}/rest/v1/withdrawal_requests?status=eq.pending&method_id=eq.usdt-trc20",
+                    headers=self.headers,
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 200:
                 withdrawals = response.json()
                 logger.info(f"Found {len(withdrawals)} pending withdrawals")
-                
-                for withdrawal in withdrawals:
-                    self.process_withdrawal_request(withdrawal)
+                return withdrawals
             else:
                 logger.error(f"Failed to fetch withdrawal requests: {response.status_code}")
                 
         except Exception as e:
             logger.error(f"Error checking withdrawal requests: {e}")
+        return []
 
     def process_withdrawal_request(self, withdrawal):
         """Process a withdrawal request"""
@@ -226,14 +259,17 @@ class TRC20AutomationService:
                 'admin_notes': 'Auto-processed by TRC20 automation service (DEMO MODE)'
             }
             
-            response = requests.patch(
-                f"{self.supabase_url}/rest/v1/withdrawal_requests?id=eq.{withdrawal_id}",
-                headers=self.headers,
-                json=update_data
-            )
+            with stage('supabase_rest'):
+                response = requests.patch(
+                    f"{self.supabase_url}/rest/v1/withdrawal_requests?id=eq.{withdrawal_id}",
+                    headers=self.headers,
+                    json=update_data,
+                    timeout=self.request_timeout
+                )
             
             if response.status_code == 204:
                 logger.info(f"✅ Withdrawal {withdrawal_id} processed successfully")
+                WITHDRAWALS.inc(status='completed')
                 logger.info(f"   Amount: {amount} USDT")
                 logger.info(f"   To: {to_address}")
                 logger.info(f"   Mock TX: {mock_tx_hash}")
@@ -248,34 +284,59 @@ class TRC20AutomationService:
         logger.info("🔄 Starting monitoring cycle...")
         
         try:
-            # Check pending deposits
-            self.check_pending_deposits()
-            
-            # Check withdrawal requests
-            self.check_withdrawal_requests()
+            with TRACER.cycle('monitoring_cycle'), stage('monitoring_cycle'):
+                # Check pending deposits
+                with stage('deposit_cycle'):
+                    self.check_pending_deposits()
+
+                # Check withdrawal requests
+                with stage('withdrawal_cycle'):
+                    self.check_withdrawal_requests()
             
             logger.info("✅ Monitoring cycle completed")
             
         except Exception as e:
             logger.error(f"Error in monitoring cycle: {e}")
 
+    async def run_deposit_cycle_async(self):
+        """Process every pending deposit concurrently"""
+        with stage('deposit_cycle'):
+            deposits = await self.engine.call('supabase', self.fetch_pending_deposits)
+            await self.engine.gather('supabase', self.process_pending_deposit, deposits)
+
+    async def run_withdrawal_cycle_async(self):
+        """Process every pending withdrawal request concurrently"""
+        with stage('withdrawal_cycle'):
+            withdrawals = await self.engine.call('supabase', self.fetch_withdrawal_requests)
+            await self.engine.gather('supabase', self.process_withdrawal_request, withdrawals)
+
     def start_monitoring(self):
         """Start the monitoring service"""
         logger.info("🚀 Starting TRC20 USDT automation service...")
         logger.info(f"Monitoring wallet: {self.main_wallet_address}")
         logger.info(f"Check interval: {self.monitoring_interval} seconds")
         logger.info("Press Ctrl+C to stop")
-        
-        try:
-            while True:
-                self.run_monitoring_cycle()
-                time.sleep(self.monitoring_interval)
-                
-        except KeyboardInterrupt:
-            logger.info("🛑 Service stopped by user")
-        except Exception as e:
-            logger.error(f"Service error: {e}")
-            raise
+        TRACER.install_signal_handler()
+
+        metrics_port = os.getenv('METRICS_PORT', '')
+        metrics_server = MetricsServer(os.getenv('METRICS_HOST', '127.0.0.1'), int(metrics_port)) if metrics_port else None
+        if metrics_server:
+            metrics_server.start()
+
+        # Deposits and withdrawals run as independent jobs, so a slow Supabase
+        # call in one never holds up the other
+        self.engine = AsyncEngine(
+            limits={'supabase': int(os.getenv('SUPABASE_CONCURRENCY', '8'))},
+            call_timeout=float(os.getenv('CALL_TIMEOUT', '60')),
+            error_backoff=float(os.getenv('ERROR_RETRY_INTERVAL', '60'))
+        )
+        self.engine.add_job('deposits', self.run_deposit_cycle_async, self.monitoring_interval)
+        self.engine.add_job('withdrawals', self.run_withdrawal_cycle_async, self.monitoring_interval)
+        self.engine.run()
+
+        if metrics_server:
+            metrics_server.stop()
+        logger.info("🛑 Service stopped by user")
 
 def main():
     """Main function"""
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+TronGrid Client for TRC20 Automation Service
+Rate-limited HTTP access to TronGrid with API key rotation, retries and adaptive concurrency
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Optional, Dict, Any, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+NETWORK_URLS = {
+    'mainnet': 'https://api.trongrid.io',
+    'shasta': 'https://api.shasta.trongrid.io',
+}
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second, holding at most burst tokens"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class TronGridClient:
+    """Shared TronGrid HTTP client.
+
+    Every API key has its own token bucket, and requests rotate across the keys
+    that have tokens. A key that gets HTTP 429 (or TronGrid's 403 quota error)
+    is rested for Retry-After seconds. Throttled, failed and timed-out requests
+    are retried with exponential backoff and full jitter. The number of
+    requests in flight follows AIMD: it grows by one per window of successes and
+    halves on throttling, so the client settles just under the quota ceiling.
+
+    Wrap it with tronpy_provider() to route tronpy calls through the same limits.
+    """
+
+    def __init__(self, base_url: str, api_keys: Optional[List[str]] = None, rate_per_key: float = 15,
+                 burst: Optional[float] = None, timeout: float = 30, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30,
+                 min_concurrency: int = 1, max_concurrency: int = 32):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+
+        # Without keys TronGrid still serves anonymous requests, at a lower quota
+        self._keys = [
+            {'key': key, 'bucket': TokenBucket(rate_per_key, burst or rate_per_key), 'rest_until': 0.0}
+            for key in (api_keys or [None])
+        ]
+        self._next_key = 0
+        self._key_lock = threading.Lock()
+
+        self._limit = float(min_concurrency)
+        self._in_flight = 0
+        self._concurrency = threading.Condition()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, network: str = 'mainnet', base_url: Optional[str] = None) -> 'TronGridClient':
+        """Build a client from TRONGRID_* environment variables"""
+        base_url = base_url or os.getenv('TRONGRID_URL') or NETWORK_URLS.get(network, NETWORK_URLS['shasta'])
+        rate_per_key = float(os.getenv('TRONGRID_RATE_PER_KEY', '15'))
+        keys = []
+        if 'trongrid' in base_url:
+            keys = os.getenv('TRONGRID_API_KEYS') or os.getenv('TRONGRID_API_KEY') or ''
+            keys = [key.strip() for key in keys.split(',') if key.strip() and key.strip() != 'demo']
+        elif os.getenv('TRONGRID_URL') != base_url:
+            # Self-hosted and third-party nodes take no TronGrid keys and have their own limit
+            rate_per_key = float(os.getenv('TRON_PROVIDER_RATE', '50'))
+
+        return cls(
+            base_url,
+            api_keys=keys,
+            rate_per_key=rate_per_key,
+            timeout=float(os.getenv('REQUEST_TIMEOUT', '30')),
+            max_retries=int(os.getenv('TRONGRID_MAX_RETRIES', '5')),
+            min_concurrency=int(os.getenv('TRONGRID_MIN_CONCURRENCY', '1')),
+            max_concurrency=int(os.getenv('TRONGRID_MAX_CONCURRENCY', '32'))
+        )
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _acquire_key(self) -> Dict[str, Any]:
+        """Wait for a token from the next key that is not resting"""
+        while True:
+            wait = None
+            with self._key_lock:
+                now = time.monotonic()
+                for offset in range(len(self._keys)):
+                    entry = self._keys[(self._next_key + offset) % len(self._keys)]
+                    if entry['rest_until'] > now:
+                        key_wait = entry['rest_until'] - now
+                    else:
+                        key_wait = entry['bucket'].try_acquire()
+                        if not key_wait:
+                            self._next_key = (self._next_key + offset + 1) % len(self._keys)
+                            return entry
+                    wait = key_wait if wait is None else min(wait, key_wait)
+            time.sleep(min(wait, self.backoff_max))
+
+    def _enter(self):
+        with self._concurrency:
+            while self._in_flight >= int(self._limit):
+                self._concurrency.wait()
+            self._in_flight += 1
+
+    def _exit(self, throttled: bool):
+        with self._concurrency:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(self.min_concurrency, self._limit / 2)
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._concurrency.notify_all()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    @staticmethod
+    def _is_throttled(response: requests.Response) -> bool:
+        # TronGrid reports exhausted daily quotas as 403
+        return response.status_code == 429 or (
+            response.status_code == 403 and b'Exceed the user' in response.content
+        )
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None,
+                json: Optional[Any] = None) -> Any:
+        """Send a request, retrying throttled, 5xx and network failures; returns decoded JSON"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        for attempt in range(self.max_retries + 1):
+            entry = self._acquire_key()
+            headers = {'TRON-PRO-API-KEY': entry['key']} if entry['key'] else {}
+            retry_after = None
+            throttled = False
+
+            self._enter()
+            try:
+                self._count('requests')
+                response = self.session.request(method, url, params=params, json=json,
+                                                headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                throttled = True
+                self._count('errors')
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"TronGrid {path} failed ({e}), retrying")
+            else:
+                if self._is_throttled(response):
+                    throttled = True
+                    self._count('throttled')
+                    retry_after = float(response.headers.get('Retry-After') or 0) or None
+                    # Rest the key so the others carry the load meanwhile
+                    entry['rest_until'] = time.monotonic() + (retry_after or self._backoff(attempt + 1))
+                elif response.status_code < 500:
+                    response.raise_for_status()
+                    return response.json()
+                else:
+                    self._count('errors')
+
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                logger.warning(f"TronGrid {path} returned {response.status_code}, retrying")
+            finally:
+                self._exit(throttled)
+
+            self._count('retries')
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Any:
+        """GET a TronGrid REST path such as v1/accounts/{address}/transactions/trc20"""
+        return self.request('GET', path, params=params)
+
+    def post(self, path: str, payload: Optional[Dict] = None) -> Any:
+        """POST to a node API path such as wallet/getnowblock"""
+        return self.request('POST', path, json=payload or {})
+
+    def pinned(self) -> 'TronGridClient':
+        """Return a client whose reads all go to one node; this client already does"""
+        return self
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters, the current concurrency limit and resting keys"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        now = time.monotonic()
+        stats['concurrency_limit'] = int(self._limit)
+        stats['in_flight'] = self._in_flight
+        stats['keys'] = sum(1 for entry in self._keys if entry['key'])
+        stats['resting_keys'] = sum(1 for entry in self._keys if entry['rest_until'] > now)
+        return stats
+
+
+def tronpy_provider(client: Any):
+    """tronpy provider that sends every node API call through a TronGridClient or ProviderPool"""
+    # Imported here because tronpy takes about half a second to import
+    from tronpy.providers import HTTPProvider
+
+    class TronGridProvider(HTTPProvider):
+        def __init__(self):
+            super().__init__(client.base_url, timeout=client.timeout)
+            self.client = client
+
+        def make_request(self, method: str, params: Any = None) -> Any:
+            return self.client.post(method, params)
+
+    return TronGridProvider()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Processed Transaction Index for TRC20 Automation Service
+Bloom filter in front of an LRU of recently processed transaction hashes
+"""
+
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Set, Tuple
+
+# Rough per-entry cost of a 64-char hex hash held in the LRU
+LRU_ENTRY_BYTES = 200
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter keyed by transaction hash"""
+
+    def __init__(self, expected_items: int, false_positive_rate: float, max_bytes: int):
+        optimal_bits = math.ceil(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2))
+        self.num_bits = max(8, min(optimal_bits, max_bytes * 8))
+        self.num_hashes = max(1, round(self.num_bits / max(expected_items, 1) * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ProcessedTransactionIndex:
+    """Bounded in-memory index of transaction hashes already recorded in deposits.
+
+    The Bloom filter covers every hash ever added in a fraction of the memory;
+    the LRU holds the most recent hashes exactly. Only LRU hits are reported as
+    seen, so a Bloom false positive never hides a new deposit. Once the index
+    has been warmed with every recorded hash, a Bloom negative is reported as
+    new without a database check; a hash some other writer recorded meanwhile
+    is still dropped by the insert's ON CONFLICT.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, expected_items: int = 1_000_000,
+                 false_positive_rate: float = 0.001):
+        self.bloom = BloomFilter(expected_items, false_positive_rate, max_bytes // 2)
+        self.lru_capacity = max(1, (max_bytes - len(self.bloom.bits)) // LRU_ENTRY_BYTES)
+        self.warmed = False
+
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bloom_negatives': 0, 'added': 0}
+
+    def add(self, tx_hash: str):
+        """Record a processed transaction hash"""
+        with self._lock:
+            self._add(tx_hash)
+
+    def add_many(self, tx_hashes: Iterable[str]):
+        """Record a batch of processed transaction hashes"""
+        with self._lock:
+            for tx_hash in tx_hashes:
+                self._add(tx_hash)
+
+    def _add(self, tx_hash: str):
+        if tx_hash in self._lru:
+            self._lru.move_to_end(tx_hash)
+            return
+
+        self.bloom.add(tx_hash)
+        self._lru[tx_hash] = None
+        self._stats['added'] += 1
+        if len(self._lru) > self.lru_capacity:
+            self._lru.popitem(last=False)
+
+    def partition(self, tx_hashes: Iterable[str]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Split hashes into (seen, new, unknown); only unknown hashes need a database check"""
+        seen, new, unknown = set(), set(), set()
+        with self._lock:
+            for tx_hash in tx_hashes:
+                if tx_hash not in self.bloom:
+                    self._stats['bloom_negatives'] += 1
+                    self._stats['misses'] += 1
+                    # Before warm-up the filter does not cover the database yet
+                    (new if self.warmed else unknown).add(tx_hash)
+                elif tx_hash in self._lru:
+                    self._lru.move_to_end(tx_hash)
+                    self._stats['hits'] += 1
+                    seen.add(tx_hash)
+                else:
+                    self._stats['misses'] += 1
+                    unknown.add(tx_hash)
+        return seen, new, unknown
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and memory usage"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['lru_size'] = len(self._lru)
+        stats['lru_capacity'] = self.lru_capacity
+        stats['bloom_bytes'] = len(self.bloom.bits)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
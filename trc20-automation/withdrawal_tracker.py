@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Withdrawal Tracker for TRC20 Automation Service
+Follows broadcasted withdrawals until they are confirmed, failed or expired
+"""
+
+import time
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+
+class WithdrawalTracker:
+    """In-flight withdrawal txids, resolved from the receipts of each new solid block.
+
+    Entries are dicts with id, txid, expiration (ms) and created_at (epoch seconds
+    of the withdrawal request). A txid that is not in any solid block once the
+    solid head is past its expiration can never be included. Such txids are
+    returned by past_expiration and only expired, so they can be re-signed, once
+    the caller has confirmed the solid node does not know them.
+    """
+
+    def __init__(self):
+        self.last_block: Optional[int] = None
+
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'confirmed': 0, 'failed': 0, 'expired': 0,
+                       'latency_total_seconds': 0.0, 'latency_max_seconds': 0.0}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def track(self, entry: Dict[str, Any]):
+        """Start following a signed withdrawal"""
+        with self._lock:
+            self._in_flight[entry['txid']] = entry
+
+    def untrack(self, txid: str):
+        """Stop following a withdrawal, e.g. one the node rejected"""
+        with self._lock:
+            self._in_flight.pop(txid, None)
+
+    def match_receipts(self, tx_infos: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dict]]:
+        """Resolve in-flight txids found in a block's receipts into (confirmed, failed)"""
+        confirmed, failed = [], []
+        now = time.time()
+        with self._lock:
+            for info in tx_infos:
+                entry = self._in_flight.pop(info.get('id'), None)
+                if not entry:
+                    continue
+
+                receipt_result = info.get('receipt', {}).get('result', 'SUCCESS')
+                if info.get('result') == 'FAILED' or receipt_result != 'SUCCESS':
+                    entry['reason'] = receipt_result if receipt_result != 'SUCCESS' else info.get('resMessage')
+                    failed.append(entry)
+                    self._stats['failed'] += 1
+                else:
+                    confirmed.append(entry)
+                    self._stats['confirmed'] += 1
+                    latency = max(0.0, now - (entry.get('created_at') or now))
+                    self._stats['latency_total_seconds'] += latency
+                    self._stats['latency_max_seconds'] = max(self._stats['latency_max_seconds'], latency)
+        return confirmed, failed
+
+    def past_expiration(self, solid_timestamp: int) -> List[Dict[str, Any]]:
+        """Return, without removing them, txids whose expiration is behind the solid head"""
+        with self._lock:
+            return [dict(entry) for entry in self._in_flight.values()
+                    if entry.get('expiration') and entry['expiration'] < solid_timestamp]
+
+    def expire(self, txids: List[str]) -> List[Dict[str, Any]]:
+        """Remove and return the given txids as expired"""
+        expired = []
+        with self._lock:
+            for txid in txids:
+                entry = self._in_flight.pop(txid, None)
+                if entry:
+                    expired.append(entry)
+            self._stats['expired'] += len(expired)
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        """Return in-flight depth, outcome counters and end-to-end payout latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._in_flight)
+        stats['latency_avg_seconds'] = (
+            stats['latency_total_seconds'] / stats['confirmed'] if stats['confirmed'] else 0.0
+        )
+        stats['last_block'] = self.last_block
+        return stats